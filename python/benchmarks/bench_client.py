@@ -0,0 +1,312 @@
+"""@package docstring
+Benchmarks of the weles functions against weles.testing.LocalServer
+
+Every function is measured on data frames with different numbers of rows and columns, types of columns and payload
+formats. For every case the benchmark reports:
+	latency        median seconds of the whole call, WELES_BENCH_REPEAT runs
+	serialization  seconds of serializing the sent data frame or parsing the received one
+	sent/received  bytes of request and response bodies seen by the server
+	peak memory    peak bytes allocated during one call, measured with tracemalloc, including the in-process server
+
+Sizes of the cases are set with comma separated WELES_BENCH_ROWS, WELES_BENCH_COLUMNS, WELES_BENCH_DTYPES and
+WELES_BENCH_FORMATS environment variables. Results are written as json to WELES_BENCH_OUTPUT if it is set.
+Chunked predictions send chunks of a tenth of the rows.
+Run from the python directory with:
+	python -m pytest -s -c benchmarks/pytest.ini benchmarks
+"""
+
+import os
+import json
+import time
+import asyncio
+import tempfile
+import itertools
+import statistics
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from weles import formats
+from weles.testing import LocalServer, ConstantModel
+
+def _setting(name, default):
+	return [value.strip() for value in os.environ.get(name, default).split(',') if value.strip()]
+
+ROWS = [int(rows) for rows in _setting('WELES_BENCH_ROWS', '1000,10000')]
+COLUMNS = [int(columns) for columns in _setting('WELES_BENCH_COLUMNS', '10,50')]
+DTYPES = _setting('WELES_BENCH_DTYPES', 'float,int,str')
+FORMATS = _setting('WELES_BENCH_FORMATS', 'csv,parquet')
+REPEAT = int(os.environ.get('WELES_BENCH_REPEAT', 3))
+
+CASES = list(itertools.product(ROWS, COLUMNS, DTYPES, FORMATS))
+
+# requirements file of uploaded models
+REQUIREMENTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'requirements.txt')
+
+def frame(rows, columns, dtype, seed=0):
+	"""Data frame with the target column y and columns x0, x1, ... of the dtype"""
+
+	rng = np.random.default_rng(seed)
+	if dtype == 'float':
+		values = {'x' + str(i): rng.random(rows) for i in range(columns)}
+	elif dtype == 'int':
+		values = {'x' + str(i): rng.integers(0, 10**6, rows) for i in range(columns)}
+	elif dtype == 'str':
+		levels = np.array(['level_' + str(level) for level in range(100)])
+		values = {'x' + str(i): levels[rng.integers(0, 100, rows)] for i in range(columns)}
+	else:
+		raise ValueError("dtype must be one of: float, int, str")
+	data = pd.DataFrame(values)
+	data['y'] = rng.integers(0, 2, rows)
+	return data
+
+def _case_id(case):
+	return '-'.join(str(value) for value in case)
+
+@pytest.fixture(scope='module')
+def server():
+	with LocalServer() as server:
+		server.client().users.create('bench@weles.local', 'bench', 'bench')
+		yield server
+
+@pytest.fixture(scope='module')
+def results():
+	collected = []
+	yield collected
+	path = os.environ.get('WELES_BENCH_OUTPUT')
+	if path:
+		with open(path, 'w') as f:
+			json.dump(collected, f, indent=1)
+
+@pytest.fixture(scope='module')
+def prepared(server):
+	"""Clients per format, and data frames with uploaded datasets and models per case"""
+
+	clients = {}
+	uploaded = {}
+
+	def prepare(case):
+		rows, columns, dtype, fmt = case
+		if fmt in ('parquet', 'arrow'):
+			pytest.importorskip('pyarrow')
+		if fmt == 'csv.zst':
+			pytest.importorskip('zstandard')
+
+		if fmt not in clients:
+			# metadata is not cached, every call reaches the server
+			clients[fmt] = server.client(payload_format=fmt, metadata_ttl=0)
+			clients[fmt].auth.login('bench', 'bench')
+		client = clients[fmt]
+
+		if case not in uploaded:
+			data = frame(rows, columns, dtype)
+			model_name = 'model_' + '_'.join(str(value).replace('.', '_') for value in case)
+			client.models.upload(ConstantModel(), model_name, 'benchmark model', 'y', ['benchmark'], data, model_name, 'benchmark dataset', REQUIREMENTS)
+			uploaded[case] = (data, model_name, client.datasets.content_hash(data))
+
+		return (client,) + uploaded[case]
+
+	yield prepare
+
+	for client in clients.values():
+		client.close()
+
+def measure(server, function):
+	"""Median latency of the call, bytes seen by the server and peak memory of one call"""
+
+	latencies = []
+	for _ in range(REPEAT):
+		sent, received = server.bytes_received, server.bytes_sent
+		start = time.perf_counter()
+		function()
+		latencies.append(time.perf_counter() - start)
+		sent, received = server.bytes_received - sent, server.bytes_sent - received
+
+	tracemalloc.start()
+	try:
+		function()
+		peak = tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+
+	return {'latency': statistics.median(latencies), 'sent': sent, 'received': received, 'peak_memory': peak}
+
+def timed(function):
+	"""Median seconds of the call without any communication"""
+
+	latencies = []
+	for _ in range(REPEAT):
+		start = time.perf_counter()
+		function()
+		latencies.append(time.perf_counter() - start)
+	return statistics.median(latencies)
+
+def report(results, name, case, measured, serialization):
+	measured = dict(measured, function=name, case=_case_id(case), serialization=serialization)
+	results.append(measured)
+	print('\n' + name + ' [' + measured['case'] + ']: latency ' + format(measured['latency'] * 1000, '.1f') + ' ms, serialization '
+		+ format(serialization * 1000, '.1f') + ' ms, sent ' + str(measured['sent']) + ' B, received ' + str(measured['received'])
+		+ ' B, peak memory ' + format(measured['peak_memory'] / 2**20, '.1f') + ' MiB')
+
+@pytest.mark.parametrize('case', CASES, ids=_case_id)
+def bench_predict(server, prepared, results, case):
+	client, data, model_name, dataset_id = prepared(case)
+	X = data.drop(columns='y')
+
+	measured = measure(server, lambda: client.models.predict(model_name, X))
+	report(results, 'models.predict', case, measured, timed(lambda: formats.serialize(X, case[3])))
+
+@pytest.mark.parametrize('case', CASES, ids=_case_id)
+def bench_predict_batches(server, prepared, results, case):
+	client, data, model_name, dataset_id = prepared(case)
+	X = data.drop(columns='y')
+	chunksize = max(1, X.shape[0] // 10)
+
+	measured = measure(server, lambda: list(client.models.predict_batches(model_name, X, chunksize=chunksize, max_workers=4)))
+	report(results, 'models.predict_batches', case, measured, timed(lambda: formats.serialize(X, case[3])))
+
+@pytest.mark.parametrize('case', CASES, ids=_case_id)
+def bench_predict_async(server, prepared, results, case):
+	client, data, model_name, dataset_id = prepared(case)
+	X = data.drop(columns='y')
+	chunksize = max(1, X.shape[0] // 10)
+
+	measured = measure(server, lambda: asyncio.run(client.models.predict_async(model_name, X, chunksize=chunksize, max_workers=4)))
+	report(results, 'models.predict_async', case, measured, timed(lambda: formats.serialize(X, case[3])))
+
+@pytest.mark.parametrize('case', CASES, ids=_case_id)
+def bench_predict_many(server, prepared, results, case):
+	client, data, model_name, dataset_id = prepared(case)
+	X = data.drop(columns='y')
+	# the challenger is trained on the uploaded dataset, referred to by its hash
+	challenger = model_name + '_challenger'
+	client.models.upload(ConstantModel(), challenger, 'benchmark model', 'y', ['benchmark'], dataset_id, requirements_file=REQUIREMENTS)
+
+	measured = measure(server, lambda: client.models.predict_many([model_name, challenger], X))
+	report(results, 'models.predict_many', case, measured, timed(lambda: formats.serialize(X, case[3])))
+
+@pytest.mark.parametrize('case', CASES, ids=_case_id)
+def bench_predict_hash(server, prepared, results, case):
+	client, data, model_name, dataset_id = prepared(case)
+
+	measured = measure(server, lambda: client.models.predict(model_name, dataset_id))
+	report(results, 'models.predict(hash)', case, measured, 0.0)
+
+@pytest.mark.parametrize('case', CASES, ids=_case_id)
+def bench_datasets_get(server, prepared, results, case):
+	client, data, model_name, dataset_id = prepared(case)
+	payload = formats.serialize(data, case[3])
+
+	measured = measure(server, lambda: client.datasets.get(dataset_id))
+	report(results, 'datasets.get', case, measured, timed(lambda: formats.deserialize(payload, case[3])))
+
+@pytest.mark.parametrize('case', CASES, ids=_case_id)
+def bench_datasets_head(server, prepared, results, case):
+	client, data, model_name, dataset_id = prepared(case)
+
+	measured = measure(server, lambda: client.datasets.head(dataset_id, n=100))
+	report(results, 'datasets.head', case, measured, 0.0)
+
+@pytest.mark.parametrize('case', CASES, ids=_case_id)
+def bench_datasets_upload(server, prepared, results, case):
+	client, data, model_name, dataset_id = prepared(case)
+
+	measured = measure(server, lambda: client.datasets.upload(data, 'benchmark', 'benchmark dataset', dedup=False))
+	report(results, 'datasets.upload', case, measured, timed(lambda: formats.serialize(data, case[3])))
+
+@pytest.mark.parametrize('case', CASES, ids=_case_id)
+def bench_datasets_upload_dedup(server, prepared, results, case):
+	client, data, model_name, dataset_id = prepared(case)
+
+	measured = measure(server, lambda: client.datasets.upload(data, 'benchmark', 'benchmark dataset', dedup=True))
+	report(results, 'datasets.upload(dedup)', case, measured, timed(lambda: client.datasets.content_hash(data)))
+
+@pytest.mark.parametrize('case', CASES, ids=_case_id)
+def bench_datasets_append(server, prepared, results, case):
+	client, data, model_name, dataset_id = prepared(case)
+	# a tenth of the rows is added to the uploaded dataset
+	new_rows = frame(max(1, data.shape[0] // 10), case[1], case[2], seed=1)
+
+	measured = measure(server, lambda: client.datasets.append(dataset_id, new_rows, 'benchmark', 'benchmark dataset'))
+	report(results, 'datasets.append', case, measured, timed(lambda: formats.serialize(new_rows, case[3])))
+
+@pytest.mark.parametrize('case', CASES, ids=_case_id)
+def bench_models_upload(server, prepared, results, case):
+	client, data, model_name, dataset_id = prepared(case)
+	names = ('benchmark_' + str(i) for i in itertools.count())
+
+	def upload():
+		client.models.upload(ConstantModel(), next(names) + '_' + model_name, 'benchmark model', 'y', ['benchmark'], data, 'benchmark', 'benchmark dataset', REQUIREMENTS, dedup=False)
+
+	measured = measure(server, upload)
+	report(results, 'models.upload', case, measured, timed(lambda: formats.serialize(data, case[3])))
+
+@pytest.mark.parametrize('case', CASES, ids=_case_id)
+def bench_audit(server, prepared, results, case):
+	client, data, model_name, dataset_id = prepared(case)
+
+	measured = measure(server, lambda: client.models.audit(model_name, 'acc', data, 'y', 'benchmark', 'benchmark dataset', dedup=False))
+	report(results, 'models.audit', case, measured, timed(lambda: formats.serialize(data, case[3])))
+
+@pytest.mark.parametrize('case', CASES, ids=_case_id)
+def bench_audit_many(server, prepared, results, case):
+	client, data, model_name, dataset_id = prepared(case)
+
+	measured = measure(server, lambda: client.models.audit_many([model_name], ['acc', 'mae'], data, 'y', 'benchmark', 'benchmark dataset', dedup=False))
+	report(results, 'models.audit_many', case, measured, timed(lambda: formats.serialize(data, case[3])))
+
+@pytest.mark.parametrize('case', CASES, ids=_case_id)
+def bench_load_local(server, prepared, results, case):
+	client, data, model_name, dataset_id = prepared(case)
+
+	def load():
+		# every call downloads the model into an empty cache
+		with tempfile.TemporaryDirectory() as cache_dir:
+			client.models.load_local(model_name, check_requirements=False, cache_dir=cache_dir)
+
+	measured = measure(server, load)
+	report(results, 'models.load_local', case, measured, 0.0)
+
+# names of users created by the benchmark
+USERS = ('bench_' + str(i) for i in itertools.count())
+
+def create_user(client):
+	user_name = next(USERS)
+	return client.users.create(user_name + '@weles.local', user_name, 'bench')
+
+# functions which do not depend on the size of data, called on the smallest case
+METADATA = {
+	'models.info': lambda client, model_name, dataset_id: client.models.info(model_name),
+	'models.info_many': lambda client, model_name, dataset_id: client.models.info_many([model_name]),
+	'models.requirements': lambda client, model_name, dataset_id: client.models.requirements(model_name),
+	'models.search': lambda client, model_name, dataset_id: client.models.search(tags=['benchmark']),
+	'models.search(fields)': lambda client, model_name, dataset_id: client.models.search(tags=['benchmark'], fields=['owner']),
+	'datasets.info': lambda client, model_name, dataset_id: client.datasets.info(dataset_id),
+	'datasets.exists': lambda client, model_name, dataset_id: client.datasets.exists(dataset_id),
+	'datasets.info_many': lambda client, model_name, dataset_id: client.datasets.info_many([dataset_id]),
+	'auth.login': lambda client, model_name, dataset_id: client.auth.login('bench', 'bench'),
+	'users.create': lambda client, model_name, dataset_id: create_user(client)
+}
+
+@pytest.mark.parametrize('name', list(METADATA))
+def bench_metadata(server, prepared, results, name):
+	case = (min(ROWS), min(COLUMNS), DTYPES[0], 'csv')
+	client, data, model_name, dataset_id = prepared(case)
+
+	measured = measure(server, lambda: METADATA[name](client, model_name, dataset_id))
+	report(results, name, case, measured, 0.0)
+
+@pytest.mark.parametrize('name', ['models.status', 'models.wait'])
+def bench_status(server, prepared, results, name):
+	case = (min(ROWS), min(COLUMNS), DTYPES[0], 'csv')
+	client, data, model_name, dataset_id = prepared(case)
+	task_id = client.models.upload(ConstantModel(), model_name + '_status', 'benchmark model', 'y', ['benchmark'], dataset_id, requirements_file=REQUIREMENTS)
+
+	if name == 'models.status':
+		measured = measure(server, lambda: client.models.status(task_id, interactive=False))
+	else:
+		# the task is finished, wait returns after the first poll
+		measured = measure(server, lambda: client.models.wait([task_id]))
+	report(results, name, case, measured, 0.0)
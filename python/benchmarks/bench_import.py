@@ -0,0 +1,53 @@
+"""@package docstring
+Benchmark of the import time of the weles package
+
+Every import is measured in a fresh interpreter, the median of WELES_IMPORT_REPEAT runs is compared with the budget
+in seconds given by WELES_IMPORT_BUDGET. Run from the python directory with:
+	python -m pytest -c benchmarks/pytest.ini benchmarks
+"""
+
+import os
+import sys
+import json
+import statistics
+import subprocess
+
+import pytest
+
+# directory with the weles package
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REPEAT = int(os.environ.get('WELES_IMPORT_REPEAT', 5))
+BUDGET = float(os.environ.get('WELES_IMPORT_BUDGET', 0.3))
+
+# modules which must not be loaded before they are needed
+HEAVY = ('pandas', 'numpy', 'tqdm', 'pyarrow', 'zstandard')
+
+def measure(statement):
+	"""Seconds of running the statement and heavy modules loaded by it, in a fresh interpreter"""
+
+	code = (
+		"import sys, time, json\n"
+		"start = time.perf_counter()\n"
+		+ statement + "\n"
+		"elapsed = time.perf_counter() - start\n"
+		"print(json.dumps([elapsed, [name for name in " + repr(HEAVY) + " if name in sys.modules]]))\n"
+	)
+	out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True, capture_output=True, text=True).stdout
+	return json.loads(out)
+
+@pytest.mark.parametrize('statement', [
+	'import weles',
+	'import weles.models',
+	'import weles.datasets',
+	'from weles import users, uploads, auth',
+	'weles = __import__("weles"); weles.Client("http://127.0.0.1").models.status'
+])
+def bench_import(statement):
+	results = [measure(statement) for _ in range(REPEAT)]
+	elapsed = statistics.median(result[0] for result in results)
+
+	print(statement + ': ' + format(elapsed * 1000, '.1f') + ' ms')
+
+	assert results[0][1] == [], "heavy modules loaded on import: " + ', '.join(results[0][1])
+	assert elapsed < BUDGET, "importing took " + format(elapsed, '.3f') + " s, budget is " + format(BUDGET, '.3f') + " s"
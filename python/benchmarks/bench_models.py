@@ -0,0 +1,92 @@
+"""@package docstring
+Benchmarks of uploading big models to weles.testing.LocalServer
+
+Every model is uploaded with and without compression. For every case the benchmark reports the latency of
+models.upload and bytes seen by the server, as in bench_client, and serialization of the model alone:
+	size           bytes of the pickled model sent to the weles
+	peak memory    peak bytes allocated while pickling into a temporary file, and into one bytes object for comparison
+Models need scikit-learn and keras, benchmarks of models whose packages are not installed are skipped.
+The number of trees of the random forest is set with WELES_BENCH_TREES.
+"""
+
+import os
+import time
+import pickle
+import tempfile
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from weles import local
+from weles.testing import LocalServer
+
+from bench_client import REQUIREMENTS, measure
+
+TREES = int(os.environ.get('WELES_BENCH_TREES', 100))
+
+def training_data(rows=10000, columns=20, seed=0):
+	rng = np.random.default_rng(seed)
+	data = pd.DataFrame(rng.random((rows, columns)), columns=['x' + str(i) for i in range(columns)])
+	data['y'] = (data['x0'] + rng.random(rows) > 1).astype(int)
+	return data
+
+def random_forest(data):
+	ensemble = pytest.importorskip('sklearn.ensemble')
+	return ensemble.RandomForestClassifier(n_estimators=TREES, random_state=0).fit(data.drop(columns='y'), data['y'])
+
+def keras_network(data):
+	keras = pytest.importorskip('keras')
+	model = keras.Sequential([keras.Input((data.shape[1] - 1,)), keras.layers.Dense(2048, activation='relu'), keras.layers.Dense(2048, activation='relu'), keras.layers.Dense(1, activation='sigmoid')])
+	model.compile(optimizer='adam', loss='binary_crossentropy')
+	return model
+
+MODELS = {'random_forest': random_forest, 'keras': keras_network}
+
+@pytest.fixture(scope='module')
+def server():
+	with LocalServer() as server:
+		server.client().users.create('bench@weles.local', 'bench', 'bench')
+		yield server
+
+@pytest.fixture(scope='module')
+def client(server):
+	client = server.client()
+	client.auth.login('bench', 'bench')
+	yield client
+	client.close()
+
+def peak_memory(function):
+	tracemalloc.start()
+	try:
+		function()
+		return tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+
+def dumped(model, compress):
+	with tempfile.TemporaryFile() as f:
+		return local.dump(model, f, compress)
+
+@pytest.mark.parametrize('compress', [False, True], ids=['plain', 'gzip'])
+@pytest.mark.parametrize('name', list(MODELS))
+def bench_models_upload(server, client, name, compress):
+	data = training_data()
+	model = MODELS[name](data)
+	names = (name + '_' + str(compress).lower() + '_' + str(i) for i in range(10**6))
+
+	def upload():
+		client.models.upload(model, next(names), 'benchmark model', 'y', ['benchmark'], data, 'benchmark', 'benchmark dataset', REQUIREMENTS, compress=compress)
+
+	measured = measure(server, upload)
+
+	start = time.perf_counter()
+	size = dumped(model, compress)
+	serialization = time.perf_counter() - start
+	streamed = peak_memory(lambda: dumped(model, compress))
+	in_memory = peak_memory(lambda: pickle.dumps(model, protocol=local.PICKLE_PROTOCOL))
+
+	print('\nmodels.upload [' + name + ('-gzip' if compress else '') + ']: latency ' + format(measured['latency'] * 1000, '.1f')
+		+ ' ms, serialization ' + format(serialization * 1000, '.1f') + ' ms, size ' + str(size) + ' B, sent ' + str(measured['sent'])
+		+ ' B, peak memory of pickling ' + format(streamed / 2**20, '.1f') + ' MiB streamed, ' + format(in_memory / 2**20, '.1f') + ' MiB in memory')
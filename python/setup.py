@@ -1,4 +1,4 @@
-from distutils.core import setup
+from setuptools import setup
 
 setup(name='weles',
 	version='1.0',
@@ -7,9 +7,15 @@ setup(name='weles',
 	author='Wojciech Kretowicz',
 	author_email='wojtekkretowicz@gmail.com',
 	packages=['weles'],
+	python_requires='>=3.8',
 	install_requires=[
 		'requests',
 		'pandas',
 		'tqdm'
 	],
+	extras_require={
+		'parquet': ['pyarrow'],
+		'arrow': ['pyarrow'],
+		'zstd': ['zstandard']
+	},
       zip_safe=False)
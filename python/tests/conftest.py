@@ -0,0 +1,62 @@
+"""@package docstring
+Fixtures of tests of the weles client against weles.testing.LocalServer
+
+Run from the python directory with:
+	python -m pytest tests
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from weles import auth
+from weles.testing import LocalServer, ConstantModel
+
+@pytest.fixture(autouse=True)
+def environment(tmp_path, monkeypatch):
+	"""Tokens are saved in the temporary directory and credentials are not taken from the environment"""
+
+	monkeypatch.setattr(auth, 'TOKEN_FILE', str(tmp_path / 'token.json'))
+	for name in ('WELES_TOKEN', 'WELES_USER', 'WELES_PASSWORD'):
+		monkeypatch.delenv(name, raising=False)
+
+@pytest.fixture
+def server():
+	with LocalServer() as server:
+		server.client().users.create('test@weles.local', 'test', 'test')
+		yield server
+
+@pytest.fixture
+def client(server):
+	client = server.client()
+	client.auth.login('test', 'test')
+	yield client
+	client.close()
+
+@pytest.fixture
+def data():
+	rng = np.random.default_rng(0)
+	data = pd.DataFrame({'x0': rng.random(20), 'x1': rng.integers(0, 10, 20), 'x2': rng.choice(['a', 'b'], 20)})
+	data['y'] = rng.integers(0, 2, 20)
+	return data
+
+@pytest.fixture
+def requirements(tmp_path):
+	path = tmp_path / 'requirements.txt'
+	path.write_text('pandas==' + pd.__version__ + '\n')
+	return str(path)
+
+@pytest.fixture
+def model(client, data, requirements):
+	"""Name of the model uploaded to the server"""
+
+	client.models.upload(ConstantModel(1), 'model', 'test model', 'y', ['test'], data, 'data', 'test dataset', requirements)
+	return 'model'
+
+@pytest.fixture
+def without(server):
+	"""Remove endpoints matching the pattern from the server, like the weles which does not have them"""
+
+	def remove(pattern):
+		server._routes = [route for route in server._routes if pattern not in route[1]]
+	return remove
@@ -0,0 +1,64 @@
+import time
+import json
+
+import pytest
+import requests
+
+from weles import auth
+
+def test_login_issues_token(server, client):
+	assert client.token in server._tokens
+	assert client.credentials == {'user_name': 'test', 'password': 'test'}
+	assert auth.fields(client=client) == {'token': client.token}
+
+def test_rejected_login_keeps_no_credentials(server):
+	client = server.client()
+
+	with pytest.raises(requests.HTTPError):
+		client.auth.login('test', 'wrong')
+
+	assert client.credentials is None
+	assert client.token is None
+
+def test_expiring_token_is_refreshed(server, client):
+	old = client.token
+	client.token_expires = time.time() + auth.REFRESH_MARGIN / 2
+
+	token = auth.fields(client=client)['token']
+
+	assert token != old
+	assert client.token_expires > time.time() + auth.REFRESH_MARGIN
+	assert ('POST', '/users/refresh') in server.requests
+
+def test_logging_in_again_when_refresh_fails(server, client):
+	server._tokens.clear()
+	client.token_expires = time.time()
+	logins = server.requests.count(('POST', '/users/login'))
+
+	token = auth.fields(client=client)['token']
+
+	assert token in server._tokens
+	assert server.requests.count(('POST', '/users/login')) == logins + 1
+
+def test_saved_token(server, client):
+	client.auth.login('test', 'test', save=True)
+
+	with open(auth.TOKEN_FILE) as f:
+		assert json.load(f)[client.base_url]['token'] == client.token
+	assert server.client().auth.fields() == {'token': client.token}
+
+def test_login_without_tokens(server, without):
+	without('/users/login')
+	client = server.client()
+
+	assert client.auth.login('test', 'test') is None
+
+	assert client.token is None
+	assert auth.fields(user_key='user', client=client) == {'user': 'test', 'password': 'test'}
+
+def test_credentials_from_environment(server, monkeypatch):
+	monkeypatch.setenv('WELES_USER', 'test')
+	monkeypatch.setenv('WELES_PASSWORD', 'test')
+	client = server.client()
+
+	assert auth.fields(client=client) == {'token': client.token}
@@ -0,0 +1,91 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from weles.cache import MetadataCache, DatasetCache, PredictionCache
+
+def frame(rows, seed=0):
+	return pd.DataFrame({'x': np.random.default_rng(seed).random(rows)})
+
+def test_metadata_cache_evicts_least_recently_used():
+	cache = MetadataCache(maxsize=2)
+	cache.set('a', 1)
+	cache.set('b', 2)
+	cache.get('a')
+
+	cache.set('c', 3)
+
+	assert 'a' in cache and 'c' in cache and 'b' not in cache
+
+def test_metadata_cache_expires(monkeypatch):
+	cache = MetadataCache(ttl=10)
+	cache.set('a', 1, etag='"v1"')
+	assert cache.is_fresh(cache.get('a'))
+
+	now = time.time()
+	monkeypatch.setattr(time, 'time', lambda: now + 11)
+
+	entry = cache.get('a')
+	assert not cache.is_fresh(entry) and entry['etag'] == '"v1"'
+
+def test_metadata_cache_is_persisted(tmp_path):
+	path = str(tmp_path / 'metadata.json')
+	MetadataCache(path=path).set('a', {'b': 1})
+
+	assert MetadataCache(path=path).get('a')['value'] == {'b': 1}
+
+def test_metadata_cache_is_written_lazily(tmp_path, monkeypatch):
+	path = str(tmp_path / 'metadata.json')
+	cache = MetadataCache(maxsize=2000, path=path, persist_interval=60)
+	writes = []
+	replace = os.replace
+	monkeypatch.setattr(os, 'replace', lambda *args: writes.append(args) or replace(*args))
+
+	for i in range(2000):
+		cache.set(str(i), i)
+	assert len(writes) == 1
+
+	cache.flush()
+	assert len(writes) == 2 and len(MetadataCache(maxsize=2000, path=path)) == 2000
+
+def test_dataset_cache_evicts_least_recently_used(tmp_path):
+	cache = DatasetCache(str(tmp_path))
+	cache.put('a', frame(1000, 0))
+	size = os.path.getsize(cache.path('a'))
+	cache.max_bytes = 2 * size + size // 2
+
+	cache.put('b', frame(1000, 1))
+	# reading makes the dataset the most recently used
+	os.utime(cache.path('b'), (time.time() - 10, time.time() - 10))
+	cache.get('a')
+	cache.put('c', frame(1000, 2))
+
+	assert 'a' in cache and 'c' in cache and 'b' not in cache
+	pd.testing.assert_frame_equal(cache.get('a'), frame(1000, 0))
+
+def test_prediction_cache_evicts_least_recently_used():
+	cache = PredictionCache(maxsize=2)
+	keys = [PredictionCache.key('model', 'v1', str(i), 'exact') for i in range(3)]
+	cache.put(keys[0], frame(1, 0))
+	cache.put(keys[1], frame(1, 1))
+	cache.get(keys[0])
+
+	cache.put(keys[2], frame(1, 2))
+
+	assert len(cache) == 2
+	assert cache.get(keys[1]) is None
+	pd.testing.assert_frame_equal(cache.get(keys[0]), frame(1, 0))
+
+def test_prediction_cache_directory(tmp_path):
+	key = PredictionCache.key('model', 'v1', 'input', 'exact')
+	PredictionCache(maxsize=1, directory=str(tmp_path)).put(key, frame(5))
+
+	cache = PredictionCache(maxsize=1, directory=str(tmp_path))
+
+	pd.testing.assert_frame_equal(cache.get(key), frame(5))
+	assert len(cache) == 1
+
+def test_prediction_cache_keys_differ_by_version():
+	assert PredictionCache.key('model', 'v1', 'input', 'exact') != PredictionCache.key('model', 'v2', 'input', 'exact')
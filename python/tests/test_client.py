@@ -0,0 +1,23 @@
+import sys
+import subprocess
+
+import pytest
+
+from weles import Client
+
+def test_functions_are_bound_to_client(server, client, model):
+	requests = len(server.requests)
+
+	assert client.models.info(model)['model']['name'] == model
+	assert server.requests[requests:] == [('GET', '/models/' + model + '/info')]
+
+def test_client_arguments():
+	with pytest.raises(ValueError, match='base_url must be a string'):
+		Client(1)
+	with pytest.raises(ValueError, match='format must be one of'):
+		Client(payload_format='xml')
+
+def test_import_does_not_load_pandas():
+	code = 'import sys, weles; print("pandas" in sys.modules)'
+
+	assert subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout.strip() == 'False'
@@ -0,0 +1,140 @@
+import pandas as pd
+import pytest
+
+from weles.datasets import _select
+
+SELECTIONS = [
+	{'columns': ['x2', 'x0']},
+	{'offset': 5, 'limit': 10},
+	{'sample': 5, 'seed': 1},
+	{'sample': 0.5, 'seed': 1, 'columns': ['x0']},
+	{'filters': [('x1', '>=', 5), ('x2', 'in', ['a'])], 'limit': 3}
+]
+
+@pytest.fixture
+def dataset_id(client, data):
+	return client.datasets.upload(data, 'data', 'test dataset')
+
+@pytest.fixture
+def without_queries(server):
+	"""Make the server send whole datasets without the header of applied selections, like the older weles"""
+
+	def get(headers, body, dataset_id):
+		return server._dataset_get(headers, b'', dataset_id)
+	server._routes = [(method, pattern, get if pattern == '^/datasets/([0-9a-f]{64})$' else handler) for method, pattern, handler in server._routes]
+
+def test_upload_returns_hash(client, data, dataset_id):
+	assert dataset_id == client.datasets.content_hash(data)
+	assert client.datasets.exists(dataset_id)
+
+def test_uploaded_data_is_not_sent_again(server, client, data, dataset_id):
+	received = server.bytes_received
+
+	assert client.datasets.upload(data, 'copy', 'copied dataset', dedup=True) == dataset_id
+	# only the hash is sent and the dataset gets the second name
+	assert server.bytes_received - received < len(data.to_csv(index=False))
+	assert server._datasets[dataset_id]['aliases'] == [{'name': 'data', 'desc': 'test dataset'}, {'name': 'copy', 'desc': 'copied dataset'}]
+
+def test_get_from_cache(server, data, dataset_id, tmp_path):
+	client = server.client(dataset_cache_dir=str(tmp_path))
+
+	first = client.datasets.get(dataset_id)
+	requests = len(server.requests)
+	second = client.datasets.get(dataset_id)
+	head = client.datasets.head(dataset_id, n=3)
+
+	pd.testing.assert_frame_equal(first, second)
+	pd.testing.assert_frame_equal(head, first.head(3))
+	assert server.requests[requests:] == []
+
+def test_get_in_chunks(client, data, dataset_id):
+	chunks = list(client.datasets.get(dataset_id, chunksize=8))
+
+	assert [chunk.shape[0] for chunk in chunks] == [8, 8, 4]
+	pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), client.datasets.get(dataset_id))
+
+def test_get_to_file(client, data, dataset_id, tmp_path):
+	path = str(tmp_path / 'data.csv')
+
+	assert client.datasets.get(dataset_id, path=path) == path
+	pd.testing.assert_frame_equal(pd.read_csv(path), client.datasets.get(dataset_id))
+
+@pytest.mark.parametrize('selection', SELECTIONS)
+def test_selection_applied_by_weles(client, dataset_id, selection):
+	selected = client.datasets.get(dataset_id, **selection)
+
+	pd.testing.assert_frame_equal(selected, _select(client.datasets.get(dataset_id), **selection))
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet'])
+@pytest.mark.parametrize('selection', SELECTIONS)
+def test_selection_applied_locally(server, dataset_id, without_queries, selection, fmt):
+	if fmt == 'parquet':
+		pytest.importorskip('pyarrow')
+	client = server.client(payload_format=fmt)
+
+	selected = client.datasets.get(dataset_id, **selection)
+
+	pd.testing.assert_frame_equal(selected, _select(client.datasets.get(dataset_id), **selection), check_dtype=fmt == 'csv')
+
+@pytest.mark.parametrize('selection', SELECTIONS)
+def test_chunks_selected_locally(client, dataset_id, without_queries, selection):
+	chunks = list(client.datasets.get(dataset_id, chunksize=4, **selection))
+
+	expected = _select(client.datasets.get(dataset_id), **selection)
+	pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected.reset_index(drop=True))
+
+def test_append_sends_only_new_rows(server, client, data, dataset_id):
+	new_rows = data.head(3)
+
+	appended = client.datasets.append(dataset_id, new_rows, 'data', 'test dataset')
+
+	assert ('POST', '/datasets/append') in server.requests
+	pd.testing.assert_frame_equal(client.datasets.get(appended), pd.concat([data, new_rows], ignore_index=True))
+
+def test_append_without_endpoint(server, client, data, dataset_id, without):
+	without('/datasets/append')
+	new_rows = data.head(3)
+
+	appended = client.datasets.append(dataset_id, new_rows)
+
+	assert appended == client.datasets.content_hash(pd.concat([data, new_rows], ignore_index=True))
+	assert appended in server._datasets
+
+def test_upload_of_grown_dataset(server, client, data, dataset_id):
+	grown = pd.concat([data, data.head(2)], ignore_index=True)
+
+	uploaded = client.datasets.upload(grown, 'data', 'test dataset', base_dataset_id=dataset_id)
+
+	assert uploaded == client.datasets.content_hash(grown)
+	assert ('POST', '/datasets/append') in server.requests
+
+@pytest.mark.parametrize('batch', [True, False], ids=['batch', 'one_by_one'])
+def test_info_many(server, client, data, dataset_id, without, batch):
+	if not batch:
+		without('/datasets/info_many')
+	other = client.datasets.upload(data.head(5), 'head', 'test dataset')
+
+	infos = client.datasets.info_many([dataset_id, other])
+
+	assert infos['columns']['dataset_id'].unique().tolist() == [dataset_id, other]
+	# without the batch endpoint every dataset is asked for separately
+	assert (('GET', '/datasets/' + other + '/info') not in server.requests) == batch
+
+def test_info_many_probes_once(server, client, dataset_id, without):
+	without('/datasets/info_many')
+
+	client.datasets.info_many([dataset_id])
+	client.metadata_cache.invalidate()
+	client.datasets.info_many([dataset_id])
+
+	assert server.requests.count(('POST', '/datasets/info_many')) == 1
+
+def test_info_is_cached(server, client, data, dataset_id):
+	other = client.datasets.upload(data.head(5), 'head', 'test dataset')
+	client.datasets.info_many([dataset_id, other])
+	requests = len(server.requests)
+
+	info = client.datasets.info(other)
+
+	assert info['columns'].shape[0] == data.shape[1]
+	assert server.requests[requests:] == []
@@ -0,0 +1,36 @@
+import pandas as pd
+import pytest
+
+from weles import formats
+
+@pytest.fixture(params=list(formats.FORMATS))
+def fmt(request):
+	if request.param in ('parquet', 'arrow'):
+		pytest.importorskip('pyarrow')
+	if request.param == 'csv.zst':
+		pytest.importorskip('zstandard')
+	return request.param
+
+def test_round_trip(data, fmt):
+	content = formats.serialize(data, fmt)
+
+	pd.testing.assert_frame_equal(formats.deserialize(content, fmt), data, check_dtype=fmt == 'csv')
+
+def test_unknown_format():
+	with pytest.raises(ValueError, match='format must be one of'):
+		formats.check_format('xml')
+
+def test_predict_in_format(server, model, data, fmt):
+	client = server.client(payload_format=fmt)
+	X = data.drop(columns='y')
+
+	prediction = client.models.predict(model, X)
+
+	assert prediction.iloc[:, 0].tolist() == [1] * data.shape[0]
+
+def test_get_in_format(server, client, data, fmt):
+	dataset_id = client.datasets.upload(data, 'data', 'test dataset')
+
+	received = server.client(payload_format=fmt).datasets.get(dataset_id)
+
+	pd.testing.assert_frame_equal(received, data, check_dtype=False)
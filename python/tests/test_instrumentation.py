@@ -0,0 +1,53 @@
+import pytest
+
+from weles import instrumentation
+
+@pytest.fixture
+def spans():
+	finished = []
+	instrumentation.add_hook(finished.append)
+	yield finished
+	instrumentation.remove_hook(finished.append)
+
+def test_span_of_call(client, model, data, spans):
+	client.models.predict(model, data.drop(columns='y'))
+
+	span = spans[-1]
+	assert span.name == 'models.predict' and span.parent is None and span.error is None
+	assert span.duration > 0 and span.phases['network'] > 0
+	assert span.counters['requests'] >= 1 and span.counters['bytes_sent'] > 0
+
+def test_nested_spans_are_included(client, data, spans):
+	client.datasets.upload(data, 'data', 'test dataset', dedup=True)
+
+	outer = spans[-1]
+	nested = [span for span in spans if span.parent is outer]
+	assert outer.name == 'datasets.upload' and nested
+	assert outer.counters['requests'] >= sum(span.counters.get('requests', 0) for span in nested)
+
+def test_failed_call_and_hook(client, data, spans):
+	def failing(span):
+		raise RuntimeError('broken hook')
+	instrumentation.add_hook(failing)
+	try:
+		with pytest.raises(ValueError):
+			client.models.predict(1, data)
+	finally:
+		instrumentation.remove_hook(failing)
+
+	assert isinstance(spans[-1].error, ValueError)
+
+def test_removed_hook(client, model, spans):
+	instrumentation.remove_hook(spans.append)
+	client.models.info(model)
+	instrumentation.add_hook(spans.append)
+
+	assert spans == []
+
+def test_span_of_chunks(client, data, spans):
+	dataset_id = client.datasets.upload(data, 'data', 'test dataset')
+
+	chunks = list(client.datasets.get(dataset_id, chunksize=8))
+
+	assert len(chunks) == 3
+	assert spans[-1].name == 'datasets._read_chunks' and 'parse' in spans[-1].phases
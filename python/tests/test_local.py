@@ -0,0 +1,35 @@
+from importlib import metadata
+
+import pytest
+
+from weles import local
+
+@pytest.mark.parametrize('line, parsed', [
+	('numpy==1.24.2', ('numpy', [('==', '1.24.2')])),
+	('pandas >= 1.0, <3', ('pandas', [('>=', '1.0'), ('<', '3')])),
+	('requests[socks]>=2; python_version > "3.7"  # http', ('requests', [('>=', '2')])),
+	('package @ https://example.com/package.whl', ('package', [])),
+	('-r other.txt', None),
+	('git+https://github.com/example/package', None)
+])
+def test_parse_requirement(line, parsed):
+	assert local._parse_requirement(line) == parsed
+
+@pytest.mark.parametrize('installed, operator, version, satisfied', [
+	('1.2.0', '==', '1.2', True),
+	('1.2rc1', '==', '1.2', False),
+	('1.2.3', '==', '1.2.*', True),
+	('2.0', '!=', '1.*', True),
+	('1.10', '>', '1.9', True),
+	('1.4.5', '~=', '1.4.2', True),
+	('1.5.0', '~=', '1.4.2', False)
+])
+def test_satisfies(installed, operator, version, satisfied):
+	assert local._satisfies(installed, operator, version) == satisfied
+
+def test_mismatches():
+	pandas = metadata.version('pandas')
+
+	found = local.mismatches({}, ['pandas>=0.1', 'pandas==' + pandas, 'pandas<0.1', 'pytest @ https://example.com/pytest.whl', 'not-installed-package>=1'])
+
+	assert found == ['pandas <0.1 required, ' + pandas + ' installed', 'not-installed-package >=1 required, not installed']
@@ -0,0 +1,238 @@
+import asyncio
+import threading
+
+import pandas as pd
+import pytest
+
+from weles.testing import ConstantModel
+
+@pytest.fixture
+def other(client, data, requirements):
+	client.models.upload(ConstantModel(0), 'other', 'test model', 'y', ['test'], data, 'data', 'test dataset', requirements)
+	return 'other'
+
+def test_predict(client, model, data):
+	prediction = client.models.predict(model, data.drop(columns='y'))
+
+	assert prediction.iloc[:, 0].tolist() == [1] * data.shape[0]
+
+def test_metadata_is_fetched_once(server, client, model, data):
+	X = data.drop(columns='y')
+
+	client.models.predict(model, X)
+	client.models.predict(model, X)
+
+	assert server.requests.count(('GET', '/models/' + model + '/info')) == 1
+
+def test_expired_metadata_is_revalidated(server, model):
+	client = server.client(metadata_ttl=0)
+
+	first = client.models.info(model)
+	second = client.models.info(model)
+
+	assert server.requests.count(('GET', '/models/' + model + '/info')) == 2
+	assert server.not_modified == 1
+	assert first['model'] == second['model']
+
+def test_predict_in_chunks(server, client, model, data):
+	X = data.drop(columns='y')
+	requests = len(server.requests)
+
+	prediction = client.models.predict(model, X, chunksize=6)
+
+	assert server.requests[requests:].count(('GET', '/models/' + model + '/predict/exact')) == 4
+	pd.testing.assert_frame_equal(prediction, client.models.predict(model, X))
+
+def test_predict_batches(client, model, data):
+	X = data.drop(columns='y')
+
+	batches = list(client.models.predict_batches(model, X, chunksize=6, max_workers=2))
+
+	assert [batch.shape[0] for batch in batches] == [6, 6, 6, 2]
+	pd.testing.assert_frame_equal(pd.concat(batches, ignore_index=True), client.models.predict(model, X))
+
+def test_predict_csv_in_chunks(client, model, data, tmp_path):
+	path = str(tmp_path / 'data.csv')
+	data.drop(columns='y').to_csv(path, index=False)
+
+	batches = list(client.models.predict_batches(model, path, chunksize=8))
+
+	assert [batch.shape[0] for batch in batches] == [8, 8, 4]
+
+def test_predict_async(client, model, data):
+	X = data.drop(columns='y')
+
+	prediction = asyncio.run(client.models.predict_async(model, X, chunksize=6, max_workers=2))
+
+	pd.testing.assert_frame_equal(prediction, client.models.predict(model, X))
+
+def test_predict_async_does_not_block_loop(client, model, data, monkeypatch):
+	from weles import models
+
+	X = data.drop(columns='y')
+	threads = []
+	schema = models._schema
+	monkeypatch.setattr(models, '_schema', lambda *args: threads.append(threading.current_thread()) or schema(*args))
+
+	def chunks():
+		for start in range(0, X.shape[0], 8):
+			threads.append(threading.current_thread())
+			yield X.iloc[start:start + 8]
+
+	async def predict():
+		return threading.current_thread(), await client.models.predict_async(model, chunks())
+	loop_thread, prediction = asyncio.run(predict())
+
+	assert prediction.shape[0] == X.shape[0]
+	assert len(threads) == 4 and loop_thread not in threads
+
+def test_predict_async_of_csv(client, model, data, tmp_path):
+	path = str(tmp_path / 'data.csv')
+	data.drop(columns='y').to_csv(path, index=False)
+
+	prediction = asyncio.run(client.models.predict_async(model, path, chunksize=6))
+
+	assert prediction.shape[0] == data.shape[0]
+
+def test_predict_many(server, client, model, other, data):
+	requests = len(server.requests)
+
+	predictions = client.models.predict_many([model, other], data.drop(columns='y'))
+
+	assert list(predictions.columns) == [model, other]
+	assert predictions[model].eq(1).all() and predictions[other].eq(0).all()
+	assert len([path for method, path in server.requests[requests:] if '/predict/' in path]) == 2
+
+@pytest.mark.parametrize('batch', [True, False], ids=['batch', 'one_by_one'])
+def test_predict_many_fetches_metadata_at_once(server, client, model, other, data, without, batch):
+	if not batch:
+		without('/models/info_many')
+	client.metadata_cache.invalidate()
+	requests = len(server.requests)
+
+	client.models.predict_many([model, other], data.drop(columns='y'))
+
+	# without the batch endpoint every model is asked for separately
+	assert len([path for method, path in server.requests[requests:] if method == 'GET' and path.endswith('/info')]) == (0 if batch else 2)
+
+def test_wait(client, data, requirements):
+	task_ids = [client.models.upload(ConstantModel(), 'waited_' + str(i), 'test model', 'y', ['test'], data, 'data', 'test dataset', requirements) for i in range(3)]
+	seen = []
+
+	statuses = client.models.wait(task_ids, timeout=10, callback=lambda task_id, status: seen.append(task_id))
+
+	assert all(statuses[task_id]['state'] == 'SUCCESS' for task_id in task_ids)
+	assert sorted(seen) == sorted(task_ids)
+
+def test_wait_async(client, data, requirements):
+	task_id = client.models.upload(ConstantModel(), 'waited', 'test model', 'y', ['test'], data, 'data', 'test dataset', requirements)
+
+	statuses = asyncio.run(client.models.wait_async([task_id], timeout=10))
+
+	assert statuses[task_id]['state'] == 'SUCCESS'
+
+def test_wait_timeout(server, client, data, requirements):
+	task_id = client.models.upload(ConstantModel(), 'waited', 'test model', 'y', ['test'], data, 'data', 'test dataset', requirements)
+	server._tasks[task_id]['state'] = 'STARTED'
+
+	with pytest.raises(TimeoutError, match=task_id):
+		client.models.wait([task_id], timeout=0.3, poll_interval=0.1)
+	with pytest.raises(TimeoutError, match=task_id):
+		asyncio.run(client.models.wait_async([task_id], timeout=0.3, poll_interval=0.1))
+
+@pytest.mark.parametrize('batch', [True, False], ids=['batch', 'one_by_one'])
+def test_audit_many(server, client, model, other, data, without, batch):
+	if not batch:
+		without('/models/audit_many')
+	audited = data.assign(x0=data['x0'] + 1)
+
+	results = client.models.audit_many([model, other], ['acc', 'mae'], audited, 'y', 'audited', 'test dataset')
+
+	assert results[['model_name', 'measure']].values.tolist() == [[model, 'acc'], [model, 'mae'], [other, 'acc'], [other, 'mae']]
+	assert results['result'].tolist() == pytest.approx([(data['y'] == 1).mean(), (data['y'] != 1).mean(), (data['y'] == 0).mean(), (data['y'] != 0).mean()])
+	# the batch endpoint is asked for once and the dataset is sent only with the first audit
+	assert server.requests.count(('POST', '/models/audit_many')) == (2 if batch else 1)
+	assert sum(len(model['audits']) for model in server._models.values()) == 4
+	assert len([dataset for dataset in server._datasets.values() if dataset['aliases'] == [{'name': 'audited', 'desc': 'test dataset'}]]) == 1
+
+def test_audit_many_probes_once(server, client, model, data, without):
+	without('/models/audit_many')
+
+	client.models.audit_many([model], ['acc'], data, 'y')
+	client.models.audit_many([model], ['acc'], data, 'y')
+
+	assert server.requests.count(('POST', '/models/audit_many')) == 1
+
+@pytest.mark.parametrize('batch', [True, False], ids=['batch', 'one_by_one'])
+def test_refused_audit_many(client, model, data, without, batch):
+	import requests
+
+	if not batch:
+		without('/models/audit_many')
+
+	with pytest.raises(requests.HTTPError):
+		client.models.audit_many([model, 'unknown'], ['acc'], data, 'y', 'audited', 'test dataset')
+
+def test_load_local(client, model, data, tmp_path):
+	local_model = client.models.load_local(model, check_requirements=False, cache_dir=str(tmp_path))
+	X = data.drop(columns='y')
+
+	pd.testing.assert_frame_equal(local_model.predict(X), client.models.predict(model, X), check_dtype=False)
+
+def test_load_local_downloads_once(server, client, model, tmp_path):
+	client.models.load_local(model, check_requirements=False, cache_dir=str(tmp_path))
+	client.models.load_local(model, check_requirements=False, cache_dir=str(tmp_path))
+
+	assert server.requests.count(('GET', '/models/' + model + '/download')) == 1
+
+def test_search_iter_pages(server, client, data, requirements):
+	for i in range(5):
+		client.models.upload(ConstantModel(), 'found_' + str(i), 'test model', 'y', ['found'], data, 'data', 'test dataset', requirements)
+
+	found = list(client.models.search_iter(tags=['found'], page_size=2))
+
+	assert found == ['found_' + str(i) for i in range(5)]
+	assert len([path for method, path in server.requests if path.startswith('/models/search')]) == 3
+
+def test_search_fields(client, model):
+	found = client.models.search(tags=['test'], fields=['owner'])
+
+	assert found.values.tolist() == [[model, 'test']]
+
+@pytest.mark.parametrize('batch', [True, False], ids=['batch', 'one_by_one'])
+def test_info_many(server, client, model, other, without, batch):
+	if not batch:
+		without('/models/info_many')
+
+	infos = client.models.info_many([model, other])
+
+	assert infos['model']['model_name'].tolist() == [model, other]
+	assert (('GET', '/models/other/info') not in server.requests) == batch
+
+def test_badly_typed_data_is_not_sent(server, client, model, data):
+	X = data.drop(columns='y').assign(x1=1.5)
+	requests = len(server.requests)
+
+	with pytest.raises(ValueError, match='column x1 must have integer values'):
+		client.models.predict(model, X)
+	assert not any(path.startswith('/models/model/predict') for method, path in server.requests[requests:])
+
+def test_refused_audit(client, data):
+	import requests
+
+	assert 'error' in client.models.audit('unknown', 'acc', data, 'y')
+	with pytest.raises(requests.HTTPError):
+		client.models.audit('unknown', 'acc', data, 'y', strict=True)
+
+def test_predictions_are_cached(server, requirements):
+	client = server.client(prediction_cache_size=8)
+	client.auth.login('test', 'test')
+	client.models.upload(ConstantModel(1), 'cached', 'test model', 'y', ['test'], pd.DataFrame({'x': [1.0, 2.0], 'y': [0, 1]}), 'cached', 'test dataset', requirements)
+	X = pd.DataFrame({'x': [3.0, 4.0]})
+
+	first = client.models.predict('cached', X)
+	requests = len(server.requests)
+	second = client.models.predict('cached', X)
+
+	pd.testing.assert_frame_equal(first, second)
+	assert ('GET', '/models/cached/predict/exact') not in server.requests[requests:]
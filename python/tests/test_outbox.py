@@ -0,0 +1,91 @@
+import pytest
+
+from weles import Client
+from weles.outbox import Outbox
+from weles.testing import ConstantModel
+
+@pytest.fixture
+def outbox(tmp_path, client):
+	with Outbox(str(tmp_path / 'outbox'), client=client, start=False) as outbox:
+		yield outbox
+
+def test_uploaded_model_is_reconciled(server, outbox, data, requirements):
+	local_id = outbox.upload_model(ConstantModel(), 'queued', 'test model', 'y', ['test'], data, 'data', 'test dataset', requirements)
+	assert outbox.status(local_id)['state'] == 'PENDING'
+
+	outbox.flush()
+	assert outbox.status(local_id)['state'] == 'SENT'
+	assert 'queued' in server._models
+
+	outbox.flush()
+	assert outbox.status(local_id)['state'] == 'SUCCESS'
+
+def test_audits_are_sent_in_one_batch(server, outbox, model, data, requirements, client):
+	client.models.upload(ConstantModel(0), 'other', 'test model', 'y', ['test'], data, 'data', 'test dataset', requirements)
+	local_ids = [outbox.audit(model_name, 'acc', data, 'y') for model_name in ('model', 'other')]
+
+	assert outbox.flush() == 2
+
+	assert [outbox.status(local_id)['state'] for local_id in local_ids] == ['SUCCESS', 'SUCCESS']
+	assert ('POST', '/models/audit') not in server.requests
+	assert outbox.status(local_ids[0])['result'] == (data['y'] == 1).mean()
+
+def test_refused_entry_fails(outbox, model, data):
+	refused = outbox.audit('unknown', 'acc', data, 'y')
+	accepted = outbox.audit(model, 'acc', data, 'y')
+
+	outbox.flush()
+
+	assert outbox.status(refused)['state'] == 'FAILURE'
+	assert '400' in outbox.status(refused)['error']
+	assert outbox.status(accepted)['state'] == 'SUCCESS'
+
+	outbox.retry(refused)
+	assert outbox.status(refused)['state'] == 'PENDING'
+
+def test_refused_entry_fails_without_batches(server, outbox, model, data, without):
+	without('/models/audit_many')
+	refused = outbox.audit('unknown', 'acc', data, 'y')
+	accepted = outbox.audit(model, 'acc', data, 'y')
+
+	outbox.flush()
+
+	assert outbox.status(refused)['state'] == 'FAILURE'
+	assert outbox.status(accepted)['state'] == 'SUCCESS'
+	assert server.requests.count(('POST', '/models/audit')) == 2
+
+def test_failed_communication_is_repeated(tmp_path, data):
+	# nothing listens on the port
+	client = Client('http://127.0.0.1:9', retries=0, token='token')
+	with Outbox(str(tmp_path / 'outbox'), client=client, backoff_factor=0, max_attempts=2, start=False) as outbox:
+		local_id = outbox.upload_dataset(data, 'data', 'test dataset')
+
+		outbox.flush()
+		status = outbox.status(local_id)
+		assert status['state'] == 'PENDING' and status['attempts'] == 1
+
+		outbox.flush()
+		status = outbox.status(local_id)
+		assert status['state'] == 'FAILURE' and status['attempts'] == 2
+
+def test_entries_survive_restart(tmp_path, client, data):
+	directory = str(tmp_path / 'outbox')
+	with Outbox(directory, client=client, start=False) as outbox:
+		local_id = outbox.upload_dataset(data, 'data', 'test dataset')
+
+	with Outbox(directory, client=client, start=False) as outbox:
+		outbox.flush()
+		assert outbox.status(local_id)['result'] == client.datasets.content_hash(data)
+
+		outbox.purge()
+		assert len(outbox.entries()) == 0
+
+def test_background_thread_needs_credentials(tmp_path, server, monkeypatch):
+	outbox = Outbox(str(tmp_path / 'outbox'), client=server.client(), start=False)
+	assert not outbox._can_authenticate()
+
+	monkeypatch.setenv('WELES_USER', 'test')
+	assert not outbox._can_authenticate()
+
+	monkeypatch.setenv('WELES_PASSWORD', 'test')
+	assert outbox._can_authenticate()
@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+
+from weles.schema import Schema
+
+@pytest.fixture
+def schema():
+	return Schema(['a', 'b', 'c'], ['f', 'i', 'O'], {'c': ['x', 'y']})
+
+def test_columns_are_reordered_and_cast(schema):
+	X = pd.DataFrame({'c': ['x', 'y'], 'b': [1.0, 2.0], 'a': [1, 2], 'd': [0, 0]})
+
+	prepared = schema.prepare(X)
+
+	assert list(prepared.columns) == ['a', 'b', 'c']
+	assert [dtype.kind for dtype in prepared.dtypes[:2]] == ['f', 'i']
+
+def test_columns_are_renamed_by_position(schema):
+	X = pd.DataFrame([[1.0, 2, 'x']])
+
+	assert list(schema.prepare(X).columns) == ['a', 'b', 'c']
+
+def test_prepared_data_frame_is_not_copied(schema):
+	X = pd.DataFrame({'a': [1.0], 'b': [1], 'c': ['x']}).astype({'c': object})
+
+	assert schema.prepare(X) is X
+
+def test_missing_columns(schema):
+	with pytest.raises(ValueError, match='missing: c'):
+		schema.prepare(pd.DataFrame({'a': [1.0], 'b': [1]}))
+
+def test_not_integral_values(schema):
+	with pytest.raises(ValueError, match='column b must have integer values'):
+		schema.prepare(pd.DataFrame({'a': [1.0], 'b': [1.5], 'c': ['x']}))
+
+def test_mistyped_column(schema):
+	with pytest.raises(ValueError, match='column a has type'):
+		schema.prepare(pd.DataFrame({'a': ['1'], 'b': [1], 'c': ['x']}))
+
+def test_unknown_levels(schema):
+	with pytest.raises(ValueError, match='column c has values unknown to the model: z'):
+		schema.prepare(pd.DataFrame({'a': [1.0], 'b': [1], 'c': ['z']}))
+
+def test_not_logical_values():
+	schema = Schema(['a'], ['b'])
+
+	assert schema.prepare(pd.DataFrame({'a': [0, 1]}))['a'].tolist() == [False, True]
+	with pytest.raises(ValueError, match='column a must have logical values'):
+		schema.prepare(pd.DataFrame({'a': [0, 2]}))
+
+def test_schema_from_info():
+	info = {'model': {'target': 'y'}, 'columns': [{'id': 2, 'name': 'b', 'type': 'integer'}, {'id': 1, 'name': 'a', 'type': 'numeric'},
+		{'id': 3, 'name': 'y', 'type': 'integer'}, {'id': 4, 'name': 'c', 'type': 'factor', 'levels': ['x']}]}
+
+	assert Schema.from_info(info) == Schema(['a', 'b', 'c'], ['f', 'i', 'O'], {'c': ['x']})
@@ -0,0 +1,82 @@
+import os
+import pickle
+
+import pytest
+
+from weles import uploads
+from weles.testing import ConstantModel
+
+def test_upload_in_parts(server, client):
+	content = os.urandom(1000)
+
+	upload_id = client.uploads.upload(content, 'file.bin', part_size=128)
+
+	assert server.uploaded(upload_id) == content
+
+def test_resume_after_refused_part(server, client):
+	content = os.urandom(1000)
+	server.fail_parts = {2}
+
+	with pytest.raises(uploads.UploadInterrupted) as e:
+		client.uploads.upload(content, 'file.bin', part_size=128, retries=0)
+	received = client.uploads.received(e.value.upload_id)
+	assert 2 not in received and {0, 1} <= received
+
+	upload_id = client.uploads.upload(content, 'file.bin', upload_id=e.value.upload_id, part_size=128)
+
+	assert upload_id == e.value.upload_id
+	assert server.uploaded(upload_id) == content
+	# only the missing parts are sent again
+	assert [path for method, path in server.requests if method == 'PUT'].count('/uploads/' + upload_id + '/0') == 1
+
+def test_refused_part_is_repeated(server, client):
+	content = os.urandom(1000)
+	server.fail_parts = {1}
+
+	upload_id = client.uploads.upload(content, part_size=128, retries=1)
+
+	assert server.uploaded(upload_id) == content
+
+def test_big_model_in_parts(server, client, data, requirements, monkeypatch):
+	monkeypatch.setattr(uploads, 'PART_SIZE', 16)
+
+	client.models.upload(ConstantModel(2), 'big', 'test model', 'y', ['test'], data, 'data', 'test dataset', requirements)
+
+	assert ('POST', '/uploads') in server.requests
+	assert pickle.loads(server._models['big']['pickle']).value == 2
+
+def test_big_model_without_uploads(server, client, data, requirements, monkeypatch, without):
+	monkeypatch.setattr(uploads, 'PART_SIZE', 16)
+	without('/uploads')
+
+	client.models.upload(ConstantModel(2), 'big', 'test model', 'y', ['test'], data, 'data', 'test dataset', requirements)
+
+	assert pickle.loads(server._models['big']['pickle']).value == 2
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_resume_model_upload(server, client, data, requirements, compress):
+	routes = server._routes
+
+	def complete(headers, body, upload_id):
+		# the connection drops when the training dataset is sent after the model
+		if server._uploads[upload_id]['name'].startswith('train_dataset'):
+			return 500, 'application/json', {'error': 'connection lost'}
+		return server._upload_complete(headers, body, upload_id)
+	server._routes = [(method, pattern, complete if pattern.endswith('/complete$') else handler) for method, pattern, handler in routes]
+
+	with pytest.raises(uploads.UploadInterrupted) as e:
+		client.models.upload(ConstantModel(2), 'big', 'test model', 'y', ['test'], data, 'data', 'test dataset', requirements, dedup=False, part_size=64, compress=compress)
+	assert set(e.value.resume) == {'model_upload_id', 'train_dataset_upload_id'}
+	server._routes = routes
+	parts = len([method for method, path in server.requests if method == 'PUT'])
+
+	client.models.upload(ConstantModel(2), 'big', 'test model', 'y', ['test'], data, 'data', 'test dataset', requirements, dedup=False, part_size=64, compress=compress, **e.value.resume)
+
+	# all parts were received before the interruption, none is sent again
+	assert len([method for method, path in server.requests if method == 'PUT']) == parts
+	assert client.models.predict('big', data.drop(columns='y')).iloc[0, 0] == 2
+
+def test_compressed_model(server, client, data, requirements):
+	client.models.upload(ConstantModel(3), 'compressed', 'test model', 'y', ['test'], data, 'data', 'test dataset', requirements, compress=True)
+
+	assert client.models.predict('compressed', data.drop(columns='y')).iloc[0, 0] == 3
@@ -1 +1,28 @@
-from . import users, models, datasets
+"""@package docstring
+The client of the **weles**
+
+Submodules and the client are imported on the first use, so importing weles alone does not load pandas or requests.
+"""
+
+from importlib import import_module
+
+# submodules imported on the first access to them
+_SUBMODULES = ('users', 'models', 'datasets', 'uploads', 'auth', 'client', 'cache', 'formats', 'concurrency', 'local', 'testing',
+	'instrumentation', 'schema', 'outbox')
+
+# attributes of the package defined in its submodules
+_ATTRIBUTES = {'Client': 'client', 'default_client': 'client', 'set_default_client': 'client'}
+
+__all__ = ['users', 'models', 'datasets', 'uploads', 'auth', 'Client', 'default_client', 'set_default_client']
+
+def __getattr__(name):
+	if name in _SUBMODULES:
+		return import_module('.' + name, __name__)
+	if name in _ATTRIBUTES:
+		value = getattr(import_module('.' + _ATTRIBUTES[name], __name__), name)
+		globals()[name] = value
+		return value
+	raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
+
+def __dir__():
+	return sorted(set(globals()) | set(_SUBMODULES) | set(_ATTRIBUTES))
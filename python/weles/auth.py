@@ -0,0 +1,198 @@
+"""@package docstring
+The module with authentication in the **weles**
+
+Credentials are exchanged once for a token, which is sent by all functions requiring authentication.
+The token is looked for in this order:
+	the client, after auth.login or passed as weles.Client(token=...)
+	WELES_TOKEN environment variable
+	the token file saved by auth.login(save=True)
+If there is no token, the client logs in with WELES_USER and WELES_PASSWORD environment variables
+or asks for the user name and password once.
+"""
+
+import os
+import json
+import time
+from getpass import getpass
+
+from .client import get_client
+
+# file with tokens saved by auth.login(save=True)
+TOKEN_FILE = os.path.join(os.path.expanduser('~'), '.weles', 'token.json')
+
+# tokens are refreshed when they expire in less than this number of seconds
+REFRESH_MARGIN = 60
+
+def login(user_name=None, password=None, save=False, client=None):
+	"""Log in to the **weles** and keep the token in the client.
+
+	Parameters
+	----------
+	user_name : string, optional
+		your user name, asked for if None
+	password : string, optional
+		your password, asked for if None
+	save : bool
+		if true then the token is saved in the token file and used by next sessions
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
+
+	Returns
+	-------
+	string
+		token, or None if the weles does not issue tokens and the credentials are sent with every request
+
+	Examples
+	--------
+	auth.login()
+		-> user: 'example_user'
+		-> password:
+
+	auth.login('example_user', os.environ['PASSWORD'], save=True)
+	"""
+
+	if user_name is None:
+		user_name = input('user: ')
+	if password is None:
+		password = getpass('password: ')
+
+	if not isinstance(user_name, str):
+		raise ValueError("user_name must be a string")
+	if not isinstance(password, str):
+		raise ValueError("password must be a string")
+	if not isinstance(save, bool):
+		raise ValueError("save must be a bool")
+
+	client = get_client(client)
+
+	credentials = {'user_name': user_name, 'password': password}
+
+	r = client.post('/users/login', data = credentials)
+	if r.status_code in (404, 405):
+		# the weles does not issue tokens, credentials will be sent with requests
+		client.credentials = credentials
+		return None
+	if not r.ok and client.credentials == credentials:
+		# rejected credentials are not sent again, e.g. by the refresh of the token
+		client.credentials = None
+	r.raise_for_status()
+
+	# kept only in memory, to log in again when the token cannot be refreshed
+	client.credentials = credentials
+	_set_token(client, r.json())
+	if save:
+		_save_token(client)
+
+	return client.token
+
+def logout(client=None):
+	"""Forget the token and credentials kept in the client and remove the token from the token file.
+
+	Parameters
+	----------
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
+
+	Examples
+	--------
+	auth.logout()
+	"""
+
+	client = get_client(client)
+
+	client.token = None
+	client.token_expires = None
+	client.credentials = None
+
+	tokens = _read_tokens()
+	if client.base_url in tokens:
+		del tokens[client.base_url]
+		_write_tokens(tokens)
+
+def fields(user_key='user_name', client=None):
+	"""Form fields authenticating the request, logging in if necessary.
+
+	Parameters
+	----------
+	user_key : string
+		name of the field with the user name, used only if the weles does not issue tokens
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
+
+	Returns
+	-------
+	dict
+		{'token': token} or {user_key: user name, 'password': password}
+	"""
+
+	client = get_client(client)
+
+	token = _token(client)
+	if token is not None:
+		return {'token': token}
+
+	if client.credentials is None:
+		login(os.environ.get('WELES_USER'), os.environ.get('WELES_PASSWORD'), client=client)
+		if client.token is not None:
+			return {'token': client.token}
+
+	return {user_key: client.credentials['user_name'], 'password': client.credentials['password']}
+
+def _token(client):
+	"""Valid token of the client or None"""
+
+	if client.token is None:
+		token = os.environ.get('WELES_TOKEN')
+		if token:
+			return token
+
+		saved = _read_tokens().get(client.base_url)
+		if saved is not None:
+			client.token = saved['token']
+			client.token_expires = saved['expires']
+
+	if client.token is not None and client.token_expires is not None and client.token_expires - time.time() < REFRESH_MARGIN:
+		_refresh(client)
+
+	return client.token
+
+def _refresh(client):
+	"""Exchange the expiring token for a new one, or log in again"""
+
+	r = client.post('/users/refresh', data = {'token': client.token})
+	if r.status_code == 200:
+		_set_token(client, r.json())
+		if client.base_url in _read_tokens():
+			_save_token(client)
+		return
+
+	client.token = None
+	client.token_expires = None
+	if client.credentials is not None:
+		login(client.credentials['user_name'], client.credentials['password'], client=client)
+
+def _set_token(client, response):
+	client.token = response['token']
+	expires_in = response.get('expires_in')
+	client.token_expires = None if expires_in is None else time.time() + expires_in
+
+def _read_tokens():
+	try:
+		with open(TOKEN_FILE) as f:
+			return json.load(f)
+	except (OSError, ValueError):
+		return {}
+
+def _write_tokens(tokens):
+	os.makedirs(os.path.dirname(TOKEN_FILE), exist_ok=True)
+
+	# the file is readable only by its owner
+	fd = os.open(TOKEN_FILE + '.tmp', os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+	with os.fdopen(fd, 'w') as f:
+		json.dump(tokens, f)
+	os.replace(TOKEN_FILE + '.tmp', TOKEN_FILE)
+
+def _save_token(client):
+	tokens = _read_tokens()
+	tokens[client.base_url] = {'token': client.token, 'expires': client.token_expires}
+	_write_tokens(tokens)
@@ -0,0 +1,385 @@
+"""@package docstring
+The module with caches used by the client of the **weles**
+"""
+
+import os
+import json
+import atexit
+import hashlib
+import time
+import weakref
+from collections import OrderedDict
+from threading import RLock, get_ident
+
+# metadata caches with files, changes written less often than persist_interval are flushed when python exits
+_persisted = weakref.WeakSet()
+
+@atexit.register
+def _flush_all():
+	for cache in list(_persisted):
+		cache.flush()
+
+class MetadataCache:
+	"""In-memory LRU cache of metadata responses with time to live, optionally persisted on the disk.
+
+	Every entry keeps the validators (ETag and Last-Modified) sent by the **weles**, so an expired
+	entry can be revalidated with a conditional request instead of being downloaded again.
+
+	Parameters
+	----------
+	maxsize : int
+		maximum number of cached responses, the least recently used are evicted first
+	ttl : float
+		number of seconds after which an entry has to be revalidated
+	path : string, optional
+		path to the json file in which the cache is persisted between sessions
+	persist_interval : float
+		minimum number of seconds between writes of the file, later changes are written by the next write,
+		flush or when python exits
+
+	Examples
+	--------
+	cache = MetadataCache(maxsize=1024, ttl=600, path='weles_metadata.json')
+
+	cache.invalidate('/models/example_model/info')
+
+	cache.invalidate()
+	"""
+
+	def __init__(self, maxsize=256, ttl=300, path=None, persist_interval=5):
+
+		if not isinstance(maxsize, int):
+			raise ValueError("maxsize must be an integer")
+		if not isinstance(ttl, (int, float)):
+			raise ValueError("ttl must be a number")
+		if path is not None and not isinstance(path, str):
+			raise ValueError("path must be a string")
+		if not isinstance(persist_interval, (int, float)):
+			raise ValueError("persist_interval must be a number")
+
+		self.maxsize = maxsize
+		self.ttl = ttl
+		self.path = path
+		self.persist_interval = persist_interval
+		self._entries = OrderedDict()
+		self._lock = RLock()
+		# the file is rewritten as a whole, so changes are written at most once per persist_interval
+		self._dirty = False
+		self._written = None
+
+		if path is not None:
+			_persisted.add(self)
+			if os.path.exists(path):
+				self.load()
+
+	def get(self, key):
+		"""Get the entry of the key, also the expired one, or None if it is not cached.
+
+		Returns
+		-------
+		dict
+			entry with fields: value, etag, last_modified, time
+		"""
+
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is not None:
+				self._entries.move_to_end(key)
+			return entry
+
+	def is_fresh(self, entry):
+		"""Check if the entry does not need revalidation"""
+		return time.time() - entry['time'] < self.ttl
+
+	def set(self, key, value, etag=None, last_modified=None):
+		"""Put the response into the cache"""
+
+		with self._lock:
+			self._entries[key] = {'value': value, 'etag': etag, 'last_modified': last_modified, 'time': time.time()}
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.maxsize:
+				self._entries.popitem(last=False)
+			self._persist()
+
+	def touch(self, key):
+		"""Mark the entry as fresh after successful revalidation"""
+
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is not None:
+				entry['time'] = time.time()
+				self._entries.move_to_end(key)
+				self._persist()
+
+	def invalidate(self, key=None):
+		"""Remove the key from the cache or clear the whole cache if key is None"""
+
+		with self._lock:
+			if key is None:
+				self._entries.clear()
+			else:
+				self._entries.pop(key, None)
+			self._persist()
+
+	def load(self):
+		"""Load the cache from its file"""
+
+		with self._lock:
+			try:
+				with open(self.path) as f:
+					entries = json.load(f)
+			except (OSError, ValueError):
+				# unreadable cache is just an empty one
+				return
+			self._entries = OrderedDict(entries)
+			while len(self._entries) > self.maxsize:
+				self._entries.popitem(last=False)
+
+	def flush(self):
+		"""Write changes of the cache to its file"""
+
+		with self._lock:
+			if self.path is None or not self._dirty:
+				return
+
+			# writing to the temporary file first, so other processes never read a partial cache
+			tmp = self.path + '.' + str(os.getpid()) + '.tmp'
+			with open(tmp, 'w') as f:
+				json.dump(list(self._entries.items()), f)
+			os.replace(tmp, self.path)
+			self._dirty = False
+			self._written = time.monotonic()
+
+	def _persist(self):
+		if self.path is None:
+			return
+
+		self._dirty = True
+		if self._written is None or time.monotonic() - self._written >= self.persist_interval:
+			self.flush()
+
+	def __len__(self):
+		return len(self._entries)
+
+	def __contains__(self, key):
+		return key in self._entries
+
+class DatasetCache:
+	"""Content addressed cache of datasets in the local directory with the least recently used eviction.
+
+	Datasets in the weles are identified by hashes of their content, so a cached dataset never gets outdated.
+	They are stored in the Arrow IPC (feather) format and memory-mapped on read if pyarrow is installed,
+	otherwise as pickles. Files are written atomically, so many processes on one host can share the directory.
+
+	Parameters
+	----------
+	directory : string
+		path to the cache directory, it is created if it does not exist
+	max_bytes : int
+		maximum size of all cached files, the least recently read datasets are removed first
+
+	Examples
+	--------
+	cache = DatasetCache('/tmp/weles_datasets', max_bytes=10 * 2**30)
+
+	cache.get('aaaaaaaaaaaaaaaaaaaaaaaaa')
+
+	cache.clear()
+	"""
+
+	def __init__(self, directory, max_bytes=2**30):
+
+		if not isinstance(directory, str):
+			raise ValueError("directory must be a string")
+		if not isinstance(max_bytes, int):
+			raise ValueError("max_bytes must be an integer")
+
+		self.directory = directory
+		self.max_bytes = max_bytes
+
+		os.makedirs(directory, exist_ok=True)
+
+		try:
+			import pyarrow.feather
+			self.extension = '.feather'
+		except ImportError:
+			self.extension = '.pkl'
+
+	def path(self, dataset_id):
+		"""Path to the file of the cached dataset"""
+		return os.path.join(self.directory, dataset_id + self.extension)
+
+	def get(self, dataset_id):
+		"""Read the cached dataset.
+
+		Returns
+		-------
+		pandas.DataFrame
+			cached dataset or None if it is not in the cache
+		"""
+
+		path = self.path(dataset_id)
+		try:
+			data = self._read(path)
+			# reading makes the dataset the most recently used
+			os.utime(path)
+		except FileNotFoundError:
+			return None
+		return data
+
+	def __contains__(self, dataset_id):
+		return os.path.exists(self.path(dataset_id))
+
+	def put(self, dataset_id, data):
+		"""Write the dataset into the cache and evict the least recently used ones if it is too big"""
+
+		path = self.path(dataset_id)
+		tmp = path + '.' + str(os.getpid()) + '.' + str(get_ident()) + '.tmp'
+		try:
+			self._write(data, tmp)
+			os.replace(tmp, path)
+		finally:
+			if os.path.exists(tmp):
+				os.remove(tmp)
+
+		self.evict()
+
+	def evict(self):
+		"""Remove the least recently used datasets until the cache fits in max_bytes"""
+
+		entries = []
+		for name in os.listdir(self.directory):
+			if not name.endswith(self.extension):
+				continue
+			try:
+				stat = os.stat(os.path.join(self.directory, name))
+			except FileNotFoundError:
+				continue
+			entries.append((stat.st_mtime, stat.st_size, name))
+
+		total = sum(size for _, size, _ in entries)
+		for _, size, name in sorted(entries):
+			if total <= self.max_bytes:
+				break
+			try:
+				os.remove(os.path.join(self.directory, name))
+			except FileNotFoundError:
+				# already removed by another process
+				pass
+			total -= size
+
+	def clear(self):
+		"""Remove all cached datasets"""
+
+		for name in os.listdir(self.directory):
+			if name.endswith(self.extension):
+				try:
+					os.remove(os.path.join(self.directory, name))
+				except FileNotFoundError:
+					pass
+
+	def _read(self, path):
+		if self.extension == '.feather':
+			import pyarrow.feather
+			return pyarrow.feather.read_table(path, memory_map=True).to_pandas()
+
+		import pandas as pd
+		return pd.read_pickle(path)
+
+	def _write(self, data, path):
+		if self.extension == '.feather':
+			import pyarrow.feather
+			# uncompressed, so reading can map the file instead of decompressing it
+			pyarrow.feather.write_feather(data.reset_index(drop=True), path, compression='uncompressed')
+		else:
+			data.to_pickle(path)
+
+class PredictionCache:
+	"""Cache of predictions of models, in-memory LRU with an optional tier in the local directory.
+
+	Predictions are identified by the name and version of the model, the hash of the input and the type of the
+	prediction, see PredictionCache.key. The version changes with the metadata of the model, so predictions of
+	the replaced model are never returned and are evicted as the least recently used.
+
+	Parameters
+	----------
+	maxsize : int
+		maximum number of predictions kept in memory
+	directory : string, optional
+		path to the directory in which all predictions are written, so they outlive the process and can be shared
+		by many processes, only memory is used if None
+	max_bytes : int
+		maximum size of the predictions in the directory, the least recently read are removed first
+
+	Examples
+	--------
+	cache = PredictionCache(maxsize=64, directory='/tmp/weles_predictions')
+
+	cache.clear()
+	"""
+
+	def __init__(self, maxsize=128, directory=None, max_bytes=2**30):
+
+		if not isinstance(maxsize, int) or maxsize < 0:
+			raise ValueError("maxsize must be a non negative integer")
+		if directory is not None and not isinstance(directory, str):
+			raise ValueError("directory must be a string")
+
+		self.maxsize = maxsize
+		self._entries = OrderedDict()
+		self._lock = RLock()
+		self.disk = None if directory is None else _PickleCache(directory, max_bytes=max_bytes)
+
+	@staticmethod
+	def key(model_name, version, input_hash, pred_type):
+		"""Key of the prediction of the model version on the input with the given hash"""
+		return hashlib.sha256('\n'.join((model_name, version, input_hash, pred_type)).encode('utf-8')).hexdigest()
+
+	def get(self, key):
+		"""Get the cached prediction or None, the prediction read from the directory is moved to memory"""
+
+		with self._lock:
+			data = self._entries.get(key)
+			if data is not None:
+				self._entries.move_to_end(key)
+				return data.copy()
+
+		if self.disk is None:
+			return None
+		data = self.disk.get(key)
+		if data is not None:
+			self._remember(key, data)
+			return data.copy()
+		return None
+
+	def put(self, key, data):
+		"""Put the prediction into the cache"""
+
+		self._remember(key, data.copy())
+		if self.disk is not None:
+			self.disk.put(key, data)
+
+	def clear(self):
+		"""Remove all cached predictions"""
+
+		with self._lock:
+			self._entries.clear()
+		if self.disk is not None:
+			self.disk.clear()
+
+	def _remember(self, key, data):
+		with self._lock:
+			self._entries[key] = data
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.maxsize:
+				self._entries.popitem(last=False)
+
+	def __len__(self):
+		return len(self._entries)
+
+class _PickleCache(DatasetCache):
+	"""DatasetCache storing data frames as pickles, which keep column names of predictions as they are"""
+
+	def __init__(self, directory, max_bytes=2**30):
+		super().__init__(directory, max_bytes=max_bytes)
+		self.extension = '.pkl'
@@ -0,0 +1,307 @@
+"""@package docstring
+The module with the HTTP client used for communication with the **weles**
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from functools import partial
+from types import FunctionType
+from importlib import import_module
+import inspect
+from threading import Lock
+from copy import deepcopy
+
+from .cache import MetadataCache, DatasetCache, PredictionCache
+from . import instrumentation
+from .formats import check_format
+
+# address of the weles base used when no other is given
+DEFAULT_URL = 'http://192.168.137.64'
+
+class Client:
+	"""Client owning a pooled HTTP session to the **weles**.
+
+	All functions from the `models`, `datasets`, `users`, `uploads` and `auth` modules are available as methods
+	of the attributes of the client with the same names.
+
+	Parameters
+	----------
+	base_url : string
+		address of the weles base
+	pool_connections : int
+		number of connection pools to cache
+	pool_maxsize : int
+		maximum number of connections kept alive in the pool
+	timeout : float or tuple, optional
+		timeout in seconds passed to every request, may be a (connect, read) tuple
+	retries : int
+		number of retries of failed idempotent requests
+	backoff_factor : float
+		factor of the exponential backoff between retries
+	metadata_ttl : float
+		number of seconds for which fetched metadata of models is used without asking the weles
+	metadata_maxsize : int
+		maximum number of cached metadata responses
+	metadata_path : string, optional
+		path to the json file in which cached metadata is persisted between sessions, written at most every 5 seconds,
+		when the client is closed and when python exits
+	payload_format : string
+		format of data frames sent to and requested from the weles: 'csv', 'csv.gz', 'csv.zst', 'parquet' or 'arrow',
+		data frames are received in the format chosen by the weles
+	dataset_cache_dir : string, optional
+		path to the directory in which downloaded datasets are cached, the cache is off if None
+	dataset_cache_size : int
+		maximum number of bytes of cached datasets
+	prediction_cache_size : int
+		number of results of models.predict kept in memory, see weles.cache.PredictionCache
+	prediction_cache_dir : string, optional
+		path to the directory in which results of models.predict are cached, predictions are cached only if it is
+		given or prediction_cache_size is positive
+	token : string, optional
+		token authenticating requests, see weles.auth
+
+	Examples
+	--------
+	client = weles.Client(pool_maxsize=32, timeout=(3, 60))
+
+	client.models.predict('example_model', iris.drop(columns='Species'))
+
+	client.models.info('example_model')
+	"""
+
+	def __init__(self, base_url=DEFAULT_URL, pool_connections=10, pool_maxsize=10, timeout=None, retries=3, backoff_factor=0.3, metadata_ttl=300, metadata_maxsize=256, metadata_path=None, payload_format='csv', dataset_cache_dir=None, dataset_cache_size=2**30, prediction_cache_size=0, prediction_cache_dir=None, token=None):
+
+		if not isinstance(base_url, str):
+			raise ValueError("base_url must be a string")
+		if not isinstance(pool_connections, int):
+			raise ValueError("pool_connections must be an integer")
+		if not isinstance(pool_maxsize, int):
+			raise ValueError("pool_maxsize must be an integer")
+		if not isinstance(retries, int):
+			raise ValueError("retries must be an integer")
+		if not isinstance(prediction_cache_size, int):
+			raise ValueError("prediction_cache_size must be an integer")
+
+		check_format(payload_format)
+
+		self.base_url = base_url.rstrip('/')
+		self.payload_format = payload_format
+		self.timeout = timeout
+
+		# retrying only idempotent requests on connection errors and unavailable server
+		retry = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=(502, 503, 504), raise_on_status=False)
+		adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+
+		self.session = requests.Session()
+		self.session.mount('http://', adapter)
+		self.session.mount('https://', adapter)
+
+		self.metadata_cache = MetadataCache(maxsize=metadata_maxsize, ttl=metadata_ttl, path=metadata_path)
+		self.dataset_cache = None if dataset_cache_dir is None else DatasetCache(dataset_cache_dir, max_bytes=dataset_cache_size)
+		self.prediction_cache = None
+		if prediction_cache_size > 0 or prediction_cache_dir is not None:
+			self.prediction_cache = PredictionCache(maxsize=prediction_cache_size, directory=prediction_cache_dir)
+		# compiled input schemas of models, model names mapped to (version, weles.schema.Schema)
+		self.schemas = {}
+		# endpoints probed by supports, (method, path) mapped to bool
+		self.endpoints = {}
+
+		# authentication state managed by weles.auth
+		self.token = token
+		self.token_expires = None
+		self.credentials = None
+
+		# modules are imported on the first use
+		self.users = _Namespace('users', self)
+		self.models = _Namespace('models', self)
+		self.datasets = _Namespace('datasets', self)
+		self.uploads = _Namespace('uploads', self)
+		self.auth = _Namespace('auth', self)
+
+	def url(self, path):
+		"""Get the full address of the path in the weles"""
+		return self.base_url + path
+
+	def request(self, method, path, **kwargs):
+		"""Send the request to the weles using the pooled session.
+
+		Parameters
+		----------
+		method : string
+			HTTP method
+		path : string
+			path of the endpoint, starting with '/'
+		**kwargs
+			passed to requests.Session.request
+
+		Returns
+		-------
+		requests.Response
+			response of the weles
+		"""
+
+		kwargs.setdefault('timeout', self.timeout)
+
+		with instrumentation.phase('network'):
+			r = self.session.request(method, self.url(path), **kwargs)
+		instrumentation.record_response(r)
+
+		return r
+
+	def get(self, path, **kwargs):
+		"""Send the GET request to the weles"""
+		return self.request('GET', path, **kwargs)
+
+	def post(self, path, **kwargs):
+		"""Send the POST request to the weles"""
+		return self.request('POST', path, **kwargs)
+
+	def supports(self, method, path):
+		"""Check if the weles serves the endpoint, the weles is asked once and the answer is remembered.
+
+		The request is sent without any payload, every answer other than 404 and 405 means that the endpoint exists.
+
+		Parameters
+		----------
+		method : string
+			HTTP method
+		path : string
+			path of the endpoint, starting with '/'
+
+		Returns
+		-------
+		bool
+			true if the weles serves the endpoint
+		"""
+
+		key = (method, path)
+		if key not in self.endpoints:
+			self.endpoints[key] = self.request(method, path).status_code not in (404, 405)
+		return self.endpoints[key]
+
+	def get_json(self, path, **kwargs):
+		"""Get the json response of the weles using the metadata cache.
+
+		Fresh cached responses are returned without any request. Expired ones are revalidated
+		with If-None-Match/If-Modified-Since headers if the weles sent validators.
+
+		Parameters
+		----------
+		path : string
+			path of the endpoint, starting with '/'
+		**kwargs
+			passed to requests.Session.request
+
+		Returns
+		-------
+		dict
+			copy of the decoded response
+		"""
+
+		cache = self.metadata_cache
+		entry = cache.get(path)
+		if entry is not None and cache.is_fresh(entry):
+			return deepcopy(entry['value'])
+
+		headers = dict(kwargs.pop('headers', None) or {})
+		if entry is not None:
+			if entry['etag'] is not None:
+				headers['If-None-Match'] = entry['etag']
+			if entry['last_modified'] is not None:
+				headers['If-Modified-Since'] = entry['last_modified']
+
+		r = self.get(path, headers=headers, **kwargs)
+
+		if r.status_code == 304 and entry is not None:
+			# cached response is still valid
+			cache.touch(path)
+			return deepcopy(entry['value'])
+
+		value = r.json()
+		if r.status_code == 200:
+			cache.set(path, value, r.headers.get('ETag'), r.headers.get('Last-Modified'))
+			value = deepcopy(value)
+
+		return value
+
+	def close(self):
+		"""Close all pooled connections and write the metadata cache to its file"""
+		self.session.close()
+		self.metadata_cache.flush()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+class _Namespace:
+	"""Module of the weles with all functions bound to the client"""
+
+	def __init__(self, module_name, client):
+		self._module_name = module_name
+		self._client = client
+
+	@property
+	def _module(self):
+		return import_module('.' + self._module_name, __package__)
+
+	def __getattr__(self, name):
+		if name.startswith('_'):
+			raise AttributeError(name)
+		attr = getattr(self._module, name)
+		if isinstance(attr, FunctionType) and getattr(attr, '__module__', None) == self._module.__name__ and _takes_client(attr):
+			return partial(attr, client=self._client)
+		return attr
+
+	def __dir__(self):
+		return [name for name, attr in vars(self._module).items()
+			if not name.startswith('_') and isinstance(attr, FunctionType) and attr.__module__ == self._module.__name__]
+
+def _takes_client(function):
+	"""Check if the function has the client parameter"""
+	code = inspect.unwrap(function).__code__
+	return 'client' in code.co_varnames[:code.co_argcount + code.co_kwonlyargcount]
+
+_default_client = None
+_default_lock = Lock()
+
+def default_client():
+	"""Get the client used by the module level functions, it is created on the first use"""
+
+	global _default_client
+	if _default_client is None:
+		with _default_lock:
+			if _default_client is None:
+				_default_client = Client()
+	return _default_client
+
+def set_default_client(client):
+	"""Set the client used by the module level functions.
+
+	Parameters
+	----------
+	client : weles.Client
+		client that will be used by default
+
+	Examples
+	--------
+	weles.set_default_client(weles.Client('http://localhost:5000', pool_maxsize=32))
+	"""
+
+	if not isinstance(client, Client):
+		raise ValueError("client must be a weles.Client")
+
+	global _default_client
+	with _default_lock:
+		_default_client = client
+
+def get_client(client=None):
+	"""Return given client or the default one if it is None"""
+
+	if client is None:
+		return default_client()
+	if not isinstance(client, Client):
+		raise ValueError("client must be a weles.Client")
+	return client
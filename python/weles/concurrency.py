@@ -0,0 +1,121 @@
+"""@package docstring
+The module with helpers running requests to the **weles** concurrently
+"""
+
+import time
+import asyncio
+from collections import deque
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from . import instrumentation
+
+def call_with_retries(function, args, retries=0, backoff_factor=0.5):
+	"""Call the function, repeating it after failed communication with the weles.
+
+	Parameters
+	----------
+	function : callable
+		function to call
+	args : tuple
+		arguments of the function
+	retries : int
+		number of repetitions after requests.RequestException, the last exception is raised
+	backoff_factor : float
+		the n-th repetition is made after backoff_factor * 2 ** (n - 1) seconds
+
+	Returns
+	-------
+	object
+		result of the function
+	"""
+
+	attempt = 0
+	while True:
+		try:
+			return function(*args)
+		except requests.RequestException:
+			if attempt >= retries:
+				raise
+			instrumentation.count('retries')
+			time.sleep(backoff_factor * 2 ** attempt)
+			attempt += 1
+
+def imap(function, items, max_workers=1, retries=0, backoff_factor=0.5):
+	"""Apply the function to items in the thread pool, yielding results in the order of items.
+
+	At most 2 * max_workers items are taken from the iterable ahead of the consumer, so memory
+	stays bounded for arbitrarily long iterables.
+
+	Parameters
+	----------
+	function : callable
+		function of one argument
+	items : iterable
+		arguments of the function
+	max_workers : int
+		number of calls running at once
+	retries : int
+		number of repetitions of every failed call, see call_with_retries
+	backoff_factor : float
+		factor of the exponential backoff between repetitions
+
+	Returns
+	-------
+	generator
+		results of the function
+	"""
+
+	if max_workers == 1:
+		for item in items:
+			yield call_with_retries(function, (item,), retries, backoff_factor)
+		return
+
+	with ThreadPoolExecutor(max_workers) as pool:
+		pending = deque()
+		try:
+			for item in items:
+				# calls in threads are measured in the span of the calling function
+				pending.append(pool.submit(copy_context().run, call_with_retries, function, (item,), retries, backoff_factor))
+				if len(pending) >= 2 * max_workers:
+					yield pending.popleft().result()
+			while pending:
+				yield pending.popleft().result()
+		finally:
+			# failure of one call or early stop of the consumer cancels everything not started
+			for future in pending:
+				future.cancel()
+
+# marks the end of items taken by aimap
+_END = object()
+
+async def aimap(function, items, max_workers=1, retries=0, backoff_factor=0.5):
+	"""Asynchronous version of imap, the calls are run in threads with at most max_workers outstanding.
+
+	Items are also taken from the iterable in a thread, so reading them, e.g. chunks of a csv file, does not block the event loop.
+
+	Returns
+	-------
+	async generator
+		results of the function in the order of items
+	"""
+
+	loop = asyncio.get_running_loop()
+	items = iter(items)
+	with ThreadPoolExecutor(max_workers) as pool:
+		pending = deque()
+		try:
+			while True:
+				item = await loop.run_in_executor(None, copy_context().run, next, items, _END)
+				if item is _END:
+					break
+				pending.append(loop.run_in_executor(pool, copy_context().run, call_with_retries, function, (item,), retries, backoff_factor))
+				if len(pending) >= max_workers:
+					yield await pending.popleft()
+			while pending:
+				yield await pending.popleft()
+		finally:
+			for future in pending:
+				future.cancel()
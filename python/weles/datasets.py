@@ -1,21 +1,31 @@
 """@package docstring
 The module with functions related to datasets in the **weles**
+
+Growing datasets are uploaded as deltas. The weles describes the stored dataset by hashes of its blocks of rows:
+	GET  /datasets/<dataset_id>/blocks  returns {'rows': ..., 'block_rows': ..., 'blocks': [hashes]}
+	POST /datasets/append               stores the base dataset with appended rows, returns the hash of the new dataset
+A block is hashed the same way as the whole dataset, see datasets.block_hashes.
 """
 
-import sys
-import requests
-import pickle
-import os
-import pandas as pd
-import platform
-import re
-from io import StringIO
+import json
+import hashlib
+import shutil
 from datetime import datetime
-from getpass import getpass
 
-def upload(data, data_name, data_desc):
+from .client import get_client
+from .instrumentation import instrumented
+from . import formats, auth, instrumentation
+from .concurrency import imap
+
+# rows of one hashed block, if the weles does not give it
+BLOCK_ROWS = 10000
+
+@instrumented
+def upload(data, data_name, data_desc, dedup=False, base_dataset_id=None, strict=False, client=None):
 	"""Upload data to **weles**.
 
+	Requires logging in, see weles.auth.
+
 	Parameters
 	----------
 	data : array-like/string
@@ -24,6 +34,15 @@ def upload(data, data_name, data_desc):
 		name of the dataset that will be visible in the weles base
 	data_desc : string
 		desciprtion of the data
+	dedup : bool
+		if true and the same data is already in the weles then only its hash is sent with data_name and data_desc
+	base_dataset_id : string, optional
+		hash of the dataset in the weles which data extends, if data starts with all its rows then only the
+		added rows are sent with datasets.append, otherwise the whole data is uploaded
+	strict : bool
+		if true then the refused upload raises requests.HTTPError instead of returning the information from the weles
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
 
 	Returns
 	-------
@@ -33,12 +52,13 @@ def upload(data, data_name, data_desc):
 	Examples
 	--------
 	datasets.upload(iris, 'iris', 'Example dataset')
-		-> user: 'example_user'
-		-> password:
+
+	datasets.upload(sales, 'sales', 'Sales until today', base_dataset_id='aaaaaaaaaaaaaaaaaaaaaaa')
+
+	datasets.upload(iris, 'iris_copy', 'Example dataset under another name', dedup=True)
 	"""
 
-	user_name = input('user: ')
-	password = getpass('password: ')
+	import pandas as pd
 
 	if not isinstance(data, (str, pd.DataFrame)):
 		raise ValueError("data must be a string or a data frame")
@@ -46,42 +66,196 @@ def upload(data, data_name, data_desc):
 		raise ValueError("data_name must be a string")
 	if not isinstance(data_desc, str):
 		raise ValueError("data_desc must be a string")
-	if not isinstance(user_name, str):
-		raise ValueError("user_name must be a string")
-	if not isinstance(password, str):
-		raise ValueError("password must be a string")
+	if base_dataset_id is not None and (not isinstance(base_dataset_id, str) or len(base_dataset_id) != 64):
+		raise ValueError("base_dataset_id must be a 64 character long string")
+	if not isinstance(strict, bool):
+		raise ValueError("strict must be a boolean")
+
+	client = get_client(client)
 
 	# url to post
-	url = 'http://192.168.137.64/datasets/post'
+	url = '/datasets/post'
 
 	# timestamp for temporary files
 	timestamp = str(datetime.now().timestamp())
 
 	# uploading data
-	info = {'user_name': user_name, 'password': password, 'data_name': data_name, 'data_desc': data_desc}
+	info = {'data_name': data_name, 'data_desc': data_desc}
+	info.update(auth.fields(client=client))
+	files = {}
 
 	if type(data) == str:
 		# case when data is a path
-
 		data = pd.read_csv(data)
-		info['data'] = data.to_csv(index=False)
-
-		# request
-		r = requests.post(url, data=info)
 	else:
 		# case when data is an object
 
 		# conversion to pandas data frame
 		data = pd.DataFrame(data)
 
-		info['data'] = data.to_csv(index=False)
+	dataset_id = uploaded_hash(data, client=client) if dedup else None
+
+	if dataset_id is None and base_dataset_id is not None:
+		new_rows = _added_rows(data, base_dataset_id, client)
+		if new_rows is not None and new_rows.shape[0] == 0:
+			return base_dataset_id
+		if new_rows is not None:
+			# only rows missing in the weles are sent
+			return append(base_dataset_id, new_rows, data_name, data_desc, client=client)
+
+	if dataset_id is not None:
+		# the same data is already in the weles, it is given the name by its hash
+		info['is_hash'] = 1
+		info['hash'] = dataset_id
+	else:
+		formats.attach(info, files, 'data', data, client.payload_format)
+
+	# request
+	r = client.post(url, data = info, files = files)
+
+	if strict:
+		r.raise_for_status()
+
+	return r.text
+
+@instrumented
+def append(base_dataset_id, new_rows, data_name=None, data_desc=None, client=None):
+	"""Create the dataset made of the dataset in the **weles** and new rows, sending only the new rows.
+
+	Requires logging in, see weles.auth.
+
+	Parameters
+	----------
+	base_dataset_id : string
+		hash of the extended dataset
+	new_rows : pandas.DataFrame
+		rows appended to the dataset, with the same columns
+	data_name : string, optional
+		name of the new dataset that will be visible in the weles base
+	data_desc : string, optional
+		description of the new dataset
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
+
+	Returns
+	-------
+	string
+		hash of the new dataset
 
-		# request
-		r = requests.post(url, data = info)
+	Examples
+	--------
+	datasets.append('aaaaaaaaaaaaaaaaaaaaaaa', todays_sales)
+
+	datasets.append('aaaaaaaaaaaaaaaaaaaaaaa', todays_sales, 'sales', 'Sales until today')
+	"""
+
+	import pandas as pd
+
+	if not isinstance(base_dataset_id, str) or len(base_dataset_id) != 64:
+		raise ValueError("base_dataset_id must be a 64 character long string")
+	if not isinstance(new_rows, pd.DataFrame):
+		raise ValueError("new_rows must be a pandas.DataFrame")
+	if data_name is not None and not isinstance(data_name, str):
+		raise ValueError("data_name must be a string")
+	if data_desc is not None and not isinstance(data_desc, str):
+		raise ValueError("data_desc must be a string")
+
+	client = get_client(client)
+
+	# raw cached metadata, datasets never change
+	base_info = client.get_json('/datasets/' + base_dataset_id + '/info')
+	columns = [column['name'] for column in sorted(base_info['columns'], key=lambda column: column['id'])]
+	if [str(column) for column in new_rows.columns] != columns:
+		raise ValueError("new_rows must have the columns of the base dataset: " + ', '.join(columns))
+
+	info = {'base_dataset_id': base_dataset_id}
+	if data_name is not None:
+		info['data_name'] = data_name
+		info['data_desc'] = data_desc or ''
+	info.update(auth.fields(client=client))
+	files = {}
+
+	formats.attach(info, files, 'data', new_rows, client.payload_format)
+
+	r = client.post('/datasets/append', data = info, files = files)
+
+	if r.status_code in (404, 405):
+		# the weles does not append datasets, the whole dataset is uploaded
+		if data_name is None:
+			aliases = base_info.get('aliases') or [{'name': base_dataset_id, 'desc': ''}]
+			data_name, data_desc = aliases[-1]['name'], aliases[-1]['desc'] or ''
+		r = client.get('/datasets/' + base_dataset_id, headers = {'Accept': formats.accept(client.payload_format)})
+		r.raise_for_status()
+		# floats are parsed exactly, so the uploaded dataset starts with the very rows of the base one
+		data = pd.concat([formats.read_response(r, float_precision='round_trip'), new_rows], ignore_index=True)
+		return upload(data, data_name, data_desc or '', client=client)
+
+	r.raise_for_status()
 
 	return r.text
 
-def head(dataset_id, n=5):
+def block_hashes(data, block_rows=BLOCK_ROWS):
+	"""Compute hashes of consecutive blocks of rows of the dataset.
+
+	Every block is hashed as datasets.content_hash hashes the whole dataset, the last block may be shorter.
+
+	Parameters
+	----------
+	data : pandas.DataFrame
+		dataset
+	block_rows : int
+		number of rows in one block
+
+	Returns
+	-------
+	list
+		64 character long hashes of the blocks
+
+	Examples
+	--------
+	datasets.block_hashes(iris, block_rows=50)
+	"""
+
+	import pandas as pd
+
+	if not isinstance(data, pd.DataFrame):
+		raise ValueError("data must be a pandas.DataFrame")
+	if not isinstance(block_rows, int) or block_rows < 1:
+		raise ValueError("block_rows must be a positive integer")
+
+	with instrumentation.phase('hash'):
+		return [_block_hash(data.iloc[start:start + block_rows]) for start in range(0, data.shape[0], block_rows)]
+
+def _block_hash(block):
+	return hashlib.sha256(block.to_csv(index=False).encode('utf-8')).hexdigest()
+
+def _added_rows(data, base_dataset_id, client):
+	"""Rows of data following all rows of the base dataset, None if data does not start with them"""
+
+	try:
+		blocks = client.get_json('/datasets/' + base_dataset_id + '/blocks')
+	except ValueError:
+		# the weles does not describe blocks of datasets
+		return None
+	if not isinstance(blocks, dict) or 'blocks' not in blocks:
+		return None
+
+	rows = blocks['rows']
+	block_rows = blocks.get('block_rows', BLOCK_ROWS)
+	if data.shape[0] < rows:
+		return None
+
+	with instrumentation.phase('hash'):
+		# blocks are compared one by one, hashing stops at the first difference
+		for number, expected in enumerate(blocks['blocks']):
+			start = number * block_rows
+			if _block_hash(data.iloc[start:min(start + block_rows, rows)]) != expected:
+				return None
+
+	return data.iloc[rows:]
+
+@instrumented
+def head(dataset_id, n=5, client=None):
 	"""View the head of the dataset.
 
 	Parameters
@@ -90,6 +264,8 @@ def head(dataset_id, n=5):
 		hash of the dataset
 	n : int
 		number of rows to show
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
 
 	Returns
 	-------
@@ -112,46 +288,234 @@ def head(dataset_id, n=5):
 	if not isinstance(n, int):
 		raise ValueError("n must be an integer")
 
-	r = requests.get('http://192.168.137.64/datasets/' + dataset_id + '/head', data = {'n': n})
+	client = get_client(client)
+
+	if client.dataset_cache is not None:
+		# answering from the local copy of the whole dataset
+		data = client.dataset_cache.get(dataset_id)
+		if data is not None:
+			return data.head(n)
+
+	r = client.get('/datasets/' + dataset_id + '/head', data = {'n': n}, headers = {'Accept': formats.accept(client.payload_format)})
 
-	return pd.read_csv(StringIO(r.text))
+	return formats.read_response(r)
 
-def get(dataset_id):
+@instrumented
+def get(dataset_id, chunksize=None, path=None, columns=None, offset=None, limit=None, sample=None, seed=None, filters=None, client=None):
 	"""Get dataset from the **weles** as dataframe.
 
+	The dataset is streamed from the weles straight into the parser, without keeping the whole response in memory.
+	Columns, rows, samples and filters are applied by the weles, so only the selected data is sent. If the weles
+	does not support them, or the dataset is in the local cache, they are applied locally with the same result.
+	Rows are first filtered, then sampled, then sliced with offset and limit.
+
 	Parameters
 	----------
 	dataset_id : string
 		hash of the dataset
+	chunksize : int, optional
+		if given then an iterator of data frames with that many rows is returned
+	path : string, optional
+		if given then the dataset is written to this file in the format sent by the weles (csv by default) instead of being parsed
+	columns : list, optional
+		names of the columns to get, all if None
+	offset : int, optional
+		number of rows to skip
+	limit : int, optional
+		maximum number of rows to get, all if None
+	sample : int/float, optional
+		number of randomly chosen rows or, if it is a float between 0 and 1, their fraction, rows keep their order
+	seed : int, optional
+		seed of the random sample, the same seed gives the same sample
+	filters : list, optional
+		conditions which all rows must satisfy, tuples (column, operator, value), operators are: ==, !=, <, <=, >, >=, in, not in
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
 
 	Returns
 	-------
-	pandas.DataFrame
-		pandas Data Frame containing the requested dataset
+	pandas.DataFrame/iterator/string
+		pandas Data Frame containing the requested dataset, read from the local cache if the client has one,
+		iterator of data frames if chunksize is given or path if the dataset was written to the file
 
 	Examples
 	--------
 	datasets.get('aaaaaaaaaaaaaaaaaaaaaaa')
 
 	datasets.get(models.info('example_model')['data']['dataset_id'])
+
+	datasets.get('aaaaaaaaaaaaaaaaaaaaaaa', columns=['age', 'income'], limit=1000)
+
+	datasets.get('aaaaaaaaaaaaaaaaaaaaaaa', columns=['age', 'income'], sample=0.01, seed=0)
+
+	datasets.get('aaaaaaaaaaaaaaaaaaaaaaa', filters=[('age', '>=', 18), ('country', 'in', ['PL', 'DE'])], offset=100, limit=100)
+
+	for chunk in datasets.get('aaaaaaaaaaaaaaaaaaaaaaa', chunksize=100000):
+		process(chunk)
+
+	datasets.get('aaaaaaaaaaaaaaaaaaaaaaa', path='data/train.csv')
 	"""
 
+	import pandas as pd
+
 	if not isinstance(dataset_id, str):
 		raise ValueError("dataset_id must be a string")
 	if not len(dataset_id) == 64:
 		raise ValueError("dataset_id must be 64 character long")
+	if chunksize is not None and (not isinstance(chunksize, int) or chunksize < 1):
+		raise ValueError("chunksize must be a positive integer")
+	if path is not None and not isinstance(path, str):
+		raise ValueError("path must be a string")
+
+	query = _query(columns, offset, limit, sample, seed, filters)
+
+	client = get_client(client)
+
+	cache = client.dataset_cache
+	if cache is not None and path is None:
+		# datasets are immutable, cached copy is always valid
+		data = cache.get(dataset_id)
+		if data is not None:
+			return _chunked(_select(data, **query), chunksize)
+
+	params = {name: json.dumps(value) for name, value in query.items() if value is not None}
+	r = client.get('/datasets/' + dataset_id, params = params, headers = {'Accept': formats.accept(client.payload_format)}, stream = True)
+	r.raise_for_status()
+
+	# the weles which does not support selections sends the whole dataset, it is selected locally
+	unapplied = len(params) > 0 and r.headers.get('X-Weles-Query') != 'applied'
+
+	if path is not None:
+		if unapplied:
+			with r:
+				_select(formats.read_response(r), **query).to_csv(path, index=False)
+			return path
+		with r, open(path, 'wb') as f:
+			r.raw.decode_content = True
+			shutil.copyfileobj(r.raw, f)
+		return path
+
+	stream = formats.stream_reader(r)
+
+	if stream is None:
+		# binary columnar formats are parsed as a whole
+		with r:
+			data = formats.read_response(r)
+		if cache is not None and len(params) == 0:
+			cache.put(dataset_id, data)
+		return _chunked(_select(data, **query) if unapplied else data, chunksize)
+
+	arguments = {}
+	if unapplied and query['filters'] is None and query['sample'] is None:
+		# columns and rows are skipped by the parser, which keeps columns in the order of the file
+		offset = query['offset'] or 0
+		arguments = {'usecols': query['columns'], 'skiprows': range(1, offset + 1) if offset else None, 'nrows': query['limit']}
+		unapplied = False
+
+	if chunksize is not None and not unapplied:
+		return _read_chunks(r, stream, chunksize, query['columns'], **arguments)
+
+	with r, instrumentation.phase('parse'):
+		data = pd.read_csv(stream, **arguments)
+
+	if cache is not None and len(params) == 0:
+		cache.put(dataset_id, data)
+
+	if unapplied:
+		data = _select(data, **query)
+	elif query['columns'] is not None:
+		data = data[query['columns']]
+	return _chunked(data, chunksize)
+
+# operators of filters of datasets.get
+FILTERS = {
+	'==': lambda values, value: values == value,
+	'!=': lambda values, value: values != value,
+	'<': lambda values, value: values < value,
+	'<=': lambda values, value: values <= value,
+	'>': lambda values, value: values > value,
+	'>=': lambda values, value: values >= value,
+	'in': lambda values, value: values.isin(value),
+	'not in': lambda values, value: ~values.isin(value)
+}
+
+def _query(columns, offset, limit, sample, seed, filters):
+	"""Checked selection of datasets.get, the same for the weles and for data selected locally"""
+
+	if columns is not None and (not isinstance(columns, list) or not all(isinstance(column, str) for column in columns)):
+		raise ValueError("columns must be a list of strings")
+	if offset is not None and (not isinstance(offset, int) or offset < 0):
+		raise ValueError("offset must be a non negative integer")
+	if limit is not None and (not isinstance(limit, int) or limit < 0):
+		raise ValueError("limit must be a non negative integer")
+	if sample is not None and not ((isinstance(sample, int) and sample > 0) or (isinstance(sample, float) and 0 < sample <= 1)):
+		raise ValueError("sample must be a positive integer or a float between 0 and 1")
+	if seed is not None and not isinstance(seed, int):
+		raise ValueError("seed must be an integer")
+	if filters is not None:
+		if not isinstance(filters, list) or not all(isinstance(condition, (list, tuple)) and len(condition) == 3 for condition in filters):
+			raise ValueError("filters must be a list of (column, operator, value) tuples")
+		if not all(condition[1] in FILTERS for condition in filters):
+			raise ValueError("operators of filters must be one of: " + ', '.join(FILTERS))
+		filters = [list(condition) for condition in filters]
+
+	return {'columns': columns, 'offset': offset, 'limit': limit, 'sample': sample, 'seed': seed, 'filters': filters}
+
+@instrumented
+def _read_chunks(r, stream, chunksize, columns, **arguments):
+	"""Parse the streamed csv chunk by chunk, the response is closed when all chunks are read.
+
+	The span of datasets.get ends when the iterator is returned, chunks are parsed in the span of this generator.
+	"""
 
-	r = requests.get('http://192.168.137.64/datasets/' + dataset_id)
-
-	return pd.read_csv(StringIO(r.text))
-
-def info(dataset_id):
+	import pandas as pd
+
+	with r:
+		reader = pd.read_csv(stream, chunksize=chunksize, **arguments)
+		while True:
+			with instrumentation.phase('parse'):
+				chunk = next(reader, None)
+			if chunk is None:
+				return
+			yield chunk if columns is None else chunk[columns]
+
+def _select(data, columns=None, offset=None, limit=None, sample=None, seed=None, filters=None):
+	"""Apply the selection of datasets.get to the data frame which is already in memory"""
+
+	for column, operator, value in filters or []:
+		data = data[FILTERS[operator](data[column], value)]
+	if sample is not None:
+		if isinstance(sample, float):
+			data = data.sample(frac=sample, random_state=seed)
+		else:
+			data = data.sample(n=min(sample, data.shape[0]), random_state=seed)
+		data = data.sort_index()
+	if offset is not None or limit is not None:
+		start = offset or 0
+		data = data.iloc[start:None if limit is None else start + limit]
+	if columns is not None:
+		data = data[columns]
+	if filters is not None or sample is not None or offset:
+		data = data.reset_index(drop=True)
+	return data
+
+def _chunked(data, chunksize):
+	"""Iterator of chunks of the data frame if chunksize is given, otherwise the data frame"""
+
+	if chunksize is not None:
+		return (data.iloc[start:start + chunksize] for start in range(0, data.shape[0], chunksize))
+	return data
+
+@instrumented
+def info(dataset_id, client=None):
 	"""Get all metadata about dataset
 
 	Parameters
 	----------
 	dataset_id : string
 		hash of the dataset
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
 
 	Returns
 	-------
@@ -163,14 +527,225 @@ def info(dataset_id):
 	datasets.info('aaaaaaaaaaaaaaaaaaaaaaaa')
 	"""
 
+	import pandas as pd
+
 	if not isinstance(dataset_id, str):
 		raise ValueError("dataset_id must be a string")
 	if not len(dataset_id) == 64:
 		raise ValueError("dataset_id must be 64 character long")
 
-	r = requests.get('http://192.168.137.64/datasets/' + dataset_id + '/info')
-	r = r.json()
+	client = get_client(client)
+
+	# metadata of datasets is cached like the metadata of models, also the one fetched by info_many
+	r = client.get_json('/datasets/' + dataset_id + '/info')
 	r['columns'] = pd.DataFrame(r['columns'])
 	r['aliases'] = pd.DataFrame(r['aliases'])
 
 	return r
+
+@instrumented
+def info_many(dataset_ids, max_workers=8, client=None):
+	"""Get all metadata about many datasets at once.
+
+	All datasets are asked for in one request. If the weles has no batch endpoint, datasets are
+	asked for concurrently one by one.
+
+	Parameters
+	----------
+	dataset_ids : list
+		hashes of the datasets
+	max_workers : int
+		number of concurrent requests if the weles has no batch endpoint
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
+
+	Returns
+	-------
+	dict
+		dictionary with data frames of metadata of all datasets with the dataset_id column,
+		single values are gathered in the 'info' data frame
+
+	Examples
+	--------
+	datasets.info_many(['aaaaaaaaaaaaaaaaaaaaaaaa', 'bbbbbbbbbbbbbbbbbbbbbbbb'])['columns']
+	"""
+
+	if not isinstance(dataset_ids, list) or not all(isinstance(dataset_id, str) for dataset_id in dataset_ids):
+		raise ValueError("dataset_ids must be a list of strings")
+	if not all(len(dataset_id) == 64 for dataset_id in dataset_ids):
+		raise ValueError("dataset_ids must be 64 character long")
+	if not isinstance(max_workers, int) or max_workers < 1:
+		raise ValueError("max_workers must be a positive integer")
+
+	client = get_client(client)
+
+	paths = {dataset_id: '/datasets/' + dataset_id + '/info' for dataset_id in dataset_ids}
+	infos = get_json_many(paths, '/datasets/info_many', 'dataset_ids', 'datasets', max_workers, client)
+
+	return info_frames(infos, 'dataset_id')
+
+def get_json_many(paths, batch_path, ids_key, result_key, max_workers, client):
+	"""Get json responses of many metadata endpoints, in one request to the batch endpoint if the weles has it.
+
+	Parameters
+	----------
+	paths : dict
+		ids mapped to paths of their single metadata endpoints
+	batch_path : string
+		path of the batch endpoint, it gets the list of ids in the ids_key field and returns
+		responses of single endpoints keyed by ids in the result_key field
+	max_workers : int
+		number of concurrent requests if the weles has no batch endpoint
+	client : weles.Client
+		client used for the communication with the **weles**
+
+	Returns
+	-------
+	dict
+		ids mapped to responses, in the order of paths
+	"""
+
+	cache = client.metadata_cache
+	infos = {}
+	for key, path in paths.items():
+		entry = cache.get(path)
+		if entry is not None and cache.is_fresh(entry):
+			infos[key] = client.get_json(path)
+	missing = [key for key in paths if key not in infos]
+
+	if missing and not client.supports('POST', batch_path):
+		# the weles has no batch endpoint
+		fetched = imap(lambda key: client.get_json(paths[key]), missing, max_workers)
+		infos.update(zip(missing, fetched))
+	elif missing:
+		r = client.post(batch_path, data = {ids_key: missing})
+		r.raise_for_status()
+		for key, value in r.json()[result_key].items():
+			cache.set(paths[key], value)
+			infos[key] = value
+
+	return {key: infos[key] for key in paths if key in infos}
+
+def info_frames(infos, id_name):
+	"""Concatenate metadata of many entities into data frames.
+
+	Parameters
+	----------
+	infos : dict
+		ids mapped to metadata dictionaries
+	id_name : string
+		name of the column with ids, the first one in every data frame
+
+	Returns
+	-------
+	dict
+		lists in metadata are concatenated, dictionaries become one row per entity and single values are
+		gathered in the 'info' data frame
+	"""
+
+	import pandas as pd
+
+	records = {}
+	for key, info in infos.items():
+		single = {}
+		for field, value in info.items():
+			if isinstance(value, list):
+				rows = value
+			elif isinstance(value, dict):
+				rows = [value]
+			else:
+				single[field] = value
+				continue
+			records.setdefault(field, []).extend(dict({id_name: key}, **(row if isinstance(row, dict) else {field: row})) for row in rows)
+		if single:
+			records.setdefault('info', []).append(dict({id_name: key}, **single))
+
+	return {field: pd.DataFrame(rows) if rows else pd.DataFrame(columns=[id_name]) for field, rows in records.items()}
+
+def content_hash(data):
+	"""Compute the hash identifying the dataset in the **weles**.
+
+	The hash is sha256 of the dataset written as csv without the index, the same way the weles identifies
+	uploaded datasets.
+
+	Parameters
+	----------
+	data : pandas.DataFrame
+		dataset
+
+	Returns
+	-------
+	string
+		64 character long hash of the dataset
+
+	Examples
+	--------
+	datasets.content_hash(iris)
+	"""
+
+	import pandas as pd
+
+	if not isinstance(data, pd.DataFrame):
+		raise ValueError("data must be a pandas.DataFrame")
+
+	with instrumentation.phase('hash'):
+		return hashlib.sha256(data.to_csv(index=False).encode('utf-8')).hexdigest()
+
+@instrumented
+def exists(dataset_id, client=None):
+	"""Check if the dataset is present in the **weles**.
+
+	Parameters
+	----------
+	dataset_id : string
+		hash of the dataset
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
+
+	Returns
+	-------
+	bool
+		true if the dataset is in the weles
+
+	Examples
+	--------
+	datasets.exists('aaaaaaaaaaaaaaaaaaaaaaaa')
+
+	datasets.exists(datasets.content_hash(iris))
+	"""
+
+	if not isinstance(dataset_id, str):
+		raise ValueError("dataset_id must be a string")
+	if not len(dataset_id) == 64:
+		raise ValueError("dataset_id must be 64 character long")
+
+	client = get_client(client)
+
+	r = client.request('HEAD', '/datasets/' + dataset_id + '/info')
+
+	return r.status_code == 200
+
+@instrumented
+def uploaded_hash(data, client=None):
+	"""Get the hash of the dataset if it is already present in the **weles**.
+
+	Parameters
+	----------
+	data : pandas.DataFrame
+		dataset
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
+
+	Returns
+	-------
+	string
+		hash of the dataset or None if it has not been uploaded yet
+
+	Examples
+	--------
+	datasets.uploaded_hash(iris)
+	"""
+
+	dataset_id = content_hash(data)
+
+	return dataset_id if exists(dataset_id, client=client) else None
@@ -0,0 +1,219 @@
+"""@package docstring
+The module with formats of data frames sent to and received from the **weles**
+"""
+
+import gzip
+from io import BytesIO, StringIO
+
+from . import instrumentation
+
+# media types of supported formats, csv is understood by every weles server
+FORMATS = {
+	'csv': 'text/csv',
+	'csv.gz': 'application/gzip',
+	'csv.zst': 'application/zstd',
+	'parquet': 'application/vnd.apache.parquet',
+	'arrow': 'application/vnd.apache.arrow.stream'
+}
+
+def check_format(fmt):
+	"""Raise ValueError if fmt is not supported"""
+
+	if not isinstance(fmt, str):
+		raise ValueError("format must be a string")
+	if fmt not in FORMATS:
+		raise ValueError("format must be one of: " + ', '.join(FORMATS))
+
+def _zstandard():
+	try:
+		import zstandard
+	except ImportError:
+		raise ImportError("zstandard package is required for the 'csv.zst' format, install it with: pip install zstandard")
+	return zstandard
+
+def _pyarrow():
+	try:
+		import pyarrow
+		import pyarrow.ipc
+	except ImportError:
+		raise ImportError("pyarrow package is required for the 'parquet' and 'arrow' formats, install it with: pip install pyarrow")
+	return pyarrow
+
+def serialize(data, fmt='csv', header=True):
+	"""Serialize the data frame.
+
+	Parameters
+	----------
+	data : pandas.DataFrame
+		data frame to serialize
+	fmt : string
+		one of the supported formats
+	header : bool
+		if false then column names are not written, only used by csv formats
+
+	Returns
+	-------
+	string/bytes
+		string for the csv format, bytes for all other formats
+	"""
+
+	check_format(fmt)
+
+	with instrumentation.phase('serialize'):
+		payload = _serialize(data, fmt, header)
+	instrumentation.count('payload_bytes', len(payload))
+
+	return payload
+
+def _serialize(data, fmt, header):
+	if fmt == 'csv':
+		return data.to_csv(index=False, header=header)
+	if fmt == 'csv.gz':
+		return gzip.compress(data.to_csv(index=False, header=header).encode('utf-8'))
+	if fmt == 'csv.zst':
+		return _zstandard().ZstdCompressor().compress(data.to_csv(index=False, header=header).encode('utf-8'))
+
+	pa = _pyarrow()
+	table = pa.Table.from_pandas(data, preserve_index=False)
+	buffer = BytesIO()
+	if fmt == 'parquet':
+		import pyarrow.parquet
+		pyarrow.parquet.write_table(table, buffer)
+	else:
+		with pa.ipc.new_stream(buffer, table.schema) as writer:
+			writer.write_table(table)
+	return buffer.getvalue()
+
+def deserialize(content, fmt='csv', header='infer', float_precision=None):
+	"""Parse the data frame.
+
+	Parameters
+	----------
+	content : string/bytes
+		serialized data frame
+	fmt : string
+		one of the supported formats
+	header : int/None/'infer'
+		passed to pandas.read_csv, only used by csv formats
+	float_precision : string, optional
+		passed to pandas.read_csv, 'round_trip' parses floats exactly as they were written
+
+	Returns
+	-------
+	pandas.DataFrame
+		parsed data frame
+	"""
+
+	check_format(fmt)
+
+	with instrumentation.phase('parse'):
+		return _deserialize(content, fmt, header, float_precision)
+
+def _deserialize(content, fmt, header, float_precision=None):
+	import pandas as pd
+
+	if fmt == 'csv':
+		if isinstance(content, bytes):
+			content = content.decode('utf-8')
+		return pd.read_csv(StringIO(content), header=header, float_precision=float_precision)
+	if fmt == 'csv.gz':
+		return pd.read_csv(BytesIO(gzip.decompress(content)), header=header, float_precision=float_precision)
+	if fmt == 'csv.zst':
+		return pd.read_csv(_zstandard().ZstdDecompressor().stream_reader(BytesIO(content)), header=header, float_precision=float_precision)
+
+	pa = _pyarrow()
+	if fmt == 'parquet':
+		import pyarrow.parquet
+		table = pyarrow.parquet.read_table(BytesIO(content))
+	else:
+		table = pa.ipc.open_stream(content).read_all()
+	data = table.to_pandas()
+	if header is None:
+		# keep the same shape of result as for csv without header
+		data.columns = range(data.shape[1])
+	return data
+
+def attach(fields, files, name, data, fmt='csv', header=True):
+	"""Put the serialized data frame into the request body.
+
+	Csv data is sent as a regular form field, like weles always expected. Other formats are
+	sent as files and the used format is passed in the 'format' field.
+
+	Parameters
+	----------
+	fields : dict
+		form fields of the request
+	files : dict
+		files of the request
+	name : string
+		name of the field with data
+	data : pandas.DataFrame
+		data frame to send
+	fmt : string
+		one of the supported formats
+	header : bool
+		if false then column names are not written, only used by csv formats
+
+	Returns
+	-------
+	int
+		number of serialized bytes
+	"""
+
+	payload = serialize(data, fmt, header=header)
+
+	if fmt == 'csv':
+		fields[name] = payload
+		return len(payload)
+
+	fields['format'] = fmt
+	files[name] = (name + '.' + fmt, payload, FORMATS[fmt])
+	return len(payload)
+
+def accept(fmt='csv'):
+	"""Value of the Accept header asking for the format, with csv as the fallback"""
+
+	check_format(fmt)
+
+	if fmt == 'csv':
+		return FORMATS['csv']
+	return FORMATS[fmt] + ', ' + FORMATS['csv'] + ';q=0.5'
+
+def format_of(response):
+	"""Find out the format of the weles response, csv if it is unknown"""
+
+	media_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+	for fmt, known in FORMATS.items():
+		if media_type == known:
+			return fmt
+	return 'csv'
+
+def read_response(response, header='infer', float_precision=None):
+	"""Parse the data frame from the weles response in the format it was sent in, arguments are passed to deserialize"""
+
+	fmt = format_of(response)
+	if fmt == 'csv':
+		return deserialize(response.text, fmt, header=header, float_precision=float_precision)
+	return deserialize(response.content, fmt, header=header, float_precision=float_precision)
+
+def stream_reader(response):
+	"""Binary file-like object reading the csv body of the streamed weles response.
+
+	Returns
+	-------
+	file-like
+		decompressed csv stream or None if the response is in the parquet or arrow format
+	"""
+
+	fmt = format_of(response)
+
+	# undoing the transfer compression (Content-Encoding) while reading
+	response.raw.decode_content = True
+
+	if fmt == 'csv':
+		return response.raw
+	if fmt == 'csv.gz':
+		return gzip.GzipFile(fileobj=response.raw)
+	if fmt == 'csv.zst':
+		return _zstandard().ZstdDecompressor().stream_reader(response.raw)
+	return None
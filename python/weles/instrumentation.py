@@ -0,0 +1,364 @@
+"""@package docstring
+The module with instrumentation of calls to the **weles**
+
+When at least one hook is added, every public function of models, datasets and users is measured in a span.
+The span collects seconds spent in phases of the call:
+	serialize  writing data frames sent to the weles
+	hash       computing hashes of data frames
+	network    sending requests and receiving responses, streamed response bodies are read in the parse phase
+	server     processing on the weles, if it is reported in the Server-Timing header
+	parse      reading data frames received from the weles
+and counters: requests, retries, bytes_sent, bytes_received, payload_bytes (size of serialized data frames) and
+model_bytes (size of pickled models).
+Spans of functions called by other weles functions are included in the spans of the calling ones.
+Chunks iterated from datasets.get are read and parsed in the separate datasets._read_chunks span, which ends with the last chunk.
+Hooks are called with every finished span.
+"""
+
+import re
+import time
+import inspect
+import logging
+import functools
+from threading import Lock
+from contextvars import ContextVar
+
+# functions called with every finished span
+_hooks = []
+
+# span of the running weles function
+_current = ContextVar('weles_span', default=None)
+
+logger = logging.getLogger('weles')
+
+class Span:
+	"""Measurements of one call of the weles function.
+
+	Attributes
+	----------
+	name : string
+		name of the function, e.g. 'models.predict'
+	start : float
+		unix time of the start of the call
+	duration : float
+		seconds of the whole call, None until the call is finished
+	phases : dict
+		seconds spent in phases of the call
+	counters : dict
+		numbers of requests, retries and bytes of the call
+	error : BaseException
+		exception raised by the call, None if it succeeded
+	parent : Span
+		span of the weles function which made this call, None if it was called directly
+	"""
+
+	def __init__(self, name, parent=None):
+		self.name = name
+		self.start = time.time()
+		self.duration = None
+		self.phases = {}
+		self.counters = {}
+		self.error = None
+		self.parent = parent
+		self._started = time.perf_counter()
+		# phases and counters are updated by threads of concurrent requests
+		self._lock = Lock()
+
+	def add_phase(self, phase, seconds):
+		"""Add seconds spent in the phase"""
+		with self._lock:
+			self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+	def count(self, counter, value=1):
+		"""Increase the counter"""
+		with self._lock:
+			self.counters[counter] = self.counters.get(counter, 0) + value
+
+	def __repr__(self):
+		return 'Span(' + repr(self.name) + ', duration=' + repr(self.duration) + ', phases=' + repr(self.phases) + ', counters=' + repr(self.counters) + ')'
+
+def add_hook(hook):
+	"""Call the hook with every finished span.
+
+	Parameters
+	----------
+	hook : callable
+		function of one argument, weles.instrumentation.Span
+
+	Examples
+	--------
+	instrumentation.add_hook(instrumentation.logging_hook())
+
+	instrumentation.add_hook(lambda span: print(span.name, span.duration, span.counters))
+	"""
+
+	if not callable(hook):
+		raise ValueError("hook must be callable")
+
+	_hooks.append(hook)
+
+def remove_hook(hook):
+	"""Stop calling the hook added with add_hook"""
+	_hooks.remove(hook)
+
+def current():
+	"""Span of the running weles function, None if there is no such function or no hooks"""
+	return _current.get()
+
+def _finish(span):
+	span.duration = time.perf_counter() - span._started
+
+	if span.parent is not None:
+		# the calling function includes everything done by this one
+		for phase, seconds in span.phases.items():
+			span.parent.add_phase(phase, seconds)
+		for counter, value in span.counters.items():
+			span.parent.count(counter, value)
+
+	for hook in list(_hooks):
+		try:
+			hook(span)
+		except Exception:
+			# instrumentation must not break calls to the weles
+			logger.exception("instrumentation hook %r failed", hook)
+
+def instrumented(function):
+	"""Decorator measuring calls of the weles function in spans, works also with generators and coroutines"""
+
+	name = function.__module__.rsplit('.', 1)[-1] + '.' + function.__name__
+
+	if inspect.isgeneratorfunction(function):
+		@functools.wraps(function)
+		def wrapper(*args, **kwargs):
+			if not _hooks:
+				return (yield from function(*args, **kwargs))
+
+			span = Span(name, _current.get())
+			iterator = function(*args, **kwargs)
+			try:
+				while True:
+					# the span is current only while the generator runs, not while its items are consumed
+					token = _current.set(span)
+					try:
+						item = next(iterator)
+					except StopIteration as e:
+						return e.value
+					finally:
+						_current.reset(token)
+					yield item
+			except BaseException as e:
+				if not isinstance(e, GeneratorExit):
+					span.error = e
+				raise
+			finally:
+				iterator.close()
+				_finish(span)
+		return wrapper
+
+	if inspect.iscoroutinefunction(function):
+		@functools.wraps(function)
+		async def wrapper(*args, **kwargs):
+			if not _hooks:
+				return await function(*args, **kwargs)
+
+			span = Span(name, _current.get())
+			token = _current.set(span)
+			try:
+				return await function(*args, **kwargs)
+			except BaseException as e:
+				span.error = e
+				raise
+			finally:
+				_current.reset(token)
+				_finish(span)
+		return wrapper
+
+	@functools.wraps(function)
+	def wrapper(*args, **kwargs):
+		if not _hooks:
+			return function(*args, **kwargs)
+
+		span = Span(name, _current.get())
+		token = _current.set(span)
+		try:
+			return function(*args, **kwargs)
+		except BaseException as e:
+			span.error = e
+			raise
+		finally:
+			_current.reset(token)
+			_finish(span)
+	return wrapper
+
+class phase:
+	"""Context manager adding the time of its body to the phase of the current span.
+
+	Examples
+	--------
+	with instrumentation.phase('serialize'):
+		payload = data.to_csv()
+	"""
+
+	__slots__ = ('name', '_span', '_started')
+
+	def __init__(self, name):
+		self.name = name
+
+	def __enter__(self):
+		self._span = _current.get()
+		if self._span is not None:
+			self._started = time.perf_counter()
+		return self
+
+	def __exit__(self, *args):
+		if self._span is not None:
+			self._span.add_phase(self.name, time.perf_counter() - self._started)
+
+def count(counter, value=1):
+	"""Increase the counter of the current span, if there is any"""
+
+	span = _current.get()
+	if span is not None:
+		span.count(counter, value)
+
+def record_response(response):
+	"""Count the request, its retries and bytes, and the processing time reported by the weles"""
+
+	span = _current.get()
+	if span is None:
+		return
+
+	span.count('requests')
+
+	sent = response.request.headers.get('Content-Length')
+	if sent is not None:
+		span.count('bytes_sent', int(sent))
+	received = response.headers.get('Content-Length')
+	if received is not None:
+		span.count('bytes_received', int(received))
+
+	# repetitions made by urllib3 after failed connections or 5xx responses
+	retries = getattr(response.raw, 'retries', None)
+	if retries is not None and retries.history:
+		span.count('retries', len(retries.history))
+
+	timing = response.headers.get('Server-Timing')
+	if timing is not None:
+		durations = re.findall(r'dur=([0-9.]+)', timing)
+		if durations:
+			span.add_phase('server', sum(float(duration) for duration in durations) / 1000)
+
+def _describe(span):
+	text = span.name + ' ' + format(span.duration, '.3f') + ' s'
+	if span.phases:
+		text += ' (' + ', '.join(phase + ' ' + format(seconds, '.3f') + ' s' for phase, seconds in span.phases.items()) + ')'
+	for counter, value in span.counters.items():
+		text += ' ' + counter + '=' + str(value)
+	if span.error is not None:
+		text += ' failed: ' + repr(span.error)
+	return text
+
+def logging_hook(log=None, level=logging.INFO):
+	"""Create the hook logging every span in one line.
+
+	Parameters
+	----------
+	log : logging.Logger, optional
+		logger used, the 'weles' logger if None
+	level : int
+		level of the messages, failed calls are logged as warnings
+
+	Returns
+	-------
+	callable
+		hook for add_hook
+
+	Examples
+	--------
+	instrumentation.add_hook(instrumentation.logging_hook(level=logging.DEBUG))
+	"""
+
+	log = log or logger
+
+	def hook(span):
+		log.log(logging.WARNING if span.error is not None else level, _describe(span))
+
+	return hook
+
+def opentelemetry_hook(tracer=None):
+	"""Create the hook exporting spans to OpenTelemetry, requires the opentelemetry-api package.
+
+	Spans are exported when they finish, so spans of nested weles functions are not linked with the calling ones,
+	the name of the calling function is in the weles.parent attribute.
+
+	Parameters
+	----------
+	tracer : opentelemetry.trace.Tracer, optional
+		tracer used, the 'weles' tracer of the global tracer provider if None
+
+	Returns
+	-------
+	callable
+		hook for add_hook
+	"""
+
+	try:
+		from opentelemetry import trace
+	except ImportError:
+		raise ImportError("opentelemetry-api package is required for exporting to OpenTelemetry, install it with: pip install opentelemetry-api")
+
+	tracer = tracer or trace.get_tracer('weles')
+
+	def hook(span):
+		attributes = {'weles.' + counter: value for counter, value in span.counters.items()}
+		attributes.update({'weles.phase.' + phase: seconds for phase, seconds in span.phases.items()})
+		if span.parent is not None:
+			attributes['weles.parent'] = span.parent.name
+
+		exported = tracer.start_span(span.name, start_time=int(span.start * 1e9), attributes=attributes)
+		if span.error is not None:
+			exported.record_exception(span.error)
+			exported.set_status(trace.Status(trace.StatusCode.ERROR, str(span.error)))
+		exported.end(end_time=int((span.start + span.duration) * 1e9))
+
+	return hook
+
+def prometheus_hook(registry=None, prefix='weles'):
+	"""Create the hook exporting metrics to Prometheus, requires the prometheus_client package.
+
+	Durations of calls are observed for all spans, phases and counters only for spans of directly called
+	functions, which include the nested ones.
+
+	Parameters
+	----------
+	registry : prometheus_client.CollectorRegistry, optional
+		registry of the metrics, the default one if None
+	prefix : string
+		prefix of names of the metrics
+
+	Returns
+	-------
+	callable
+		hook for add_hook
+	"""
+
+	try:
+		import prometheus_client
+	except ImportError:
+		raise ImportError("prometheus_client package is required for exporting to Prometheus, install it with: pip install prometheus_client")
+
+	kwargs = {} if registry is None else {'registry': registry}
+	durations = prometheus_client.Histogram(prefix + '_call_duration_seconds', 'Duration of calls of weles functions', ['function', 'outcome'], **kwargs)
+	phases = prometheus_client.Counter(prefix + '_phase_seconds', 'Seconds spent in phases of calls of weles functions', ['function', 'phase'], **kwargs)
+	counters = prometheus_client.Counter(prefix + '_call_events', 'Requests, retries and bytes of calls of weles functions', ['function', 'counter'], **kwargs)
+
+	def hook(span):
+		durations.labels(span.name, 'failure' if span.error is not None else 'success').observe(span.duration)
+		if span.parent is not None:
+			return
+		for phase, seconds in span.phases.items():
+			phases.labels(span.name, phase).inc(seconds)
+		for counter, value in span.counters.items():
+			counters.labels(span.name, counter).inc(value)
+
+	return hook
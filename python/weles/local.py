@@ -0,0 +1,295 @@
+"""@package docstring
+The module with models of the **weles** running in the local Python process
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import pickle
+import hashlib
+from importlib import metadata
+
+# directory of downloaded models, one subdirectory per model name and version
+MODEL_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'weles', 'models')
+
+# protocol 5 writes buffers of numpy arrays to the file as they are, without copying them into one bytes object
+PICKLE_PROTOCOL = 5
+
+# level of gzip compression of pickled models
+COMPRESSLEVEL = 6
+
+# first bytes of gzip files, pickles start with other ones
+GZIP_MAGIC = b'\x1f\x8b'
+
+class LocalModel:
+	"""Model downloaded from the **weles**, making predictions in the local process.
+
+	Created by models.load_local.
+
+	Attributes
+	----------
+	model_name : string
+		name of the model in the weles
+	version : string
+		version of the model, changes with its metadata in the weles
+	model : object
+		unpickled model
+	schema : weles.schema.Schema
+		compiled input schema of the model
+	path : string
+		path to the cached pickle
+	"""
+
+	def __init__(self, model_name, version, model, schema, path):
+		self.model_name = model_name
+		self.version = version
+		self.model = model
+		self.schema = schema
+		self.path = path
+
+	@property
+	def columns(self):
+		"""Names of the columns of the training dataset without the target"""
+		return self.schema.columns
+
+	def predict(self, X, pred_type='exact', prepare_columns=True, batch_size=None):
+		"""Make a prediction on X, returning the same data frame as models.predict.
+
+		Parameters
+		----------
+		X : pandas.DataFrame/string
+			pandas data frame or path to csv file
+		pred_type : string
+			type of the prediction: exact/prob
+		prepare_columns : boolean
+			if true and if X is an object then take column names from the model
+		batch_size : int, optional
+			if given then the model is called on batches of that many rows
+
+		Returns
+		-------
+		pandas.DataFrame
+			data frame with made predictions
+
+		Examples
+		--------
+		local = models.load_local('example_model')
+
+		local.predict(iris.drop(columns='Species'))
+
+		local.predict(data, pred_type='prob', batch_size=100000)
+		"""
+
+		import pandas as pd
+
+		if not isinstance(X, (str, pd.DataFrame)):
+			raise ValueError("X must be a string or pandas.DataFrame")
+		if pred_type not in ('exact', 'prob'):
+			raise ValueError("pred_type must be 'exact' or 'prob'")
+		if batch_size is not None and (not isinstance(batch_size, int) or batch_size < 1):
+			raise ValueError("batch_size must be a positive integer")
+
+		if isinstance(X, str):
+			X = pd.read_csv(X)
+		else:
+			X = pd.DataFrame(X)
+			if prepare_columns:
+				X = self.schema.prepare(X)
+
+		function = self.model.predict_proba if pred_type == 'prob' else self.model.predict
+
+		if batch_size is None or X.shape[0] <= batch_size:
+			return pd.DataFrame(function(X))
+
+		return pd.concat([pd.DataFrame(function(X.iloc[start:start + batch_size])) for start in range(0, X.shape[0], batch_size)], ignore_index=True)
+
+	def __repr__(self):
+		return 'LocalModel(' + repr(self.model_name) + ', version=' + repr(self.version) + ')'
+
+def version(model_info):
+	"""Version of the model, hash of its metadata in the **weles**.
+
+	Parameters
+	----------
+	model_info : dict
+		'model' field of the models.info result
+
+	Returns
+	-------
+	string
+		16 character long version
+	"""
+
+	return hashlib.sha256(json.dumps(model_info, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+def mismatches(model_info, requirements):
+	"""Differences between the environment of the model and the current one.
+
+	Parameters
+	----------
+	model_info : dict
+		'model' field of the models.info result
+	requirements : dict/list
+		result of models.requirements, package names mapped to versions or lines of the requirements file,
+		e.g. 'numpy==1.24.2', 'pandas>=1.0,<3' or 'package @ https://example.com/package.whl'
+
+	Returns
+	-------
+	list
+		descriptions of the differences, empty if the model can run in this process
+	"""
+
+	found = []
+
+	language = model_info.get('language')
+	if language is not None and language != 'python':
+		found.append('model is written in ' + str(language))
+
+	language_version = model_info.get('language_version')
+	current = '.'.join(str(part) for part in sys.version_info[:2])
+	if language_version is not None and '.'.join(str(language_version).split('.')[:2]) != current:
+		found.append('python ' + str(language_version) + ' required, ' + current + ' installed')
+
+	if isinstance(requirements, dict):
+		parsed = [(package, [('==', str(version))] if version is not None else []) for package, version in requirements.items()]
+	else:
+		parsed = [requirement for requirement in map(_parse_requirement, requirements) if requirement is not None]
+
+	for package, specifiers in parsed:
+		# a single pinned version is described by itself, other specifiers as they are written
+		required = specifiers[0][1] if len(specifiers) == 1 and specifiers[0][0] == '==' else ','.join(operator + version for operator, version in specifiers) or 'any version'
+		try:
+			installed = metadata.version(package)
+		except metadata.PackageNotFoundError:
+			found.append(package + ' ' + required + ' required, not installed')
+			continue
+		if not all(_satisfies(installed, operator, version) for operator, version in specifiers):
+			found.append(package + ' ' + required + ' required, ' + installed + ' installed')
+
+	return found
+
+# name of the package, its extras and the rest of the requirement line
+_REQUIREMENT = re.compile(r'^([A-Za-z0-9][A-Za-z0-9._-]*)\s*(\[[^\]]*\])?\s*(.*)$')
+
+# version specifier, e.g. '>=1.2' or '==1.*'
+_SPECIFIER = re.compile(r'^(===|==|!=|~=|>=|<=|>|<)\s*([^\s,;]+)$')
+
+def _parse_requirement(line):
+	"""Name of the package and version specifiers (operator, version) of the requirements file line, None if it has no package"""
+
+	# comments, environment markers and options of pip are not checked
+	line = line.split('#', 1)[0].split(';', 1)[0].strip()
+	if not line or line.startswith('-'):
+		return None
+
+	match = _REQUIREMENT.match(line)
+	if match is None:
+		return None
+	package, rest = match.group(1), match.group(3).strip()
+	if rest and rest[0] not in '=!~<>(@':
+		# urls and paths without the name of the package
+		return None
+
+	if rest.startswith('@'):
+		# the package installed from the url, only its presence can be checked
+		return package, []
+
+	specifiers = []
+	for specifier in rest.strip('()').split(','):
+		specifier = _SPECIFIER.match(specifier.strip())
+		if specifier is not None:
+			specifiers.append((specifier.group(1), specifier.group(2)))
+	return package, specifiers
+
+# version without pre-release, post-release and development parts
+_RELEASE = re.compile(r'^v?[0-9]+(\.[0-9]+)*(\+.*)?$')
+
+def _numbers(version):
+	"""Numbers of the release part of the version, e.g. [1, 2, 0] for '1.2.0rc1+local'"""
+
+	match = re.match(r'v?([0-9]+(?:\.[0-9]+)*)', version.strip())
+	return [int(number) for number in match.group(1).split('.')] if match else []
+
+def _starts_with(installed, prefix):
+	"""Check if the release of the installed version starts with the numbers, missing numbers are zeros"""
+	return (_numbers(installed) + [0] * len(prefix))[:len(prefix)] == prefix
+
+def _satisfies(installed, operator, version):
+	"""Check if the installed version satisfies the specifier, pre-releases and local versions are compared by their releases"""
+
+	if operator == '===':
+		return installed == version
+	if version.endswith('.*'):
+		# wildcards are allowed only with == and !=
+		matches = _starts_with(installed, _numbers(version[:-2]))
+		return matches if operator == '==' else not matches
+
+	if operator == '==' and installed == version:
+		return True
+
+	current, required = _numbers(installed), _numbers(version)
+	length = max(len(current), len(required))
+	current, required = current + [0] * (length - len(current)), required + [0] * (length - len(required))
+
+	if operator == '~=':
+		# compatible release, e.g. ~=1.4.2 means >=1.4.2 and ==1.4.*
+		return current >= required and _starts_with(installed, _numbers(version)[:-1])
+	if operator in ('==', '!=') and not (_RELEASE.match(installed) and _RELEASE.match(version)):
+		# pre-releases and post-releases are equal only to the same version
+		return operator == '!='
+	return {'==': current == required, '!=': current != required, '>=': current >= required, '<=': current <= required,
+		'>': current > required, '<': current < required}[operator]
+
+def dump(model, f, compress=False):
+	"""Pickle the model into the binary file without holding the whole pickle in memory.
+
+	Parameters
+	----------
+	model : object
+		pickled model
+	f : file-like
+		binary file opened for writing
+	compress : bool
+		if true then the pickle is compressed with gzip
+
+	Returns
+	-------
+	int
+		number of bytes written to the file
+	"""
+
+	start = f.tell()
+	if compress:
+		# without the timestamp the same model gives the same bytes, so its interrupted upload can be resumed
+		with gzip.GzipFile(fileobj=f, mode='wb', compresslevel=COMPRESSLEVEL, mtime=0) as target:
+			pickle.dump(model, _Chunked(target), protocol=PICKLE_PROTOCOL)
+	else:
+		pickle.dump(model, f, protocol=PICKLE_PROTOCOL)
+	return f.tell() - start
+
+class _Chunked:
+	"""Binary file writing big buffers in chunks, gzip would compress them into one more big buffer"""
+
+	CHUNK_SIZE = 2**20
+
+	def __init__(self, f):
+		self.f = f
+
+	def write(self, data):
+		data = memoryview(data).cast('B')
+		for start in range(0, len(data), self.CHUNK_SIZE):
+			self.f.write(data[start:start + self.CHUNK_SIZE])
+		return len(data)
+
+def load(path):
+	"""Unpickle the model, also the compressed one"""
+
+	with open(path, 'rb') as f:
+		if f.read(2) == GZIP_MAGIC:
+			f.seek(0)
+			with gzip.GzipFile(fileobj=f, mode='rb') as source:
+				return pickle.load(source)
+		f.seek(0)
+		return pickle.load(f)
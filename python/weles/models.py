@@ -3,22 +3,36 @@ The module related to models in the **weles**
 """
 
 
-import sys
-import requests
-import pickle
 import os
-import pandas as pd
+import gzip
+import tempfile
 import platform
 import re
-from io import StringIO
 from datetime import datetime
-from getpass import getpass
-from tqdm import tqdm
 import time
+import asyncio
+import shutil
+from functools import partial
+from contextlib import ExitStack
+from contextvars import copy_context
+
+import requests
 
-def upload(model, model_name, model_desc, target, tags, train_dataset, train_dataset_name=None, dataset_desc=None, requirements_file=None):
+from .client import get_client
+from .instrumentation import instrumented, count
+from . import formats, datasets, uploads, auth, local
+from .concurrency import imap, aimap
+from .schema import Schema
+
+# states in which uploading of the model does not progress anymore
+FINISHED_STATES = ('SUCCESS', 'FAILURE', 'REVOKED')
+
+@instrumented
+def upload(model, model_name, model_desc, target, tags, train_dataset, train_dataset_name=None, dataset_desc=None, requirements_file=None, dedup=True, part_size=None, compress=False, model_upload_id=None, train_dataset_upload_id=None, client=None):
 	"""Function uploads scikit-learn or keras model, the training set and all needed metadata to the **weles** base.
 
+	The request is authenticated as described in weles.auth, the user name and password are asked for only if you are not logged in.
+
 	Parameters
 	----------
 	model : scikit-learn or keras model or string
@@ -37,33 +51,47 @@ def upload(model, model_name, model_desc, target, tags, train_dataset, train_dat
 		description of the dataset
 	requirements_file : string
 		path to python style requirements file, can be easily obtained by running: "pip freeze > requirements.txt" at your command line
-	user_name : string
-		your user name
-	password : string 
-		your password
+	dedup : bool
+		if true and the training dataset is already in the weles then only its hash is sent
+	part_size : int, optional
+		if given then the model and the training dataset are sent in resumable parts of that many bytes, see uploads.upload,
+		models bigger than uploads.PART_SIZE are sent in parts if the weles supports uploads
+	compress : bool
+		if true then the pickled model is compressed with gzip before it is sent
+	model_upload_id : string, optional
+		id of the interrupted upload of the model in parts, only its missing parts are sent
+	train_dataset_upload_id : string, optional
+		id of the interrupted upload of the training dataset in parts, only its missing parts are sent
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
 
 	Returns
 	-------
 	string
 		id of the uploading
 
+	Raises
+	------
+	uploads.UploadInterrupted
+		if a part could not be uploaded, its resume attribute has the upload ids to pass to models.upload to resume it
+
 	Examples
 	--------
 	models.upload(model, 'Example_model', 'This is the example model', 'Species', ['example', 'easy'], iris, 'iris', 'Example dataset', 'req')
-		-> user: Example user
-		-> password:
 
 	models.upload(model, 'Example_model', 'This is the example model', 'Species', ['example', 'easy'], 'aaaaaaaaaaaaaa', 'iris', 'Example dataset', 'req')
-		-> user: Example user
-		-> password:
 
 	models.upload(model, 'Example_model', 'This is the example model', 'Species', ['example', 'easy'], 'aaaaaaaaaaaaaa', None, None, 'req')
-		-> user: Example user
-		-> password:
+
+	models.upload(forest, 'Big_model', 'This is the big model', 'Species', ['example'], iris, 'iris', 'Example dataset', 'req', compress=True)
+
+	try:
+		models.upload(forest, 'Big_model', 'This is the big model', 'Species', ['example'], iris, 'iris', 'Example dataset', 'req', part_size=2**20)
+	except uploads.UploadInterrupted as e:
+		models.upload(forest, 'Big_model', 'This is the big model', 'Species', ['example'], iris, 'iris', 'Example dataset', 'req', part_size=2**20, **e.resume)
 	"""
 
-	user_name = input('user: ')
-	password = getpass('password: ')
+	import pandas as pd
 
 	if not isinstance(model_name, str):
 		raise ValueError("model_name must be a string")
@@ -81,10 +109,16 @@ def upload(model, model_name, model_desc, target, tags, train_dataset, train_dat
 		raise ValueError("dataset_desc must be a string")
 	if requirements_file is not None and not isinstance(requirements_file, str):
 		raise ValueError("requirements_file must be a string")
-	if not isinstance(user_name, str):
-		raise ValueError("user_name must be a string")
-	if not isinstance(password, str):
-		raise ValueError("password must be a string")
+	if part_size is not None and (not isinstance(part_size, int) or part_size < 1):
+		raise ValueError("part_size must be a positive integer")
+	if not isinstance(compress, bool):
+		raise ValueError("compress must be a boolean")
+	if model_upload_id is not None and not isinstance(model_upload_id, str):
+		raise ValueError("model_upload_id must be a string")
+	if train_dataset_upload_id is not None and not isinstance(train_dataset_upload_id, str):
+		raise ValueError("train_dataset_upload_id must be a string")
+
+	client = get_client(client)
 
 	timestamp = str(datetime.now().timestamp())
 
@@ -92,13 +126,14 @@ def upload(model, model_name, model_desc, target, tags, train_dataset, train_dat
 		return "Your model name contains non alphanumerical signs."
 
 	# url to post
-	url = 'http://192.168.137.64/models/post'
+	url = '/models/post'
 
 	# collecting system info
+	distribution = _distribution()
 	info = {'system': platform.system(),
 			'system_release': platform.release(),
-			'distribution': platform.linux_distribution()[0],
-			'distribution_version': platform.linux_distribution()[1],
+			'distribution': distribution[0],
+			'distribution_version': distribution[1],
 			'language': 'python',
 			'language_version': platform.python_version(),
 			'architecture': platform.architecture()[0],
@@ -108,88 +143,163 @@ def upload(model, model_name, model_desc, target, tags, train_dataset, train_dat
 
 	info['target'] = target
 
+	# token or user name and password, asked for before anything big is sent
+	info.update(auth.fields(client=client))
 
 	# init of flag if train_dataset is a hash
 	info['is_train_dataset_hash'] = 0
 
-	# uploading model
-	if type(model) == str:
-		# case when model is a path
-		files = {'model': open(model, 'rb')}
-	else:
-		# case when model is an object
-
-		files = {'model': pickle.dumps(model)}
-
-	# creating regexp to findout if the train_dataset is a path or id
-	reg = re.compile("/")
-
-	info['is_train_name'] = 1
-
-	# uploading train dataset
-	if type(train_dataset) == str and reg.search(train_dataset) is None:
-		# case when train_dataset is a hash of already uploaded dataset
+	# ids of started upload sessions, passed to models.upload they resume the interrupted upload
+	resume = {key: value for key, value in (('model_upload_id', model_upload_id), ('train_dataset_upload_id', train_dataset_upload_id)) if value is not None}
+
+	# files sent with the request are closed when it is finished
+	with ExitStack() as stack:
+		# uploading model, streamed from the file instead of being pickled into memory
+		model_file, size = _model_file(model, compress, stack)
+		count('model_bytes', size)
+		name = 'model.pkl.gz' if compress else 'model.pkl'
+		if compress:
+			info['model_compression'] = 'gzip'
+
+		files = {'model': (name, model_file)}
+		if part_size is not None or model_upload_id is not None or size > uploads.PART_SIZE:
+			# the model is sent in parts, only the id of the upload session is passed
+			try:
+				info['model_upload_id'] = _upload_parts(model_file, name, 'model_upload_id', resume, part_size or uploads.PART_SIZE, client)
+				files = {}
+			except requests.HTTPError as e:
+				# the session could not be started, big models go with the request to the weles without uploads
+				if part_size is not None or model_upload_id is not None or e.response is None or e.response.status_code not in (404, 405):
+					raise
+
+		# creating regexp to findout if the train_dataset is a path or id
+		reg = re.compile("/")
+
+		info['is_train_name'] = 1
+
+		# uploading train dataset
+		if type(train_dataset) == str and reg.search(train_dataset) is None:
+			# case when train_dataset is a hash of already uploaded dataset
+
+			info['train_dataset'] = train_dataset
+			info['is_train_dataset_hash'] = 1
+
+			if train_dataset_name is not None and dataset_desc is None:
+				raise ValueError('If your dataset name is specified, you need to pass dataset_desc')
+			if train_dataset_name is None and dataset_desc is not None:
+				raise ValueError('If your dataset description is specified, you need to pass its name')
+
+			if train_dataset_name is None:
+				info['is_train_name'] = 0
+
+		elif type(train_dataset) == str and part_size is not None and not dedup:
+			# case when train_dataset is a path to dataset streamed from the disk as it is
+			info['train_dataset_upload_id'] = _upload_parts(train_dataset, None, 'train_dataset_upload_id', resume, part_size, client)
+
+		else:
+			if type(train_dataset) == str:
+				# case when train_dataset is a path to dataset
+				train_dataset = pd.read_csv(train_dataset)
+			else:
+				# case when train_dataset is a matrix
+
+				# conversion to pandas data frame
+				train_dataset = pd.DataFrame(train_dataset)
+
+			dataset_id = datasets.uploaded_hash(train_dataset, client=client) if dedup else None
+
+			if dataset_id is not None:
+				# the same dataset is already in the weles, sending only its hash
+				info['train_dataset'] = dataset_id
+				info['is_train_dataset_hash'] = 1
+
+				if train_dataset_name is None:
+					info['is_train_name'] = 0
+			elif part_size is not None or train_dataset_upload_id is not None:
+				# uploading dataset in parts
+				payload = formats.serialize(train_dataset, client.payload_format)
+				if client.payload_format != 'csv':
+					info['format'] = client.payload_format
+				payload = payload.encode('utf-8') if isinstance(payload, str) else payload
+				info['train_dataset_upload_id'] = _upload_parts(payload, 'train_dataset.' + client.payload_format, 'train_dataset_upload_id', resume, part_size or uploads.PART_SIZE, client)
+			else:
+				# uploading dataset
+				formats.attach(info, files, 'train_dataset', train_dataset, client.payload_format)
+
+		if type(model_desc) == str and reg.search(model_desc) is not None:
+			with open(model_desc, 'rb') as f:
+				info['model_desc'] = f.read()
+		elif type(model_desc) == str:
+			info['model_desc'] = model_desc
+
+		if info['is_train_name'] == 1:
+			info['train_data_name'] = train_dataset_name
+
+			if type(dataset_desc) == str and reg.search(dataset_desc) is not None:
+				with open(dataset_desc, 'rb') as f:
+					info['dataset_desc'] = f.read()
+			elif type(dataset_desc) == str:
+				info['dataset_desc'] = dataset_desc
+
+		# uploading requirements file
+		files['requirements'] = stack.enter_context(open(requirements_file, 'rb'))
+
+		# setting session info flag
+		info['is_sessionInfo'] = 0
+
+
+		# tags
+		info['tags'] = tags
+
+		# creating request
+		r = client.post(url, files = files, data = info)
+
+	# metadata of the model with the same name is outdated
+	invalidate(model_name, client=client)
 
-		info['train_dataset'] = train_dataset
-		info['is_train_dataset_hash'] = 1
+	return r.json()
 
-		if train_dataset_name is not None and dataset_desc is None:
-			raise ValueError('If your dataset name is specified, you need to pass dataset_desc')
-		if train_dataset_name is None and dataset_desc is not None:
-			raise ValueError('If your dataset description is specified, you need to pass its name')
+def _upload_parts(source, name, key, resume, part_size, client):
+	"""Upload the source in parts, resuming the session resume[key] if there is one, and keep the id of the session in resume"""
 
-		if train_dataset_name is None:
-			info['is_train_name'] = 0
+	try:
+		resume[key] = uploads.upload(source, name, upload_id=resume.get(key), part_size=part_size, client=client)
+	except uploads.UploadInterrupted as e:
+		# sessions of the model and the dataset are resumed together by the next models.upload
+		e.resume = dict(resume, **{key: e.upload_id})
+		raise
+	return resume[key]
 
-	elif type(train_dataset) == str:
-		# case when train_dataset is a path to dataset
+def _model_file(model, compress, stack):
+	"""Binary file with the pickled model, rewound, and its size in bytes"""
 
-		train_dataset = pd.read_csv(train_dataset)
-		info['train_dataset'] = train_dataset.to_csv(index=False)
+	if type(model) == str and not compress:
+		# case when model is a path, the file is sent as it is
+		return stack.enter_context(open(model, 'rb')), os.path.getsize(model)
 
+	# case when model is an object or a file to compress, written to a temporary file removed when it is closed
+	f = stack.enter_context(tempfile.TemporaryFile())
+	if type(model) == str:
+		with open(model, 'rb') as source, gzip.GzipFile(fileobj=f, mode='wb', compresslevel=local.COMPRESSLEVEL, mtime=0) as target:
+			shutil.copyfileobj(source, target)
+		size = f.tell()
 	else:
-		# case when train_dataset is a matrix
-
-		# conversion to pandas data frame
-		train_dataset = pd.DataFrame(train_dataset)
-
-		# uploading dataset
-		info['train_dataset'] = train_dataset.to_csv(index=False)
-
-	if type(model_desc) == str and reg.search(model_desc) is not None:
-		info['model_desc'] = open(model_desc, 'rb').read()
-	elif type(model_desc) == str:
-		info['model_desc'] = model_desc
-
-	if info['is_train_name'] == 1:
-		info['train_data_name'] = train_dataset_name
-
-		if type(dataset_desc) == str and reg.search(dataset_desc) is not None:
-			info['dataset_desc'] = open(dataset_desc, 'rb').read()
-		elif type(dataset_desc) == str:
-			info['dataset_desc'] = dataset_desc
-
-	# uploading requirements file
-	files['requirements'] = open(requirements_file, 'rb')
-
-	# setting session info flag
-	info['is_sessionInfo'] = 0
-
-	# user_name
-	info['user_name'] = user_name
-
-	# password
-	info['password'] = password
-
-	# tags
-	info['tags'] = tags
-
-	# creating request
-	r = requests.post(url, files = files, data = info)
-
-	return r.json()
-
-def status(task_id, interactive = True):
+		size = local.dump(model, f, compress)
+	f.seek(0)
+	return f, size
+
+def _distribution():
+	"""Name and version of the linux distribution, empty strings if unknown"""
+
+	try:
+		release = platform.freedesktop_os_release()
+	except (AttributeError, OSError):
+		# python older than 3.10 or not a linux system
+		return '', ''
+	return release.get('NAME', ''), release.get('VERSION_ID', '')
+
+@instrumented
+def status(task_id, interactive = True, client=None):
 	"""Get the information about the progress of the uploading model
 
 	Parameters
@@ -198,6 +308,8 @@ def status(task_id, interactive = True):
 		task id, it is always returned by the models.upload function
 	interactive : bool, optional
 		display progress bar if true
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
 
 	Returns
 	-------
@@ -215,28 +327,172 @@ def status(task_id, interactive = True):
 	models.status('aaaaaaaaaaaaaaaaaaaaaa')['added_alias_for_data']
 	"""
 
+	from tqdm import tqdm
+
+	client = get_client(client)
+
 	# url
-	url = 'http://192.168.137.64/models/status/' + task_id
+	url = '/models/status/' + task_id
 
 	# getting metadata
-	r = requests.get(url).json()
+	r = client.get(url).json()
 
 	# display progressbar
 	if interactive:
 		with tqdm(total = r['total']) as bar:
 			bar.update(r['current'])
 			bar.set_description(r['status'])
-			prev = r['current']
-			while r['state'] != 'SUCCESS':
-				time.sleep(3)
-				r = requests.get(url).json()
-				bar.update(r['current'] - prev)
+			prev = [r['current']]
+
+			def update(task_id, r):
+				bar.update(r['current'] - prev[0])
 				bar.set_description(r['status'])
-				prev = r['current']
+				prev[0] = r['current']
+
+			if r['state'] not in FINISHED_STATES:
+				r = wait([task_id], poll_interval=3, max_interval=3, callback=update, client=client)[task_id]
 
 	return r
 
-def predict(model_name, X, pred_type = 'exact', prepare_columns = True):
+@instrumented
+def wait(task_ids, timeout=None, poll_interval=1, max_interval=30, callback=None, max_workers=8, client=None):
+	"""Wait until uploading of all the models is finished.
+
+	Statuses of unfinished tasks are polled concurrently by a small pool of threads. The interval between polls
+	grows 1.5 times after every poll without any change, up to max_interval, and gets back to poll_interval after a change.
+
+	Parameters
+	----------
+	task_ids : list/string
+		task ids returned by the models.upload function
+	timeout : float, optional
+		maximum number of seconds to wait, wait without limit if None
+	poll_interval : float
+		initial number of seconds between polls
+	max_interval : float
+		maximum number of seconds between polls
+	callback : callable, optional
+		function called as callback(task_id, status) every time the status of a task changes
+	max_workers : int
+		number of statuses fetched at once
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
+
+	Returns
+	-------
+	dict
+		dictionary mapping task ids to their final statuses, see models.status
+
+	Examples
+	--------
+	models.wait([models.upload(...), models.upload(...)], timeout=3600)
+
+	models.wait(task_ids, callback=lambda task_id, status: print(task_id, status['status']))
+	"""
+
+	task_ids = _check_wait_args(task_ids, timeout, poll_interval, max_interval, callback, max_workers)
+
+	client = get_client(client)
+
+	statuses = {}
+	deadline = None if timeout is None else time.monotonic() + timeout
+	interval = poll_interval
+
+	while True:
+		pending = [task_id for task_id in task_ids if task_id not in statuses or statuses[task_id]['state'] not in FINISHED_STATES]
+		fetch = partial(_fetch_status, client=client)
+
+		changed = _update_statuses(statuses, pending, imap(fetch, pending, max_workers), callback)
+
+		if all(statuses[task_id]['state'] in FINISHED_STATES for task_id in task_ids):
+			return statuses
+
+		interval = poll_interval if changed else min(interval * 1.5, max_interval)
+
+		time.sleep(_sleep_time(interval, deadline, statuses, task_ids))
+
+@instrumented
+async def wait_async(task_ids, timeout=None, poll_interval=1, max_interval=30, callback=None, max_workers=8, client=None):
+	"""Asynchronous version of models.wait.
+
+	Examples
+	--------
+	statuses = await models.wait_async(task_ids, timeout=3600)
+	"""
+
+	task_ids = _check_wait_args(task_ids, timeout, poll_interval, max_interval, callback, max_workers)
+
+	client = get_client(client)
+
+	statuses = {}
+	deadline = None if timeout is None else time.monotonic() + timeout
+	interval = poll_interval
+
+	while True:
+		pending = [task_id for task_id in task_ids if task_id not in statuses or statuses[task_id]['state'] not in FINISHED_STATES]
+		fetch = partial(_fetch_status, client=client)
+
+		fetched = [r async for r in aimap(fetch, pending, max_workers)]
+		changed = _update_statuses(statuses, pending, fetched, callback)
+
+		if all(statuses[task_id]['state'] in FINISHED_STATES for task_id in task_ids):
+			return statuses
+
+		interval = poll_interval if changed else min(interval * 1.5, max_interval)
+
+		await asyncio.sleep(_sleep_time(interval, deadline, statuses, task_ids))
+
+def _sleep_time(interval, deadline, statuses, task_ids):
+	"""Seconds until the next poll, the last poll is made at the deadline"""
+
+	if deadline is None:
+		return interval
+
+	remaining = deadline - time.monotonic()
+	if remaining <= 0:
+		raise TimeoutError("uploading of " + ', '.join(_unfinished(statuses, task_ids)) + " has not finished in time")
+	return min(interval, remaining)
+
+def _check_wait_args(task_ids, timeout, poll_interval, max_interval, callback, max_workers):
+	"""Validate arguments of wait and wait_async, return task ids as a list"""
+
+	if isinstance(task_ids, str):
+		task_ids = [task_ids]
+	if not isinstance(task_ids, list):
+		raise ValueError("task_ids must be a list or a string")
+	if timeout is not None and not isinstance(timeout, (int, float)):
+		raise ValueError("timeout must be a number")
+	if not isinstance(poll_interval, (int, float)) or poll_interval <= 0:
+		raise ValueError("poll_interval must be a positive number")
+	if not isinstance(max_interval, (int, float)) or max_interval < poll_interval:
+		raise ValueError("max_interval must be a number not less than poll_interval")
+	if callback is not None and not callable(callback):
+		raise ValueError("callback must be callable")
+	if not isinstance(max_workers, int) or max_workers < 1:
+		raise ValueError("max_workers must be a positive integer")
+
+	return task_ids
+
+def _fetch_status(task_id, client):
+	return client.get('/models/status/' + task_id).json()
+
+def _update_statuses(statuses, task_ids, fetched, callback):
+	"""Store fetched statuses, call the callback for the changed ones, return True if anything changed"""
+
+	changed = False
+	for task_id, r in zip(task_ids, fetched):
+		if statuses.get(task_id) != r:
+			statuses[task_id] = r
+			changed = True
+			if callback is not None:
+				callback(task_id, r)
+	return changed
+
+def _unfinished(statuses, task_ids):
+	return [task_id for task_id in task_ids if statuses[task_id]['state'] not in FINISHED_STATES]
+
+@instrumented
+def predict(model_name, X, pred_type = 'exact', prepare_columns = True, chunksize = None, max_workers = 1, retries = 0, client=None):
 	"""
 	Function uses model in the database to make a prediction on X.
 
@@ -250,19 +506,34 @@ def predict(model_name, X, pred_type = 'exact', prepare_columns = True):
 		type of the prediction: exact/prob
 	prepare_columns : boolean
 		if true and if X is an object then take column names from model in the database
+	chunksize : int, optional
+		if given then X is sent in chunks of that many rows, see models.predict_batches
+	max_workers : int
+		number of chunks sent at once, if greater than 1 and chunksize is None then X is split into max_workers chunks
+	retries : int
+		number of repetitions of the request for the chunk after the failed communication
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
 
 	Returns
 	-------
 	pandas.DataFrame
-		Returns a pandas data frame with made predictions.
+		Returns a pandas data frame with made predictions, from the prediction cache of the client if it has one
+		and the same version of the model already made the prediction on the same data, see weles.Client.
 
 	Examples
 	--------
 	models.predict('example_model', iris.drop(column='Species'))
 
 	models.predict('example_model', data, prepare_columns=False)
+
+	models.predict('example_model', 'big_data/data.csv', chunksize=100000)
+
+	models.predict('example_model', data, chunksize=10000, max_workers=8, retries=3)
 	"""
 
+	import pandas as pd
+
 	if not isinstance(model_name, str):
 		raise ValueError("model_name must be a string")
 	if not isinstance(X, (str, pd.DataFrame)):
@@ -271,54 +542,402 @@ def predict(model_name, X, pred_type = 'exact', prepare_columns = True):
 		raise ValueError("pred_type must be a string")
 	if not isinstance(prepare_columns, bool):
 		raise ValueError("prepare_columns must be a bool")
+	if chunksize is not None and (not isinstance(chunksize, int) or chunksize < 1):
+		raise ValueError("chunksize must be a positive integer")
+	if not isinstance(max_workers, int) or max_workers < 1:
+		raise ValueError("max_workers must be a positive integer")
+	if not isinstance(retries, int) or retries < 0:
+		raise ValueError("retries must be a non negative integer")
 
-	timestamp = str(datetime.now().timestamp())
+	client = get_client(client)
 
-	# url
-	url = 'http://192.168.137.64/models/' + model_name + '/predict/' + pred_type
+	cache = client.prediction_cache
+	key = _prediction_key(model_name, X, pred_type, prepare_columns, client) if cache is not None else None
+	if key is not None:
+		cached = cache.get(key)
+		if cached is not None:
+			return cached
+
+	prediction = _predict(model_name, X, pred_type, prepare_columns, chunksize, max_workers, retries, client)
+
+	if key is not None:
+		cache.put(key, prediction)
+
+	return prediction
+
+def _predict(model_name, X, pred_type, prepare_columns, chunksize, max_workers, retries, client):
+	"""Make the prediction with arguments of models.predict"""
+
+	import pandas as pd
 
 	# regexp to find out if X is a path
 	reg = re.compile("/")
 
-	# uploading data
 	if type(X) == str and reg.search(X) is None:
 		# case when X is a hash
-		body = {'is_hash': 1}
-		body['hash'] = X
+		return _predict_hash(model_name, X, pred_type, client)
 
-		# request
-		r = requests.get(url, data = body)
-	elif type(X) == str:
-		# case when X is a path
+	if chunksize is None and max_workers > 1:
+		# splitting X evenly between workers
+		if type(X) == str:
+			X = pd.read_csv(X)
+		chunksize = max(1, -(-X.shape[0] // max_workers))
 
-		body = {'is_hash': 0}
-		X = pd.read_csv(X)
-		body['data'] = X.to_csv(index=False)
+	if chunksize is not None:
+		return _concat(predict_batches(model_name, X, chunksize, pred_type, prepare_columns, max_workers, retries, client=client))
 
-		# request
-		r = requests.get(url, data=body)
+	if type(X) == str:
+		# case when X is a path
+		X = pd.read_csv(X)
+		schema = None
 	else:
 		# case when X is an object
 
 		# conversion to pandas data frame
 		X = pd.DataFrame(X)
+		schema = _schema(model_name, client) if prepare_columns else None
+
+	return _predict_frame(model_name, X, pred_type, schema, client)
+
+@instrumented
+def predict_batches(model_name, X, chunksize = 10000, pred_type = 'exact', prepare_columns = True, max_workers = 1, retries = 0, client=None):
+	"""
+	Make a prediction on X sent to the **weles** in chunks of rows, one request per chunk.
+
+	Only one chunk of the input and its predictions are held in memory at once, or 2 * max_workers chunks
+	if they are sent concurrently.
+
+	Parameters
+	----------
+	model_name : string
+		name of the model in the base that you want to use
+	X : pandas.DataFrame/string/iterable
+		pandas data frame, path to csv file (must containt '/') read in chunks, or iterable of pandas data frames
+	chunksize : int
+		number of rows sent in one request, data frames from the iterable are sent as they are
+	pred_type : string
+		type of the prediction: exact/prob
+	prepare_columns : boolean
+		if true and if X is an object then take column names from model in the database
+	max_workers : int
+		number of chunks sent at once, predictions are yielded in the order of chunks anyway
+	retries : int
+		number of repetitions of the request for the chunk after the failed communication
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
+
+	Returns
+	-------
+	generator
+		yields pandas data frames with predictions for the consecutive chunks
+
+	Examples
+	--------
+	for pred in models.predict_batches('example_model', 'big_data/data.csv', chunksize=100000):
+		pred.to_csv('predictions.csv', mode='a', header=False, index=False)
+
+	models.predict_batches('example_model', (df for df in frames))
+	"""
+
+	if not isinstance(model_name, str):
+		raise ValueError("model_name must be a string")
+	if isinstance(X, str) and re.search("/", X) is None:
+		raise ValueError("X must be a path, pandas.DataFrame or iterable of pandas.DataFrame")
+	if not isinstance(chunksize, int) or chunksize < 1:
+		raise ValueError("chunksize must be a positive integer")
+	if not isinstance(pred_type, str):
+		raise ValueError("pred_type must be a string")
+	if not isinstance(prepare_columns, bool):
+		raise ValueError("prepare_columns must be a bool")
+	if not isinstance(max_workers, int) or max_workers < 1:
+		raise ValueError("max_workers must be a positive integer")
+	if not isinstance(retries, int) or retries < 0:
+		raise ValueError("retries must be a non negative integer")
+
+	client = get_client(client)
+
+	chunks, schema = _prepare_chunks(model_name, X, chunksize, prepare_columns, client)
+	send = partial(_predict_frame, model_name, pred_type=pred_type, schema=schema, client=client)
+
+	for prediction in imap(send, chunks, max_workers, retries):
+		yield prediction
+
+@instrumented
+def predict_many(model_names, X, pred_type = 'exact', prepare_columns = True, max_workers = 4, retries = 0, client=None):
+	"""
+	Make predictions on X with many models at once, e.g. to compare the champion with challengers.
+
+	Metadata of all models is fetched at once, X is serialized once for all models having the same columns and the models are queried concurrently.
+
+	Parameters
+	----------
+	model_names : list
+		names of the models in the base
+	X : pandas.DataFrame/string
+		pandas data frame or path to csv file (must containt '/') or hash of already uploaded dataset, must have column names if prepare_columns is set to False
+	pred_type : string
+		type of the prediction: exact/prob
+	prepare_columns : boolean
+		if true and if X is an object then take column names from every model in the database
+	max_workers : int
+		number of models queried at once
+	retries : int
+		number of repetitions of the request after the failed communication
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
+
+	Returns
+	-------
+	pandas.DataFrame
+		data frame with one column of predictions per model named after the model,
+		if some model returns many columns then columns are indexed by (model name, column)
+
+	Examples
+	--------
+	models.predict_many(models.search(tags=['iris']), iris.drop(columns='Species'))
+
+	models.predict_many(['champion', 'challenger'], 'aaaaaaaaaaaaaaaaaaaaaaaaa', pred_type='prob')
+	"""
+
+	import pandas as pd
+
+	if not isinstance(model_names, list):
+		raise ValueError("model_names must be a list")
+	if not all(isinstance(model_name, str) for model_name in model_names):
+		raise ValueError("model_names must contain only strings")
+	if not isinstance(X, (str, pd.DataFrame)):
+		raise ValueError("X must be a string or pandas.DataFrame")
+	if not isinstance(pred_type, str):
+		raise ValueError("pred_type must be a string")
+	if not isinstance(prepare_columns, bool):
+		raise ValueError("prepare_columns must be a bool")
+	if not isinstance(max_workers, int) or max_workers < 1:
+		raise ValueError("max_workers must be a positive integer")
+	if not isinstance(retries, int) or retries < 0:
+		raise ValueError("retries must be a non negative integer")
+
+	client = get_client(client)
+
+	if isinstance(X, str) and re.search("/", X) is None:
+		# case when X is a hash, nothing has to be uploaded
+		send = partial(_predict_hash, X=X, pred_type=pred_type, client=client)
+	else:
+		if isinstance(X, str):
+			# case when X is a path
+			X = pd.read_csv(X)
+			prepare_columns = False
+		else:
+			X = pd.DataFrame(X)
+
+		if prepare_columns:
+			# metadata of all models is fetched at once like in info_many, schemas are then compiled from the cache
+			datasets.get_json_many({model_name: '/models/' + model_name + '/info' for model_name in model_names}, '/models/info_many', 'model_names', 'models', max_workers, client)
+
+		# models with the same input schema share one serialized payload
+		payloads = {}
+		def payload_of(model_name):
+			schema = _schema(model_name, client) if prepare_columns else None
+			if schema not in payloads:
+				payloads[schema] = _payload(X, schema, client)
+			return payloads[schema]
+
+		payloads_of_models = {model_name: payload_of(model_name) for model_name in model_names}
+
+		def send(model_name):
+			return _predict_payload(model_name, payloads_of_models[model_name], pred_type, client)
+
+	predictions = list(imap(send, model_names, max_workers, retries))
+
+	if len(predictions) == 0:
+		return pd.DataFrame()
+	if all(prediction.shape[1] == 1 for prediction in predictions):
+		result = pd.concat([prediction.iloc[:, 0] for prediction in predictions], axis=1)
+		result.columns = model_names
+		return result
+	return pd.concat(predictions, axis=1, keys=model_names)
+
+def _prediction_key(model_name, X, pred_type, prepare_columns, client):
+	"""Key of the prediction in the prediction cache, None if it cannot be cached"""
+
+	if type(X) == str and re.search("/", X) is not None:
+		# the file may change between calls
+		return None
+
+	if type(X) == str:
+		input_hash = X
+	else:
+		# the same hash as of the uploaded dataset, so predictions on a data frame and on its hash are shared
+		input_hash = datasets.content_hash(X) if prepare_columns else 'unprepared ' + datasets.content_hash(X)
+
+	version = local.version(client.get_json('/models/' + model_name + '/info')['model'])
+	return client.prediction_cache.key(model_name, version, input_hash, pred_type)
+
+def _predict_hash(model_name, X, pred_type, client):
+	"""Make the prediction on already uploaded dataset"""
+
+	r = client.get('/models/' + model_name + '/predict/' + pred_type, data = {'is_hash': 1, 'hash': X}, headers = {'Accept': formats.accept(client.payload_format)})
+	r.raise_for_status()
+
+	return formats.read_response(r, header=None)
+
+@instrumented
+async def predict_async(model_name, X, pred_type = 'exact', prepare_columns = True, chunksize = 10000, max_workers = 4, retries = 0, client=None):
+	"""
+	Asynchronous version of models.predict, keeping max_workers requests with chunks of X outstanding.
+
+	Parameters
+	----------
+	model_name : string
+		name of the model in the base that you want to use
+	X : pandas.DataFrame/string/iterable
+		pandas data frame, path to csv file (must containt '/') read in chunks, iterable of pandas data frames or hash of already uploaded dataset
+	pred_type : string
+		type of the prediction: exact/prob
+	prepare_columns : boolean
+		if true and if X is an object then take column names from model in the database
+	chunksize : int
+		number of rows sent in one request, data frames from the iterable are sent as they are
+	max_workers : int
+		number of outstanding requests
+	retries : int
+		number of repetitions of the request for the chunk after the failed communication
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
+
+	Returns
+	-------
+	pandas.DataFrame
+		Returns a pandas data frame with made predictions, in the order of rows of X.
+
+	Examples
+	--------
+	await models.predict_async('example_model', data, chunksize=10000, max_workers=8)
+
+	asyncio.run(models.predict_async('example_model', 'big_data/data.csv'))
+	"""
+
+	if not isinstance(model_name, str):
+		raise ValueError("model_name must be a string")
+	if not isinstance(chunksize, int) or chunksize < 1:
+		raise ValueError("chunksize must be a positive integer")
+	if not isinstance(pred_type, str):
+		raise ValueError("pred_type must be a string")
+	if not isinstance(prepare_columns, bool):
+		raise ValueError("prepare_columns must be a bool")
+	if not isinstance(max_workers, int) or max_workers < 1:
+		raise ValueError("max_workers must be a positive integer")
+	if not isinstance(retries, int) or retries < 0:
+		raise ValueError("retries must be a non negative integer")
+
+	client = get_client(client)
+
+	if isinstance(X, str) and re.search("/", X) is None:
+		# case when X is a hash, there is nothing to split
+		send = partial(predict, model_name, pred_type=pred_type, prepare_columns=prepare_columns, client=client)
+		return await _first(aimap(send, [X], 1, retries))
+
+	# fetching the schema and validating X run in a thread, they would block the event loop
+	loop = asyncio.get_running_loop()
+	chunks, schema = await loop.run_in_executor(None, copy_context().run, _prepare_chunks, model_name, X, chunksize, prepare_columns, client)
+	send = partial(_predict_frame, model_name, pred_type=pred_type, schema=schema, client=client)
+
+	return _concat([prediction async for prediction in aimap(send, chunks, max_workers, retries)])
+
+async def _first(results):
+	async for result in results:
+		return result
 
+def _prepare_chunks(model_name, X, chunksize, prepare_columns, client):
+	"""Iterable of chunks of X and the schema preparing them, None if they need no preparation"""
+
+	import pandas as pd
+
+	schema = None
+	if type(X) == str:
+		# case when X is a path, the file is never read as a whole
+		chunks = pd.read_csv(X, chunksize=chunksize)
+	else:
 		if prepare_columns:
-			model_info = info(model_name)
-			columns = model_info['columns']
-			target = model_info['model']['target']
-			columns = columns.sort_values('id')
-			columns = columns.loc[columns['name'] != target, 'name']
-			X.columns = columns
+			schema = _schema(model_name, client)
+		if schema is not None and isinstance(X, pd.DataFrame):
+			# the whole data frame is validated before any chunk is sent
+			X = schema.prepare(X)
+			schema = None
+		chunks = _chunks(X, chunksize)
+
+	return chunks, schema
+
+def _chunks(X, chunksize):
+	"""Split the data frame into chunks of rows, pass through other iterables"""
+
+	import pandas as pd
 
-		body = {'is_hash': 0, 'data': X.to_csv(index=False)}
+	if isinstance(X, pd.DataFrame):
+		for start in range(0, X.shape[0], chunksize):
+			yield X.iloc[start:start + chunksize]
+	else:
+		for chunk in X:
+			yield pd.DataFrame(chunk)
+
+def _concat(predictions):
+	"""Join predictions made for the consecutive chunks"""
+
+	import pandas as pd
+
+	predictions = list(predictions)
+	if len(predictions) == 0:
+		return pd.DataFrame()
+	return pd.concat(predictions, ignore_index=True)
+
+def _predict_frame(model_name, X, pred_type, schema, client):
+	"""Send the data frame to the model and parse the prediction"""
+
+	return _predict_payload(model_name, _payload(X, schema, client), pred_type, client)
+
+def _payload(X, schema, client):
+	"""Form fields and files of the prediction request with data frame X"""
+
+	if schema is not None:
+		X = schema.prepare(X)
+
+	body = {'is_hash': 0}
+	files = {}
+	formats.attach(body, files, 'data', X, client.payload_format)
+
+	return body, files
+
+def _predict_payload(model_name, payload, pred_type, client):
+	"""Send already serialized data to the model and parse the prediction"""
+
+	body, files = payload
 
-		# request
-		r = requests.get(url, data = body)
+	# asking for the preferred format of the result
+	headers = {'Accept': formats.accept(client.payload_format)}
 
-	return pd.read_csv(StringIO(r.text), header=None)
+	r = client.get('/models/' + model_name + '/predict/' + pred_type, data = body, files = files, headers = headers)
 
-def info(model_name):
+	# failed chunk has to be noticed, not parsed as a prediction
+	r.raise_for_status()
+
+	return formats.read_response(r, header=None)
+
+def _schema(model_name, client):
+	"""Compiled input schema of the model, reused by the client until the model changes"""
+
+	# raw cached metadata, no need to build data frames of audits and aliases
+	model_info = client.get_json('/models/' + model_name + '/info')
+	version = local.version(model_info['model'])
+
+	cached = client.schemas.get(model_name)
+	if cached is not None and cached[0] == version:
+		return cached[1]
+
+	compiled = Schema.from_info(model_info)
+	client.schemas[model_name] = (version, compiled)
+	return compiled
+
+@instrumented
+def info(model_name, client=None):
 	"""
 	Get the information about model.
 
@@ -326,6 +945,8 @@ def info(model_name):
 	----------
 	model_name : string
 		name of the model in the **weles** base
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
 
 	Returns
 	-------
@@ -341,18 +962,64 @@ def info(model_name):
 	models.info('example_model')['data']['dataset_id']
 	"""
 
+	import pandas as pd
+
 	if not isinstance(model_name, str):
 		raise ValueError("model_name must be a string")
 
-	r = requests.get('http://192.168.137.64/models/' + model_name + '/info')
-	r = r.json()
+	client = get_client(client)
+
+	r = client.get_json('/models/' + model_name + '/info')
 	r['audits'] = pd.DataFrame(r['audits'])
 	r['columns'] = pd.DataFrame(r['columns'])
 	r['aliases'] = pd.DataFrame(r['aliases'])
 
 	return r
 
-def search(language=None, language_version=None, row=None, column=None, missing=None, classes=None, owner=None, tags=None, regex=None):
+@instrumented
+def info_many(model_names, max_workers=8, client=None):
+	"""
+	Get the information about many models at once.
+
+	All models are asked for in one request, models with fresh cached metadata are not asked for at all.
+	If the weles has no batch endpoint, models are asked for concurrently one by one.
+
+	Parameters
+	----------
+	model_names : list
+		names of the models in the **weles** base
+	max_workers : int
+		number of concurrent requests if the weles has no batch endpoint
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
+
+	Returns
+	-------
+	dict
+		dictionary with fields: model, data, columns, audits and aliases, each one is a data frame
+		of all models with the model_name column
+
+	Examples
+	--------
+	models.info_many(['example_model', 'example_model2'])
+
+	models.info_many(models.search(owner='Example user'))['audits']
+	"""
+
+	if not isinstance(model_names, list) or not all(isinstance(model_name, str) for model_name in model_names):
+		raise ValueError("model_names must be a list of strings")
+	if not isinstance(max_workers, int) or max_workers < 1:
+		raise ValueError("max_workers must be a positive integer")
+
+	client = get_client(client)
+
+	paths = {model_name: '/models/' + model_name + '/info' for model_name in model_names}
+	infos = datasets.get_json_many(paths, '/models/info_many', 'model_names', 'models', max_workers, client)
+
+	return datasets.info_frames(infos, 'model_name')
+
+@instrumented
+def search(language=None, language_version=None, row=None, column=None, missing=None, classes=None, owner=None, tags=None, regex=None, fields=None, page_size=None, client=None):
 	"""Search weles base for models with specific restrictions. If all parameters are set to None, then returns all models' name in weles.
 
 	Parameters
@@ -385,11 +1052,18 @@ def search(language=None, language_version=None, row=None, column=None, missing=
 		list of tags, all should be strings
 	regex : string
 		regex for models' names
+	fields : list, optional
+		names of metadata fields returned together with models' names, e.g. ['owner', 'tags', 'language']
+	page_size : int, optional
+		number of models fetched in one request, all pages are fetched
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
 
 	Returns
 	-------
-	list
-		Returns a list of models' names that satisfies given restrictions
+	list/pandas.DataFrame
+		Returns a list of models' names that satisfies given restrictions,
+		or a data frame with the name column and requested fields if fields is given
 
 	Examples
 	--------
@@ -398,6 +1072,35 @@ def search(language=None, language_version=None, row=None, column=None, missing=
 	models.search(owner='Example user')
 
 	models.search(regex='^abc.*xxx$')
+
+	models.search(tags=['iris'], fields=['owner', 'language'])
+	"""
+
+	import pandas as pd
+
+	results = list(search_iter(language, language_version, row, column, missing, classes, owner, tags, regex, fields, page_size, client=client))
+
+	if fields is None:
+		return results
+	return pd.DataFrame(results, columns=['name'] + fields)
+
+@instrumented
+def search_iter(language=None, language_version=None, row=None, column=None, missing=None, classes=None, owner=None, tags=None, regex=None, fields=None, page_size=100, client=None):
+	"""Search weles base for models with specific restrictions, fetching the results lazily page by page.
+
+	Parameters are the same as of models.search.
+
+	Returns
+	-------
+	generator
+		yields models' names, or dictionaries with the name and requested fields if fields is given
+
+	Examples
+	--------
+	for name in models.search_iter(owner='Example user'):
+		print(name)
+
+	next(models.search_iter(tags=['iris'], fields=['owner']))
 	"""
 
 	if language is not None and not isinstance(language, str):
@@ -418,14 +1121,53 @@ def search(language=None, language_version=None, row=None, column=None, missing=
 		raise ValueError("tags must be a list")
 	if regex is not None and not isinstance(regex, str):
 		raise ValueError("regex must be a string")
+	if fields is not None and (not isinstance(fields, list) or not all(isinstance(field, str) for field in fields)):
+		raise ValueError("fields must be a list of strings")
+	if page_size is not None and (not isinstance(page_size, int) or page_size < 1):
+		raise ValueError("page_size must be a positive integer")
 
 	data = {'language': language, 'language_version': language_version, 'row': row, 'column': column, 'missing': missing, 'classes': classes, 'owner': owner, 'tags': tags, 'regex': regex}
-	r = requests.get('http://192.168.137.64/models/search', data=data)
-	return r.json()['models']
+	if fields is not None:
+		data['fields'] = fields
+	if page_size is not None:
+		data['page_size'] = page_size
+
+	client = get_client(client)
+
+	while True:
+		r = client.get('/models/search', data=data).json()
+
+		models = r['models']
+		if fields is not None:
+			models = _project(models, fields, client)
+
+		for model in models:
+			yield model
+
+		# weles without pagination returns everything at once
+		if not r.get('next'):
+			return
+		data['cursor'] = r['next']
+
+def _project(models, fields, client):
+	"""Dictionaries with names and requested fields of found models"""
+
+	def project(model):
+		if isinstance(model, str):
+			# the weles returned only the name, fields are taken from the cached metadata
+			name = model
+			model = client.get_json('/models/' + name + '/info')['model']
+			model['name'] = name
+		return dict({'name': model.get('name')}, **{field: model.get(field) for field in fields})
 
-def audit(model_name, measure, data, target, data_name=None, data_desc=None):
+	return list(imap(project, models, 8))
+
+@instrumented
+def audit(model_name, measure, data, target, data_name=None, data_desc=None, dedup=True, strict=False, client=None):
 	"""Audit the model
 
+	If you are not logged in with auth.login, you will be asked for the user name and password.
+
 	Parameters
 	----------
 	model_name : string
@@ -440,6 +1182,12 @@ def audit(model_name, measure, data, target, data_name=None, data_desc=None):
 		optional, name of the dataset that will be visible in the **weles**, unnecessary if data is a hash
 	data_desc : string
 		optional, description of the dataset, unnecessary if data is a hash
+	dedup : bool
+		if true and data is already in the weles then only its hash is sent
+	strict : bool
+		if true then the refused audit raises requests.HTTPError instead of returning the information from the weles
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
 
 	Returns
 	-------
@@ -449,25 +1197,16 @@ def audit(model_name, measure, data, target, data_name=None, data_desc=None):
 	Examples
 	--------
 	models.audit('example_model', 'acc', iris, 'Species', 'iris', 'example dataset')
-		-> user: 'example_user'
-		-> password:
 
 	models.audit('example_model', 'mae', 'aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa', 'target')
-		-> user: 'example_user'
-		-> password:
 	"""
 
-	user = input('user: ')
-	password = getpass('password: ')
+	import pandas as pd
 
 	if not isinstance(model_name, str):
 		raise ValueError("model_name must be a string")
 	if not isinstance(measure, str):
 		raise ValueError("measure must be a string")
-	if not isinstance(user, str):
-		raise ValueError("user must be a string")
-	if not isinstance(password, str):
-		raise ValueError("password must be a string")
 	if not isinstance(data, (pd.DataFrame, str)):
 		raise ValueError("data must be a string or pd.DataFrame")
 	if not isinstance(target, str):
@@ -476,11 +1215,146 @@ def audit(model_name, measure, data, target, data_name=None, data_desc=None):
 		raise ValueError("data_name must be a str")
 	if data_desc is not None and not isinstance(data_desc, str):
 		raise ValueError("data_name must be a str")
+	if not isinstance(strict, bool):
+		raise ValueError("strict must be a boolean")
 
-	info = {'model_name': model_name, 'measure': measure, 'user': user, 'password': password, 'target': target}
+	client = get_client(client)
 
-	timestamp = str(datetime.now().timestamp())
-	del_data = False
+	info = {'model_name': model_name, 'measure': measure, 'target': target}
+	info.update(auth.fields(user_key='user', client=client))
+
+	data_fields, files = _audit_data(data, data_name, data_desc, dedup, client)
+	info.update(data_fields)
+
+	r = client.post('/models/audit', data=info, files=files)
+
+	# new audit changes metadata of the model
+	invalidate(model_name, client=client)
+
+	if strict:
+		r.raise_for_status()
+
+	return r.json()
+
+@instrumented
+def audit_many(model_names, measures, data, target, data_name=None, data_desc=None, dedup=True, max_workers=4, client=None):
+	"""Audit many models with many measures on one dataset, which is uploaded only once.
+
+	All pairs of models and measures are submitted in one batch request. Whether the **weles** supports batches is checked
+	once per client. If it does not, the first audit uploads the dataset and the remaining ones refer to it by the hash
+	confirmed by the weles and run concurrently.
+
+	Parameters
+	----------
+	model_names : list
+		names of the models in the **weles** base to make an audit of
+	measures : list
+		names of the measures, each must be one of supported
+	data : array-like/string
+		data frame to make an audit on or hash of already uploaded data in the **weles** or path to the dataset
+	target : string
+		name of the column in the dataset that should be used as the target
+	data_name : string
+		optional, name of the dataset that will be visible in the **weles**, unnecessary if data is a hash
+	data_desc : string
+		optional, description of the dataset, unnecessary if data is a hash
+	dedup : bool
+		if true and data is already in the weles then only its hash is sent
+	max_workers : int
+		number of audits run at once if the weles does not support batches
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
+
+	Returns
+	-------
+	pandas.DataFrame
+		data frame with columns model_name, measure and result, one row per audit
+
+	Raises
+	------
+	requests.HTTPError
+		if the weles refused the batch or any of the audits sent one by one
+
+	Examples
+	--------
+	models.audit_many(models.search(owner='example_user'), ['acc', 'auc'], iris, 'Species', 'iris', 'example dataset')
+	"""
+
+	import pandas as pd
+
+	if not isinstance(model_names, list) or not all(isinstance(model_name, str) for model_name in model_names):
+		raise ValueError("model_names must be a list of strings")
+	if not isinstance(measures, list) or not all(isinstance(measure, str) for measure in measures):
+		raise ValueError("measures must be a list of strings")
+	if not isinstance(data, (pd.DataFrame, str)):
+		raise ValueError("data must be a string or pd.DataFrame")
+	if not isinstance(target, str):
+		raise ValueError("target must be a string")
+	if data_name is not None and not isinstance(data_name, str):
+		raise ValueError("data_name must be a str")
+	if data_desc is not None and not isinstance(data_desc, str):
+		raise ValueError("data_desc must be a str")
+	if not isinstance(max_workers, int) or max_workers < 1:
+		raise ValueError("max_workers must be a positive integer")
+
+	client = get_client(client)
+
+	pairs = [(model_name, measure) for model_name in model_names for measure in measures]
+	if len(pairs) == 0:
+		return pd.DataFrame(columns=['model_name', 'measure', 'result'])
+
+	if isinstance(data, str) and re.search("/", data) is not None:
+		# case when data is a path, read once for hashing and uploading
+		data = pd.read_csv(data)
+
+	info = {'target': target}
+	info.update(auth.fields(user_key='user', client=client))
+
+	data_fields, files = _audit_data(data, data_name, data_desc, dedup, client)
+	info.update(data_fields)
+
+	if client.supports('POST', '/models/audit_many'):
+		r = client.post('/models/audit_many', data=dict(info, model_names=model_names, measures=measures), files=files)
+		r.raise_for_status()
+		results = pd.DataFrame(r.json()['results'])
+	else:
+		# the weles audits one pair per request
+		def send(pair, info, files):
+			r = client.post('/models/audit', data=dict(info, model_name=pair[0], measure=pair[1]), files=files)
+			# a refused audit fails the whole call, like the refused batch
+			r.raise_for_status()
+			return r.json()
+
+		values = []
+		remaining = pairs
+		if info['is_hash'] == 0:
+			# the first audit uploads the dataset, the other ones refer to it by its hash
+			values.append(send(pairs[0], info, files))
+			remaining = pairs[1:]
+
+			# the weles confirms the hash of the stored dataset, otherwise every audit sends it
+			dataset_id = datasets.uploaded_hash(data, client=client) if remaining else None
+			if dataset_id is not None:
+				info = {key: value for key, value in info.items() if key not in ('data', 'format', 'data_name', 'data_desc')}
+				info.update({'is_hash': 1, 'hash': dataset_id, 'is_data_name': 0})
+				files = {}
+
+		values += list(imap(partial(send, info=info, files=files), remaining, max_workers))
+
+		results = pd.DataFrame({'model_name': [pair[0] for pair in pairs], 'measure': [pair[1] for pair in pairs], 'result': values})
+
+	for model_name in model_names:
+		invalidate(model_name, client=client)
+
+	return results
+
+def _audit_data(data, data_name, data_desc, dedup, client):
+	"""Form fields and files with the audit dataset"""
+
+	import pandas as pd
+
+	info = {}
+	files = {}
 
 	# regexp to find out if data is a path
 	reg = re.compile("/")
@@ -500,21 +1374,29 @@ def audit(model_name, measure, data, target, data_name=None, data_desc=None):
 		if data_name is None:
 			info['is_data_name'] = 0
 
-	elif type(data) == str:
-		# case when data is a path
+	else:
 		info['is_hash'] = 0
 
-		data = pd.read_csv(data)
-		info['data'] = data.to_csv(index=False)
-	else:
-		# case when data is an object
+		if type(data) == str:
+			# case when data is a path
+			data = pd.read_csv(data)
+		else:
+			# case when data is an object
 
-		info['is_hash'] = 0
+			# conversion to pandas data frame
+			data = pd.DataFrame(data)
 
-		# conversion to pandas data frame
-		data = pd.DataFrame(data)
+		dataset_id = datasets.uploaded_hash(data, client=client) if dedup else None
 
-		info['data'] = data.to_csv(index=False)
+		if dataset_id is not None:
+			# the same dataset is already in the weles, sending only its hash
+			info['is_hash'] = 1
+			info['hash'] = dataset_id
+
+			if data_name is None:
+				info['is_data_name'] = 0
+		else:
+			formats.attach(info, files, 'data', data, client.payload_format)
 
 	if info['is_data_name'] == 1:
 
@@ -524,17 +1406,18 @@ def audit(model_name, measure, data, target, data_name=None, data_desc=None):
 		elif type(data_desc) == str:
 			info['data_desc'] = data_desc
 
-	r = requests.post('http://192.168.137.64/models/audit', data=info)
-
-	return r.json()
+	return info, files
 
-def requirements(model):
+@instrumented
+def requirements(model, client=None):
 	"""Get the list of package requirements
 
 	Parameters
 	----------
 	model : string
 		name of the model
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
 
 	Returns
 	-------
@@ -549,5 +1432,100 @@ def requirements(model):
 	if not isinstance(model, str):
 		raise ValueError("model must be a string")
 
-	r = requests.get('http://192.168.137.64/models/' + model + '/requirements')
-	return r.json()
+	client = get_client(client)
+
+	return client.get_json('/models/' + model + '/requirements')
+
+def invalidate(model_name=None, client=None):
+	"""Remove cached metadata of the model, so next call of info, requirements or predict fetches it from the **weles**
+
+	Parameters
+	----------
+	model_name : string, optional
+		name of the model, if None then all cached metadata is removed
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
+
+	Examples
+	--------
+	models.invalidate('example_model')
+
+	models.invalidate()
+	"""
+
+	if model_name is not None and not isinstance(model_name, str):
+		raise ValueError("model_name must be a string")
+
+	client = get_client(client)
+
+	if model_name is None:
+		client.metadata_cache.invalidate()
+		client.schemas.clear()
+	else:
+		client.metadata_cache.invalidate('/models/' + model_name + '/info')
+		client.metadata_cache.invalidate('/models/' + model_name + '/requirements')
+		client.schemas.pop(model_name, None)
+
+@instrumented
+def load_local(model_name, check_requirements=True, cache_dir=None, client=None):
+	"""Download the model from the **weles** to make predictions in the local process, without any request per prediction.
+
+	The pickle is downloaded once per version of the model and kept in the cache directory.
+
+	Parameters
+	----------
+	model_name : string
+		name of the model in the **weles** base
+	check_requirements : bool
+		if true then ValueError is raised when the language, its version or required packages of the model differ from the current environment
+	cache_dir : string, optional
+		directory of downloaded models, weles.local.MODEL_CACHE_DIR if None
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
+
+	Returns
+	-------
+	weles.local.LocalModel
+		model with the predict method returning the same data frames as models.predict
+
+	Examples
+	--------
+	model = models.load_local('example_model')
+
+	model.predict(iris.drop(columns='Species'))
+	"""
+
+	if not isinstance(model_name, str):
+		raise ValueError("model_name must be a string")
+	if not isinstance(check_requirements, bool):
+		raise ValueError("check_requirements must be a bool")
+	if cache_dir is not None and not isinstance(cache_dir, str):
+		raise ValueError("cache_dir must be a string")
+
+	client = get_client(client)
+
+	model_info = client.get_json('/models/' + model_name + '/info')
+	version = local.version(model_info['model'])
+
+	if check_requirements:
+		found = local.mismatches(model_info['model'], requirements(model_name, client=client))
+		if len(found) > 0:
+			raise ValueError("model " + model_name + " cannot run locally: " + '; '.join(found))
+
+	directory = os.path.join(cache_dir or local.MODEL_CACHE_DIR, model_name, version)
+	path = os.path.join(directory, 'model.pkl')
+
+	if not os.path.exists(path):
+		os.makedirs(directory, exist_ok=True)
+
+		r = client.get('/models/' + model_name + '/download', stream = True)
+		r.raise_for_status()
+
+		# writing to the temporary file first, so other processes never load a partial pickle
+		tmp = path + '.' + str(os.getpid()) + '.tmp'
+		with r, open(tmp, 'wb') as f:
+			r.raw.decode_content = True
+			shutil.copyfileobj(r.raw, f)
+		os.replace(tmp, path)
+
+	return local.LocalModel(model_name, version, local.load(path), Schema.from_info(model_info), path)
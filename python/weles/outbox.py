@@ -0,0 +1,428 @@
+"""@package docstring
+The module with the durable local queue of submissions to the **weles**
+
+The weles is reachable only from the MINI network. Uploads of models and datasets and audits put into the outbox
+return a local id at once and are sent by a background thread when the weles can be reached. Entries are kept in
+the SQLite database, their arguments in pickles next to it, so they survive restarts of the process. An entry goes
+through the states:
+	PENDING  waiting to be sent, failed communication is repeated with exponentially growing intervals
+	SENDING  being sent, entries left in this state by a stopped process are sent again
+	SENT     model upload accepted by the weles, its task is reconciled with models.status
+	SUCCESS  finished, result holds the result of the weles function
+	FAILURE  refused by the weles or failed for good, error holds the reason
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+from threading import Thread, Event
+
+import requests
+
+from .client import get_client
+from .concurrency import imap
+from . import auth, local
+
+# directory of the default outbox
+OUTBOX_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'weles', 'outbox')
+
+# states of entries which are not changed anymore
+FINISHED_STATES = ('SUCCESS', 'FAILURE')
+
+logger = logging.getLogger('weles')
+
+class Outbox:
+	"""Durable queue of uploads and audits sent to the **weles** in the background.
+
+	The client must be able to authenticate without asking for the password: be logged in with auth.login
+	or have credentials in WELES_TOKEN or WELES_USER and WELES_PASSWORD environment variables.
+
+	Parameters
+	----------
+	directory : string, optional
+		directory of the database and pickled arguments, ~/.cache/weles/outbox if None
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
+	interval : float
+		seconds between flushes made by the background thread
+	batch_size : int
+		maximum number of entries sent in one flush, audits of the same data are sent in one batch request
+	max_workers : int
+		number of entries sent at once
+	backoff_factor : float
+		the n-th repetition of the entry is made at least backoff_factor * 2 ** (n - 1) seconds after the failure
+	max_backoff : float
+		maximum number of seconds between repetitions
+	max_attempts : int, optional
+		number of failed attempts after which the entry fails for good, repeated until it is sent if None
+	start : bool
+		if true then the background thread is started at once
+
+	Examples
+	--------
+	outbox = Outbox()
+
+	local_id = outbox.upload_model(model, 'example_model', 'This is an example model.', 'target', ['example'], data, 'example_data', 'This is an example dataset', 'requirements.txt')
+
+	outbox.status(local_id)['state']
+
+	with Outbox(start=False) as outbox:
+		outbox.audit('example_model', 'acc', data, 'target', 'example_data', 'This is an example dataset')
+		outbox.flush()
+	"""
+
+	def __init__(self, directory=None, client=None, interval=30, batch_size=32, max_workers=4, backoff_factor=1, max_backoff=600, max_attempts=None, start=True):
+
+		if directory is not None and not isinstance(directory, str):
+			raise ValueError("directory must be a string")
+		if not isinstance(interval, (int, float)) or interval <= 0:
+			raise ValueError("interval must be a positive number")
+		if not isinstance(batch_size, int) or batch_size < 1:
+			raise ValueError("batch_size must be a positive integer")
+		if not isinstance(max_workers, int) or max_workers < 1:
+			raise ValueError("max_workers must be a positive integer")
+		if not isinstance(backoff_factor, (int, float)) or backoff_factor < 0:
+			raise ValueError("backoff_factor must be a non negative number")
+		if not isinstance(max_backoff, (int, float)) or max_backoff < 0:
+			raise ValueError("max_backoff must be a non negative number")
+		if max_attempts is not None and (not isinstance(max_attempts, int) or max_attempts < 1):
+			raise ValueError("max_attempts must be a positive integer")
+
+		self.directory = directory or OUTBOX_DIR
+		self.client = client
+		self.interval = interval
+		self.batch_size = batch_size
+		self.max_workers = max_workers
+		self.backoff_factor = backoff_factor
+		self.max_backoff = max_backoff
+		self.max_attempts = max_attempts
+
+		os.makedirs(self.directory, exist_ok=True)
+		self.path = os.path.join(self.directory, 'outbox.sqlite')
+		self._execute('CREATE TABLE IF NOT EXISTS entries (local_id TEXT PRIMARY KEY, kind TEXT, batch_key TEXT, state TEXT, '
+			'attempts INTEGER, next_attempt REAL, created REAL, task_id TEXT, result TEXT, error TEXT)')
+		# entries of the process stopped while sending them, datasets sent again are deduplicated by the weles
+		self._execute("UPDATE entries SET state = 'PENDING' WHERE state = 'SENDING'")
+
+		self._stopped = Event()
+		self._thread = None
+		if start:
+			self.start()
+
+	def upload_model(self, model, model_name, model_desc, target, tags, train_dataset, train_dataset_name=None, dataset_desc=None, requirements_file=None, dedup=True, part_size=None, compress=False):
+		"""Put models.upload into the outbox, the arguments are the same.
+
+		Returns
+		-------
+		string
+			local id of the entry
+		"""
+
+		if not isinstance(model_name, str) or not model_name.replace('_', '').isalnum():
+			raise ValueError("model_name must be a string of alphanumerical signs")
+
+		return self._enqueue('model', None, (model, model_name, model_desc, target, tags, train_dataset, train_dataset_name, dataset_desc, requirements_file),
+			{'dedup': dedup, 'part_size': part_size, 'compress': compress})
+
+	def upload_dataset(self, data, data_name, data_desc, dedup=False):
+		"""Put datasets.upload into the outbox, the arguments are the same.
+
+		Returns
+		-------
+		string
+			local id of the entry
+		"""
+
+		return self._enqueue('dataset', None, (data, data_name, data_desc), {'dedup': dedup})
+
+	def audit(self, model_name, measure, data, target, data_name=None, data_desc=None, dedup=True):
+		"""Put models.audit into the outbox, the arguments are the same.
+
+		Audits of many models on the same data with the same measure are sent in one models.audit_many request.
+
+		Returns
+		-------
+		string
+			local id of the entry
+		"""
+
+		from . import datasets
+
+		if not isinstance(model_name, str):
+			raise ValueError("model_name must be a string")
+
+		data_key = data if isinstance(data, str) else datasets.content_hash(data)
+		batch_key = json.dumps([data_key, target, data_name, data_desc, dedup, measure])
+		return self._enqueue('audit', batch_key, (model_name, measure, data, target, data_name, data_desc), {'dedup': dedup})
+
+	def status(self, local_id):
+		"""Get the state of the entry.
+
+		Parameters
+		----------
+		local_id : string
+			local id returned when the entry was put into the outbox
+
+		Returns
+		-------
+		dict
+			dictionary with fields: local_id, kind, state, attempts, created, task_id, result, error
+		"""
+
+		rows = self._select('WHERE local_id = ?', (local_id,))
+		if len(rows) == 0:
+			raise ValueError("unknown local_id: " + str(local_id))
+		return rows[0]
+
+	def entries(self, state=None):
+		"""Get all entries of the outbox, optionally only those in the state.
+
+		Returns
+		-------
+		pandas.DataFrame
+			data frame with columns of outbox.status, one row per entry in the order they were put
+		"""
+
+		import pandas as pd
+
+		rows = self._select('WHERE state = ? ORDER BY created', (state,)) if state is not None else self._select('ORDER BY created')
+		return pd.DataFrame(rows, columns=['local_id', 'kind', 'state', 'attempts', 'created', 'task_id', 'result', 'error'])
+
+	def retry(self, local_id):
+		"""Send the failed entry again"""
+
+		if self.status(local_id)['state'] != 'FAILURE':
+			raise ValueError("only failed entries can be sent again")
+		self._execute("UPDATE entries SET state = 'PENDING', attempts = 0, next_attempt = 0, error = NULL WHERE local_id = ?", (local_id,))
+
+	def purge(self):
+		"""Remove finished entries from the outbox"""
+
+		for row in self._execute('SELECT local_id FROM entries WHERE state IN (?, ?)', FINISHED_STATES):
+			self._remove_arguments(row[0])
+		self._execute('DELETE FROM entries WHERE state IN (?, ?)', FINISHED_STATES)
+
+	def flush(self):
+		"""Send pending entries whose time has come and reconcile uploaded models with models.status.
+
+		Returns
+		-------
+		int
+			number of entries which changed their state
+		"""
+
+		client = get_client(self.client)
+		return self._reconcile(client) + self._send(client)
+
+	def start(self):
+		"""Start the background thread flushing the outbox every interval seconds"""
+
+		if self._thread is not None and self._thread.is_alive():
+			return
+		self._stopped.clear()
+		self._thread = Thread(target=self._run, name='weles-outbox', daemon=True)
+		self._thread.start()
+
+	def stop(self):
+		"""Stop the background thread, entries which are not sent stay in the outbox"""
+
+		self._stopped.set()
+		if self._thread is not None:
+			self._thread.join()
+			self._thread = None
+
+	def close(self):
+		self.stop()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def __repr__(self):
+		return 'Outbox(' + repr(self.directory) + ')'
+
+	def _run(self):
+		while not self._stopped.is_set():
+			try:
+				if self._can_authenticate():
+					self.flush()
+				else:
+					logger.warning("outbox of %s is not flushed, the client is not logged in", self.directory)
+			except Exception:
+				# the thread has to keep running, failures of entries are recorded in them
+				logger.exception("flushing outbox of %s failed", self.directory)
+			self._stopped.wait(self.interval)
+
+	def _can_authenticate(self):
+		"""Check if auth.fields would not ask for the password"""
+
+		client = get_client(self.client)
+		if client.token is not None or client.credentials is not None:
+			return True
+		if os.environ.get('WELES_TOKEN') or (os.environ.get('WELES_USER') and os.environ.get('WELES_PASSWORD')):
+			return True
+		return client.base_url in auth._read_tokens()
+
+	def _enqueue(self, kind, batch_key, args, kwargs):
+		local_id = uuid.uuid4().hex
+
+		# arguments are written before the entry, so the flusher never finds an entry without them
+		path = self._arguments_path(local_id)
+		with open(path + '.tmp', 'wb') as f:
+			local.dump((args, kwargs), f)
+		os.replace(path + '.tmp', path)
+
+		self._execute("INSERT INTO entries VALUES (?, ?, ?, 'PENDING', 0, 0, ?, NULL, NULL, NULL)", (local_id, kind, batch_key, time.time()))
+		return local_id
+
+	def _send(self, client):
+		from . import models
+
+		rows = self._execute("SELECT local_id, kind, batch_key, attempts FROM entries WHERE state = 'PENDING' AND next_attempt <= ? ORDER BY created LIMIT ?",
+			(time.time(), self.batch_size))
+
+		# entries taken by this flush, none of them is sent twice
+		claimed = []
+		for row in rows:
+			if self._execute("UPDATE entries SET state = 'SENDING' WHERE local_id = ? AND state = 'PENDING'", (row[0],), rowcount=True) == 1:
+				claimed.append(row)
+
+		batches = {}
+		for local_id, kind, batch_key, attempts in claimed:
+			key = (kind, batch_key) if kind == 'audit' else (kind, local_id)
+			batches.setdefault(key, []).append((local_id, attempts))
+
+		def call(kind, args, kwargs):
+			if kind == 'model':
+				result = models.upload(*args, client=client, **kwargs)
+				if not isinstance(result, str):
+					raise ValueError("the weles refused the model: " + str(result))
+				return result
+			# refused requests raise, so they are not recorded as finished
+			if kind == 'dataset':
+				from . import datasets
+				return datasets.upload(*args, client=client, **dict(kwargs, strict=True))
+			return models.audit(*args, client=client, **dict(kwargs, strict=True))
+
+		def send(batch):
+			(kind, batch_key), entries = batch
+			try:
+				arguments = [self._load_arguments(local_id) for local_id, attempts in entries]
+			except Exception as e:
+				return kind, entries, [(None, e)] * len(entries)
+
+			# without the batch endpoint audits are sent one by one, so every refused audit fails only its entry
+			if len(entries) > 1 and client.supports('POST', '/models/audit_many'):
+				args, kwargs = arguments[0]
+				model_names = [entry_args[0] for entry_args, entry_kwargs in arguments]
+				try:
+					audited = models.audit_many(list(dict.fromkeys(model_names)), [args[1]], *args[2:], client=client, **kwargs)
+					by_model = dict(zip(audited['model_name'], audited['result']))
+					return kind, entries, [(by_model.get(model_name), None) for model_name in model_names]
+				except Exception as e:
+					if _retryable(e):
+						return kind, entries, [(None, e)] * len(entries)
+					# the batch was refused, e.g. because of one unknown model, audits are sent one by one
+
+			outcomes = []
+			for args, kwargs in arguments:
+				try:
+					outcomes.append((call(kind, args, kwargs), None))
+				except Exception as e:
+					outcomes.append((None, e))
+			return kind, entries, outcomes
+
+		changed = 0
+		for kind, entries, outcomes in imap(send, batches.items(), self.max_workers):
+			for (local_id, attempts), (result, error) in zip(entries, outcomes):
+				if error is None:
+					self._finish(local_id, kind, result)
+				else:
+					self._fail(local_id, attempts, error)
+				changed += 1
+		return changed
+
+	def _finish(self, local_id, kind, result):
+		if kind == 'model':
+			# uploading of the model continues in the weles, its task is reconciled later
+			self._execute("UPDATE entries SET state = 'SENT', task_id = ?, error = NULL WHERE local_id = ?", (str(result), local_id))
+		else:
+			self._execute("UPDATE entries SET state = 'SUCCESS', result = ?, error = NULL WHERE local_id = ?", (json.dumps(result, default=str), local_id))
+			self._remove_arguments(local_id)
+
+	def _fail(self, local_id, attempts, error):
+		attempts += 1
+		if _retryable(error) and (self.max_attempts is None or attempts < self.max_attempts):
+			delay = min(self.max_backoff, self.backoff_factor * 2 ** (attempts - 1))
+			self._execute("UPDATE entries SET state = 'PENDING', attempts = ?, next_attempt = ?, error = ? WHERE local_id = ?",
+				(attempts, time.time() + delay, repr(error), local_id))
+		else:
+			self._execute("UPDATE entries SET state = 'FAILURE', attempts = ?, error = ? WHERE local_id = ?", (attempts, repr(error), local_id))
+
+	def _reconcile(self, client):
+		from . import models
+
+		rows = self._execute("SELECT local_id, task_id FROM entries WHERE state = 'SENT'")
+
+		def fetch(row):
+			try:
+				return row, models.status(row[1], interactive=False, client=client), None
+			except Exception as e:
+				return row, None, e
+
+		changed = 0
+		for (local_id, task_id), status, error in imap(fetch, rows, self.max_workers):
+			if error is not None:
+				# the task is asked about again in the next flush
+				logger.debug("status of %s could not be fetched: %r", task_id, error)
+				continue
+			if status['state'] not in models.FINISHED_STATES:
+				continue
+			state = 'SUCCESS' if status['state'] == 'SUCCESS' else 'FAILURE'
+			self._execute("UPDATE entries SET state = ?, result = ?, error = ? WHERE local_id = ?",
+				(state, json.dumps(status, default=str), None if state == 'SUCCESS' else str(status.get('status')), local_id))
+			if state == 'SUCCESS':
+				self._remove_arguments(local_id)
+			changed += 1
+		return changed
+
+	def _select(self, condition, parameters=()):
+		rows = self._execute('SELECT local_id, kind, state, attempts, created, task_id, result, error FROM entries ' + condition, parameters)
+		entries = []
+		for local_id, kind, state, attempts, created, task_id, result, error in rows:
+			entries.append({'local_id': local_id, 'kind': kind, 'state': state, 'attempts': attempts, 'created': created,
+				'task_id': task_id, 'result': json.loads(result) if result is not None else None, 'error': error})
+		return entries
+
+	def _execute(self, sql, parameters=(), rowcount=False):
+		# a connection per statement, so the outbox can be used by many threads and processes
+		connection = sqlite3.connect(self.path, timeout=30)
+		try:
+			with connection:
+				cursor = connection.execute(sql, parameters)
+				return cursor.rowcount if rowcount else cursor.fetchall()
+		finally:
+			connection.close()
+
+	def _arguments_path(self, local_id):
+		return os.path.join(self.directory, local_id + '.pkl')
+
+	def _load_arguments(self, local_id):
+		return local.load(self._arguments_path(local_id))
+
+	def _remove_arguments(self, local_id):
+		try:
+			os.remove(self._arguments_path(local_id))
+		except FileNotFoundError:
+			pass
+
+def _retryable(error):
+	"""Check if the error is failed communication or an error of the weles, refused requests are not repeated"""
+
+	response = getattr(error, 'response', None)
+	return isinstance(error, requests.RequestException) and (response is None or response.status_code >= 500)
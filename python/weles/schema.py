@@ -0,0 +1,175 @@
+"""@package docstring
+The module with input schemas of models in the **weles**
+
+The schema is compiled once per version of the model from its columns metadata and prepares data frames before
+they are sent: columns are put in the training order and cast to the training types in one pass, and values
+are validated locally, so badly typed data fails before it is uploaded.
+"""
+
+# kinds of numpy dtypes of types reported by the weles, Python and R names
+KINDS = {
+	'float': 'f', 'float64': 'f', 'float32': 'f', 'double': 'f', 'numeric': 'f',
+	'int': 'i', 'int64': 'i', 'int32': 'i', 'integer': 'i',
+	'bool': 'b', 'boolean': 'b', 'logical': 'b',
+	'object': 'O', 'str': 'O', 'string': 'O', 'character': 'O', 'category': 'O', 'factor': 'O'
+}
+
+# dtypes to which columns of every kind are cast
+DTYPES = {'f': 'float64', 'i': 'int64', 'b': 'bool', 'O': str}
+
+class Schema:
+	"""Compiled input schema of the model.
+
+	Parameters
+	----------
+	columns : list
+		names of the columns without the target, in the training order
+	kinds : list
+		kinds of the columns: 'f', 'i', 'b', 'O' or None if unknown
+	levels : dict
+		allowed values of the string columns, column names mapped to lists
+
+	Examples
+	--------
+	schema = Schema.from_info(models.info('example_model'))
+
+	schema.prepare(data)
+	"""
+
+	def __init__(self, columns, kinds=None, levels=None):
+		self.columns = list(columns)
+		self.kinds = list(kinds) if kinds is not None else [None] * len(self.columns)
+		self.levels = {column: list(values) for column, values in (levels or {}).items()}
+
+		self._names = set(self.columns)
+		self._level_sets = {column: set(values) for column, values in self.levels.items()}
+		# casts compiled for dtypes of received data frames
+		self._casts = {}
+
+	@classmethod
+	def from_info(cls, model_info):
+		"""Compile the schema from the result of models.info or its raw json.
+
+		Parameters
+		----------
+		model_info : dict
+			metadata of the model with model and columns fields, columns have id, name and optionally type and levels
+
+		Returns
+		-------
+		Schema
+			compiled schema
+		"""
+
+		target = model_info['model']['target']
+		columns = model_info['columns']
+		if hasattr(columns, 'to_dict'):
+			columns = columns.to_dict('records')
+		columns = sorted((column for column in columns if column['name'] != target), key=lambda column: column['id'])
+
+		kinds = []
+		levels = {}
+		for column in columns:
+			kind = column.get('type', column.get('dtype'))
+			kinds.append(KINDS.get(str(kind).lower()) if kind is not None else None)
+			if isinstance(column.get('levels'), list):
+				levels[column['name']] = column['levels']
+
+		return cls([column['name'] for column in columns], kinds, levels)
+
+	def prepare(self, X):
+		"""Put columns of X in the training order and cast them to the training types.
+
+		Columns are matched by names. If X has other names, e.g. no names at all, but the same number of
+		columns, they are taken in the order they are.
+
+		Parameters
+		----------
+		X : pandas.DataFrame
+			data frame with features
+
+		Returns
+		-------
+		pandas.DataFrame
+			prepared data frame, X itself if nothing had to be changed
+
+		Raises
+		------
+		ValueError
+			if columns are missing or values cannot be cast to training types or are not allowed levels
+		"""
+
+		names = list(X.columns)
+		if names != self.columns:
+			if self._names.issubset(names):
+				X = X[self.columns]
+			elif len(names) == len(self.columns):
+				X = X.set_axis(self.columns, axis=1)
+			else:
+				missing = [column for column in self.columns if column not in names]
+				raise ValueError("X has " + str(len(names)) + " columns, the model expects " + str(len(self.columns)) + ", missing: " + ', '.join(str(column) for column in missing[:10]))
+
+		key = tuple(X.dtypes)
+		if key not in self._casts:
+			self._casts[key] = self._compile(X)
+		casts, checks = self._casts[key]
+
+		for column, check in checks:
+			check(X[column], column)
+
+		if casts:
+			X = X.astype(casts)
+
+		for column, allowed in self._level_sets.items():
+			values = X[column]
+			unknown = values[values.notna() & ~values.isin(allowed)]
+			if len(unknown) > 0:
+				raise ValueError("column " + str(column) + " has values unknown to the model: " + ', '.join(str(value) for value in unknown.unique()[:5]))
+
+		return X
+
+	def _compile(self, X):
+		"""Casts and checks for the data frame with dtypes of X"""
+
+		casts = {}
+		checks = []
+		for column, kind, dtype in zip(self.columns, self.kinds, X.dtypes):
+			if kind is None or dtype.kind == kind:
+				continue
+			if kind == 'O':
+				casts[column] = DTYPES['O']
+			elif kind == 'f' and dtype.kind in 'iub':
+				casts[column] = DTYPES['f']
+			elif kind == 'i' and dtype.kind in 'ub':
+				casts[column] = DTYPES['i']
+			elif kind == 'i' and dtype.kind == 'f':
+				checks.append((column, _check_integral))
+				casts[column] = DTYPES['i']
+			elif kind == 'b' and dtype.kind in 'iu':
+				checks.append((column, _check_binary))
+				casts[column] = DTYPES['b']
+			else:
+				checks.append((column, _mistyped(kind, dtype)))
+		return casts, checks
+
+	def __eq__(self, other):
+		return isinstance(other, Schema) and (self.columns, self.kinds, self.levels) == (other.columns, other.kinds, other.levels)
+
+	def __hash__(self):
+		return hash((tuple(self.columns), tuple(self.kinds)))
+
+	def __repr__(self):
+		return 'Schema(' + repr(self.columns) + ')'
+
+def _check_integral(values, column):
+	if values.isna().any() or not (values == values.round()).all():
+		raise ValueError("column " + str(column) + " must have integer values")
+
+def _check_binary(values, column):
+	if not values.isin([0, 1]).all():
+		raise ValueError("column " + str(column) + " must have logical values")
+
+def _mistyped(kind, dtype):
+	def check(values, column):
+		raise ValueError("column " + str(column) + " has type " + str(dtype) + ", the model expects " + str(DTYPES[kind]))
+	return check
@@ -0,0 +1,656 @@
+"""@package docstring
+The module with the local stand-in of the **weles** server, for tests and benchmarks without access to the MINI network
+"""
+
+import re
+import json
+import time
+import uuid
+import gzip
+import pickle
+import hashlib
+from threading import Thread, Lock
+from urllib.parse import parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from .client import Client
+from . import formats, datasets
+
+# measures computed by the audits of LocalServer
+MEASURES = {
+	'acc': lambda y, pred: float((y == pred).mean()),
+	'mae': lambda y, pred: float((y - pred).abs().mean()),
+	'mse': lambda y, pred: float(((y - pred) ** 2).mean()),
+	'rmse': lambda y, pred: float(((y - pred) ** 2).mean() ** 0.5)
+}
+
+# string columns with more distinct values have no levels in metadata
+MAX_LEVELS = 1000
+
+class ConstantModel:
+	"""Model predicting the same value for every row, it can be uploaded to LocalServer without any ML package.
+
+	Parameters
+	----------
+	value : object
+		predicted value
+	"""
+
+	def __init__(self, value=0):
+		self.value = value
+
+	def predict(self, X):
+		import pandas as pd
+		return pd.Series(self.value, index=range(X.shape[0]))
+
+	def predict_proba(self, X):
+		import pandas as pd
+		return pd.DataFrame({0: 0.5, 1: 0.5}, index=range(X.shape[0]))
+
+class LocalServer:
+	"""In-process HTTP server mimicking endpoints of the **weles**.
+
+	Users, datasets and models are kept in memory. Uploaded models are unpickled in this process to make
+	predictions and audits, so only trusted models should be uploaded. Uploading of models finishes immediately.
+
+	Parameters
+	----------
+	host : string
+		address to listen on
+	port : int
+		port to listen on, a free one is chosen if 0
+	block_rows : int
+		number of rows in hashed blocks of datasets
+
+	Attributes
+	----------
+	requests : list
+		(method, path) of every received request
+	bytes_received : int
+		total number of bytes of received request bodies
+	bytes_sent : int
+		total number of bytes of sent response bodies
+	fail_parts : set
+		numbers of upload parts which are refused once with status 500, to test resuming
+
+	Examples
+	--------
+	with LocalServer() as server:
+		client = server.client()
+		upload_id = client.uploads.upload('models/forest.pkl', part_size=2**20)
+		server.uploaded(upload_id)
+
+	with LocalServer() as server:
+		client = server.client()
+		client.users.create('example@mail.com', 'example_user', 'password')
+		client.auth.login('example_user', 'password')
+		client.models.upload(ConstantModel(), 'example_model', 'example', 'y', ['example'], data, 'data', 'example', 'requirements.txt')
+		client.models.predict('example_model', data.drop(columns='y'))
+	"""
+
+	def __init__(self, host='127.0.0.1', port=0, block_rows=datasets.BLOCK_ROWS):
+		self.block_rows = block_rows
+		self.requests = []
+		self.bytes_received = 0
+		self.bytes_sent = 0
+		self.fail_parts = set()
+		# number of GET requests answered with 304 Not Modified
+		self.not_modified = 0
+
+		self._uploads = {}
+		self._users = {}
+		self._tokens = {}
+		self._datasets = {}
+		self._models = {}
+		self._tasks = {}
+		self._lock = Lock()
+		self._routes = [
+			('POST', '^/uploads$', self._upload_start),
+			('GET', '^/uploads/([^/]+)$', self._upload_status),
+			('PUT', '^/uploads/([^/]+)/([0-9]+)$', self._upload_part),
+			('POST', '^/uploads/([^/]+)/complete$', self._upload_complete),
+			('POST', '^/users/create_user$', self._user_create),
+			('POST', '^/users/login$', self._user_login),
+			('POST', '^/users/refresh$', self._user_refresh),
+			('POST', '^/datasets/post$', self._dataset_post),
+			('POST', '^/datasets/info_many$', self._dataset_info_many),
+			('POST', '^/datasets/append$', self._dataset_append),
+			('GET', '^/datasets/([0-9a-f]{64})/blocks$', self._dataset_blocks),
+			('GET', '^/datasets/([0-9a-f]{64})/info$', self._dataset_info),
+			('GET', '^/datasets/([0-9a-f]{64})/head$', self._dataset_head),
+			('GET', '^/datasets/([0-9a-f]{64})$', self._dataset_get),
+			('POST', '^/models/post$', self._model_post),
+			('GET', '^/models/status/([^/]+)$', self._model_status),
+			('GET', '^/models/search$', self._model_search),
+			('POST', '^/models/info_many$', self._model_info_many),
+			('POST', '^/models/audit$', self._model_audit),
+			('POST', '^/models/audit_many$', self._model_audit_many),
+			('GET', '^/models/([^/]+)/info$', self._model_info),
+			('GET', '^/models/([^/]+)/requirements$', self._model_requirements),
+			('GET', '^/models/([^/]+)/download$', self._model_download),
+			('GET', '^/models/([^/]+)/predict/(exact|prob)$', self._model_predict)
+		]
+		self._httpd = ThreadingHTTPServer((host, port), _handler(self))
+		self._thread = None
+
+	@property
+	def base_url(self):
+		"""Address of the server"""
+		host, port = self._httpd.server_address[:2]
+		return 'http://' + host + ':' + str(port)
+
+	def client(self, **kwargs):
+		"""Create weles.Client connected to this server, kwargs are passed to weles.Client"""
+		return Client(self.base_url, **kwargs)
+
+	def start(self):
+		"""Start serving in the background thread"""
+
+		self._thread = Thread(target=self._httpd.serve_forever, daemon=True)
+		self._thread.start()
+		return self
+
+	def stop(self):
+		"""Stop the server"""
+
+		self._httpd.shutdown()
+		self._httpd.server_close()
+		self._thread.join()
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *args):
+		self.stop()
+
+	def uploaded(self, upload_id):
+		"""Content of the completed upload session"""
+
+		upload = self._uploads[upload_id]
+		if not upload['complete']:
+			raise ValueError("upload " + upload_id + " is not completed")
+		return b''.join(upload['parts'][number] for number in sorted(upload['parts']))
+
+	def handle(self, method, path, headers, body):
+		"""Answer the request, returns (status, content type, body) or (status, content type, body, headers)"""
+
+		with self._lock:
+			self.requests.append((method, path))
+			self.bytes_received += len(body)
+
+		path, _, query = path.partition('?')
+		if query and not body:
+			# parameters of GET requests are read like forms
+			body = query.encode('utf-8')
+		for route_method, pattern, handler in self._routes:
+			match = re.match(pattern, path)
+			if match and (method == route_method or (method == 'HEAD' and route_method == 'GET')):
+				try:
+					response = handler(headers, body, *match.groups())
+				except Exception as e:
+					return 500, 'application/json', {'error': type(e).__name__ + ': ' + str(e)}
+				return self._revalidate(method, headers, response)
+
+		return 404, 'application/json', {'error': 'not found'}
+
+	def _revalidate(self, method, headers, response):
+		"""Add the ETag to JSON answers of GET requests and answer 304 if the client has the same one"""
+
+		status, content_type, content, *extra = response
+		if method != 'GET' or status != 200 or not isinstance(content, (dict, list)):
+			return response
+
+		etag = '"' + hashlib.sha256(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest() + '"'
+		extra = dict(extra[0]) if extra else {}
+		extra['ETag'] = etag
+		if headers.get('If-None-Match') == etag:
+			with self._lock:
+				self.not_modified += 1
+			return 304, content_type, b'', extra
+		return status, content_type, content, extra
+
+	def _upload_start(self, headers, body):
+		upload_id = uuid.uuid4().hex
+		self._uploads[upload_id] = {'name': _form(body).get('name'), 'parts': {}, 'complete': False}
+		return 200, 'application/json', {'upload_id': upload_id}
+
+	def _upload_status(self, headers, body, upload_id):
+		if upload_id not in self._uploads:
+			return 404, 'application/json', {'error': 'unknown upload'}
+		return 200, 'application/json', {'parts': sorted(self._uploads[upload_id]['parts'])}
+
+	def _upload_part(self, headers, body, upload_id, number):
+		number = int(number)
+		if upload_id not in self._uploads:
+			return 404, 'application/json', {'error': 'unknown upload'}
+		with self._lock:
+			if number in self.fail_parts:
+				self.fail_parts.discard(number)
+				return 500, 'application/json', {'error': 'part refused'}
+		if hashlib.sha256(body).hexdigest() != headers.get('X-Checksum-Sha256'):
+			return 400, 'application/json', {'error': 'checksum mismatch'}
+		self._uploads[upload_id]['parts'][number] = body
+		return 200, 'application/json', {'part': number}
+
+	def _upload_complete(self, headers, body, upload_id):
+		if upload_id not in self._uploads:
+			return 404, 'application/json', {'error': 'unknown upload'}
+		upload = self._uploads[upload_id]
+		upload['complete'] = True
+		if hashlib.sha256(self.uploaded(upload_id)).hexdigest() != _form(body).get('sha256'):
+			upload['complete'] = False
+			return 400, 'application/json', {'error': 'checksum mismatch'}
+		return 200, 'application/json', {'upload_id': upload_id}
+
+	def _user(self, fields):
+		"""Name of the user authenticated by the token or the password, None if not authenticated"""
+
+		if 'token' in fields:
+			token = self._tokens.get(fields['token'][0])
+			return token['user_name'] if token is not None and token['expires'] > time.time() else None
+
+		user_name = (fields.get('user_name') or fields.get('user') or [None])[0]
+		user = self._users.get(user_name)
+		if user is not None and user['password'] == fields.get('password', [None])[0]:
+			return user_name
+		return None
+
+	def _issue_token(self, user_name):
+		token = uuid.uuid4().hex
+		self._tokens[token] = {'user_name': user_name, 'expires': time.time() + 3600}
+		return 200, 'application/json', {'token': token, 'expires_in': 3600}
+
+	def _user_create(self, headers, body):
+		fields = _fields(headers, body)
+		user_name = fields['user_name'][0]
+		with self._lock:
+			if user_name in self._users:
+				return 200, 'text/plain', 'User with this name already exists'
+			self._users[user_name] = {'password': fields['password'][0], 'mail': fields['mail'][0]}
+		return 200, 'text/plain', 'User created'
+
+	def _user_login(self, headers, body):
+		user_name = self._user(_fields(headers, body))
+		if user_name is None:
+			return 401, 'application/json', {'error': 'wrong user name or password'}
+		return self._issue_token(user_name)
+
+	def _user_refresh(self, headers, body):
+		user_name = self._user(_fields(headers, body))
+		if user_name is None:
+			return 401, 'application/json', {'error': 'invalid token'}
+		return self._issue_token(user_name)
+
+	def _add_dataset(self, data, name=None, desc=None, owner=None):
+		"""Store the data frame, returns its hash"""
+
+		dataset_id = datasets.content_hash(data)
+		with self._lock:
+			if dataset_id not in self._datasets:
+				self._datasets[dataset_id] = {'data': data, 'aliases': [], 'owner': owner}
+			if name is not None:
+				self._datasets[dataset_id]['aliases'].append({'name': name, 'desc': desc})
+		return dataset_id
+
+	def _dataset_post(self, headers, body):
+		fields = _fields(headers, body)
+		user_name = self._user(fields)
+		if user_name is None:
+			return 401, 'text/plain', 'Wrong user name or password'
+		if fields.get('is_hash', ['0'])[0] == '1':
+			# the stored dataset is given another name
+			if fields['hash'][0] not in self._datasets:
+				return 404, 'application/json', {'error': 'unknown dataset'}
+			return 200, 'text/plain', self._add_dataset(self._datasets[fields['hash'][0]]['data'], fields['data_name'][0], fields['data_desc'][0], user_name)
+		return 200, 'text/plain', self._add_dataset(_frame(fields, 'data'), fields['data_name'][0], fields['data_desc'][0], user_name)
+
+	def _dataset_append(self, headers, body):
+		import pandas as pd
+
+		fields = _fields(headers, body)
+		user_name = self._user(fields)
+		if user_name is None:
+			return 401, 'text/plain', 'Wrong user name or password'
+		base_dataset_id = fields['base_dataset_id'][0]
+		if base_dataset_id not in self._datasets:
+			return 404, 'application/json', {'error': 'unknown dataset'}
+
+		base = self._datasets[base_dataset_id]['data']
+		new_rows = _frame(fields, 'data').astype(base.dtypes.to_dict())
+		data = pd.concat([base, new_rows], ignore_index=True)
+		name = fields['data_name'][0] if 'data_name' in fields else None
+		return 200, 'text/plain', self._add_dataset(data, name, fields.get('data_desc', [None])[0], user_name)
+
+	def _dataset_blocks(self, headers, body, dataset_id):
+		if dataset_id not in self._datasets:
+			return 404, 'application/json', {'error': 'unknown dataset'}
+		data = self._datasets[dataset_id]['data']
+		return 200, 'application/json', {'rows': data.shape[0], 'block_rows': self.block_rows, 'blocks': datasets.block_hashes(data, self.block_rows)}
+
+	def _dataset_metadata(self, dataset_id):
+		dataset = self._datasets[dataset_id]
+		data = dataset['data']
+		return {
+			'dataset': {'dataset_id': dataset_id, 'owner': dataset['owner'], 'rows': data.shape[0], 'columns': data.shape[1]},
+			'columns': _columns(data),
+			'aliases': dataset['aliases']
+		}
+
+	def _dataset_info(self, headers, body, dataset_id):
+		if dataset_id not in self._datasets:
+			return 404, 'application/json', {'error': 'unknown dataset'}
+		return 200, 'application/json', self._dataset_metadata(dataset_id)
+
+	def _dataset_info_many(self, headers, body):
+		dataset_ids = _fields(headers, body).get('dataset_ids', [])
+		return 200, 'application/json', {'datasets': {dataset_id: self._dataset_metadata(dataset_id) for dataset_id in dataset_ids if dataset_id in self._datasets}}
+
+	def _dataset_head(self, headers, body, dataset_id):
+		if dataset_id not in self._datasets:
+			return 404, 'application/json', {'error': 'unknown dataset'}
+		n = int(_fields(headers, body).get('n', [5])[0])
+		return _send_frame(headers, self._datasets[dataset_id]['data'].head(n))
+
+	def _dataset_get(self, headers, body, dataset_id):
+		if dataset_id not in self._datasets:
+			return 404, 'application/json', {'error': 'unknown dataset'}
+		query = {name: json.loads(values[0]) for name, values in _fields(headers, body).items()}
+		if not query:
+			return _send_frame(headers, self._datasets[dataset_id]['data'])
+		status, content_type, content = _send_frame(headers, datasets._select(self._datasets[dataset_id]['data'], **query))
+		return status, content_type, content, {'X-Weles-Query': 'applied'}
+
+	def _model_post(self, headers, body):
+		fields = _fields(headers, body)
+		user_name = self._user(fields)
+		if user_name is None:
+			return 401, 'application/json', {'error': 'wrong user name or password'}
+
+		if 'model_upload_id' in fields:
+			model = self.uploaded(fields['model_upload_id'][0])
+		else:
+			model = fields['model'][0]
+		if fields.get('model_compression', [None])[0] == 'gzip':
+			model = gzip.decompress(model)
+
+		if fields['is_train_dataset_hash'][0] == '1':
+			dataset_id = fields['train_dataset'][0]
+			if dataset_id not in self._datasets:
+				return 400, 'application/json', {'error': 'unknown dataset'}
+		else:
+			if 'train_dataset_upload_id' in fields:
+				data = formats.deserialize(self.uploaded(fields['train_dataset_upload_id'][0]), fields.get('format', ['csv'])[0], float_precision='round_trip')
+			else:
+				data = _frame(fields, 'train_dataset')
+			name = fields['train_data_name'][0] if fields['is_train_name'][0] == '1' else None
+			dataset_id = self._add_dataset(data, name, fields.get('dataset_desc', [None])[0], user_name)
+
+		requirements = {}
+		for line in fields.get('requirements', [b''])[0].decode('utf-8').splitlines():
+			if '==' in line:
+				package, version = line.strip().split('==', 1)
+				requirements[package] = version
+
+		model_name = fields['model_name'][0]
+		task_id = uuid.uuid4().hex
+		with self._lock:
+			existed = model_name in self._models
+			if not existed:
+				self._models[model_name] = {
+					'pickle': model,
+					'model': {'name': model_name, 'owner': user_name, 'target': fields['target'][0], 'tags': fields.get('tags', []),
+						'description': fields.get('model_desc', [None])[0], 'language': fields['language'][0],
+						'language_version': fields['language_version'][0], 'upload_time': time.time()},
+					'dataset_id': dataset_id,
+					'requirements': requirements,
+					'audits': []
+				}
+			self._tasks[task_id] = {'state': 'SUCCESS', 'status': 'Model uploaded', 'current': 1, 'total': 1, 'model_existed': existed}
+
+		return 200, 'application/json', json.dumps(task_id)
+
+	def _model_status(self, headers, body, task_id):
+		if task_id not in self._tasks:
+			return 404, 'application/json', {'error': 'unknown task'}
+		return 200, 'application/json', self._tasks[task_id]
+
+	def _model_metadata(self, model_name):
+		model = self._models[model_name]
+		data = self._datasets[model['dataset_id']]['data']
+		return {
+			'model': model['model'],
+			'data': {'dataset_id': model['dataset_id'], 'rows': data.shape[0], 'columns': data.shape[1]},
+			'columns': _columns(data),
+			'audits': model['audits'],
+			'aliases': self._datasets[model['dataset_id']]['aliases']
+		}
+
+	def _model_info(self, headers, body, model_name):
+		if model_name not in self._models:
+			return 404, 'application/json', {'error': 'unknown model'}
+		return 200, 'application/json', self._model_metadata(model_name)
+
+	def _model_info_many(self, headers, body):
+		model_names = _fields(headers, body).get('model_names', [])
+		return 200, 'application/json', {'models': {model_name: self._model_metadata(model_name) for model_name in model_names if model_name in self._models}}
+
+	def _model_search(self, headers, body):
+		fields = _fields(headers, body)
+		found = []
+		for model_name in sorted(self._models):
+			metadata = self._model_metadata(model_name)
+			model = metadata['model']
+			if 'language' in fields and model['language'] != fields['language'][0]:
+				continue
+			if 'owner' in fields and model['owner'] != fields['owner'][0]:
+				continue
+			if not set(fields.get('tags', [])) <= set(model['tags']):
+				continue
+			if 'regex' in fields and re.search(fields['regex'][0], model_name) is None:
+				continue
+			if 'row' in fields and not _satisfies(metadata['data']['rows'], fields['row'][0]):
+				continue
+			if 'column' in fields and not _satisfies(metadata['data']['columns'], fields['column'][0]):
+				continue
+			found.append(dict(model, name=model_name) if 'fields' in fields else model_name)
+
+		start = int(fields.get('cursor', [0])[0])
+		page_size = int(fields.get('page_size', [len(found) or 1])[0])
+		page = found[start:start + page_size]
+		if 'fields' in fields:
+			page = [{field: model.get(field) for field in ['name'] + fields['fields']} for model in page]
+		following = str(start + page_size) if start + page_size < len(found) else None
+
+		return 200, 'application/json', {'models': page, 'next': following}
+
+	def _model_requirements(self, headers, body, model_name):
+		if model_name not in self._models:
+			return 404, 'application/json', {'error': 'unknown model'}
+		return 200, 'application/json', self._models[model_name]['requirements']
+
+	def _model_download(self, headers, body, model_name):
+		if model_name not in self._models:
+			return 404, 'application/json', {'error': 'unknown model'}
+		return 200, 'application/octet-stream', self._models[model_name]['pickle']
+
+	def _features(self, model_name, fields):
+		"""Data frame sent to the model, either in the request or as the hash, without the target"""
+
+		if fields['is_hash'][0] == '1':
+			data = self._datasets[fields['hash'][0]]['data']
+		else:
+			data = _frame(fields, 'data')
+		target = self._models[model_name]['model']['target']
+		return data.drop(columns=[target]) if target in data.columns else data
+
+	def _predict(self, model_name, X, pred_type):
+		import pandas as pd
+
+		model = pickle.loads(self._models[model_name]['pickle'])
+		return pd.DataFrame(model.predict_proba(X) if pred_type == 'prob' else model.predict(X))
+
+	def _model_predict(self, headers, body, model_name, pred_type):
+		if model_name not in self._models:
+			return 404, 'application/json', {'error': 'unknown model'}
+		fields = _fields(headers, body)
+		return _send_frame(headers, self._predict(model_name, self._features(model_name, fields), pred_type), header=False)
+
+	def _audit(self, model_name, measure, fields, user_name):
+		"""Result of the audit, the dataset is taken from fields"""
+
+		import pandas as pd
+
+		if fields['is_hash'][0] == '1':
+			dataset_id = fields['hash'][0]
+		else:
+			name = fields['data_name'][0] if fields['is_data_name'][0] == '1' else None
+			dataset_id = self._add_dataset(_frame(fields, 'data'), name, fields.get('data_desc', [None])[0], user_name)
+
+		data = self._datasets[dataset_id]['data']
+		target = fields['target'][0]
+		prediction = self._predict(model_name, data.drop(columns=[target]), 'exact').iloc[:, 0]
+		result = MEASURES[measure](data[target].reset_index(drop=True), pd.Series(prediction.values))
+
+		with self._lock:
+			self._models[model_name]['audits'].append({'measure': measure, 'dataset_id': dataset_id, 'result': result, 'user': user_name})
+		return result
+
+	def _model_audit(self, headers, body):
+		fields = _fields(headers, body)
+		user_name = self._user(fields)
+		if user_name is None:
+			return 401, 'application/json', {'error': 'wrong user name or password'}
+		if fields['model_name'][0] not in self._models or fields['measure'][0] not in MEASURES:
+			return 400, 'application/json', {'error': 'unknown model or measure'}
+		return 200, 'application/json', self._audit(fields['model_name'][0], fields['measure'][0], fields, user_name)
+
+	def _model_audit_many(self, headers, body):
+		fields = _fields(headers, body)
+		user_name = self._user(fields)
+		if user_name is None:
+			return 401, 'application/json', {'error': 'wrong user name or password'}
+		if not set(fields['model_names']) <= set(self._models) or not set(fields['measures']) <= set(MEASURES):
+			return 400, 'application/json', {'error': 'unknown model or measure'}
+
+		results = []
+		for model_name in fields['model_names']:
+			for measure in fields['measures']:
+				results.append({'model_name': model_name, 'measure': measure, 'result': self._audit(model_name, measure, fields, user_name)})
+				# the dataset is stored by the first audit
+				fields = dict(fields, is_hash=['1'], hash=[self._models[model_name]['audits'][-1]['dataset_id']])
+		return 200, 'application/json', {'results': results}
+
+def _form(body):
+	"""Fields of the url encoded form"""
+	return {key: values[0] for key, values in parse_qs(body.decode('utf-8')).items()}
+
+def _fields(headers, body):
+	"""Fields of the url encoded or multipart form mapped to lists of values, values of files are bytes"""
+
+	content_type = headers.get('Content-Type', '')
+	if not content_type.startswith('multipart/form-data'):
+		return parse_qs(body.decode('utf-8'), keep_blank_values=True)
+
+	boundary = b'--' + re.search('boundary="?([^";]+)"?', content_type).group(1).encode('latin-1')
+	fields = {}
+	for part in body.split(boundary)[1:-1]:
+		# every part is surrounded by CRLF
+		head, _, value = part[2:-2].partition(b'\r\n\r\n')
+		head = head.decode('utf-8')
+		name = re.search('name="([^"]*)"', head).group(1)
+		if re.search('filename="', head) is None:
+			value = value.decode('utf-8')
+		fields.setdefault(name, []).append(value)
+	return fields
+
+def _frame(fields, name):
+	"""Data frame sent in the field in the format given by the format field"""
+	# floats are parsed exactly, so hashes of stored datasets are the same as computed by clients
+	return formats.deserialize(fields[name][0], fields.get('format', ['csv'])[0], float_precision='round_trip')
+
+def _columns(data):
+	"""Metadata of columns of the data frame, string columns with few distinct values have their levels"""
+
+	columns = []
+	for i, (name, dtype) in enumerate(data.dtypes.items()):
+		column = {'id': i, 'name': str(name), 'type': str(dtype)}
+		if dtype.kind == 'O' or str(dtype) in ('str', 'string', 'category'):
+			levels = data[name].dropna().unique()
+			if len(levels) <= MAX_LEVELS:
+				column['levels'] = sorted(str(level) for level in levels)
+		columns.append(column)
+	return columns
+
+def _send_frame(headers, data, header=True):
+	"""Response with the data frame in the first supported format from the Accept header"""
+
+	for media_type in headers.get('Accept', '').split(','):
+		media_type = media_type.split(';')[0].strip()
+		for fmt, known in formats.FORMATS.items():
+			if media_type == known:
+				return 200, known, formats.serialize(data, fmt, header=header)
+	return 200, formats.FORMATS['csv'], formats.serialize(data, 'csv', header=header)
+
+def _satisfies(value, restriction):
+	"""Check restriction of the search, e.g. '>10;<20;'"""
+
+	for condition in restriction.split(';'):
+		match = re.match('^(>=|<=|>|<|=)([0-9.]+)$', condition.strip())
+		if match is None:
+			continue
+		operator, bound = match.group(1), float(match.group(2))
+		if not {'>=': value >= bound, '<=': value <= bound, '>': value > bound, '<': value < bound, '=': value == bound}[operator]:
+			return False
+	return True
+
+def _handler(server):
+
+	class Handler(BaseHTTPRequestHandler):
+		protocol_version = 'HTTP/1.1'
+
+		# headers and body are written separately, without it every response waits for the delayed ACK
+		disable_nagle_algorithm = True
+
+		def log_message(self, *args):
+			pass
+
+		def _respond(self):
+			if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+				body = self._read_chunked()
+			else:
+				body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+			status, content_type, content, *extra = server.handle(self.command, self.path, self.headers, body)
+			if not isinstance(content, (str, bytes)):
+				content = json.dumps(content)
+			if isinstance(content, str):
+				content = content.encode('utf-8')
+
+			if self.command != 'HEAD':
+				with server._lock:
+					server.bytes_sent += len(content)
+
+			self.send_response(status)
+			self.send_header('Content-Type', content_type)
+			self.send_header('Content-Length', str(len(content)))
+			for name, value in (extra[0] if extra else {}).items():
+				self.send_header(name, value)
+			self.end_headers()
+			if self.command != 'HEAD':
+				self.wfile.write(content)
+
+		def _read_chunked(self):
+			body = b''
+			while True:
+				size = int(self.rfile.readline().split(b';')[0], 16)
+				if size == 0:
+					# optional trailers end with the empty line
+					while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+						pass
+					return body
+				body += self.rfile.read(size)
+				self.rfile.readline()
+
+		do_GET = do_POST = do_PUT = do_HEAD = _respond
+
+	return Handler
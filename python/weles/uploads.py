@@ -0,0 +1,213 @@
+"""@package docstring
+The module with resumable uploads of big files to the **weles**
+
+A file is uploaded in parts within an upload session:
+	POST /uploads                     starts the session, returns {'upload_id': ...}
+	GET  /uploads/<upload_id>         returns {'parts': [numbers of received parts]}
+	PUT  /uploads/<upload_id>/<part>  uploads the part, its sha256 is sent in the X-Checksum-Sha256 header
+	POST /uploads/<upload_id>/complete  finishes the session, sha256 of the whole file is sent in the sha256 field
+The upload id is then passed to other endpoints instead of the file itself.
+"""
+
+import os
+import hashlib
+
+import requests
+
+from .client import get_client
+from .concurrency import call_with_retries
+
+# default size of one uploaded part
+PART_SIZE = 8 * 2**20
+
+class UploadInterrupted(Exception):
+	"""Uploading failed, it can be resumed by passing upload_id to uploads.upload
+
+	Attributes
+	----------
+	upload_id : string
+		id of the interrupted upload session
+	resume : dict
+		keyword arguments of the interrupted function which resume it, e.g. of models.upload
+	"""
+
+	def __init__(self, upload_id, cause):
+		super().__init__("uploading " + upload_id + " was interrupted: " + str(cause) + ", pass upload_id='" + upload_id + "' to resume it")
+		self.upload_id = upload_id
+		self.resume = {'upload_id': upload_id}
+
+def start(name=None, client=None):
+	"""Start the upload session.
+
+	Parameters
+	----------
+	name : string, optional
+		name of the uploaded file
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
+
+	Returns
+	-------
+	string
+		id of the upload session
+
+	Examples
+	--------
+	uploads.start('model.pkl')
+	"""
+
+	if name is not None and not isinstance(name, str):
+		raise ValueError("name must be a string")
+
+	client = get_client(client)
+
+	r = client.post('/uploads', data = {'name': name})
+	r.raise_for_status()
+
+	return r.json()['upload_id']
+
+def received(upload_id, client=None):
+	"""Get numbers of parts already received by the **weles**.
+
+	Parameters
+	----------
+	upload_id : string
+		id of the upload session
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
+
+	Returns
+	-------
+	set
+		numbers of received parts
+
+	Examples
+	--------
+	uploads.received('aaaaaaaaaaaaaaaa')
+	"""
+
+	if not isinstance(upload_id, str):
+		raise ValueError("upload_id must be a string")
+
+	client = get_client(client)
+
+	r = client.get('/uploads/' + upload_id)
+	r.raise_for_status()
+
+	return set(r.json()['parts'])
+
+def upload(source, name=None, upload_id=None, part_size=PART_SIZE, retries=3, client=None):
+	"""Upload the file to the **weles** in parts, resuming the interrupted upload if upload_id is given.
+
+	Only one part of the file is held in memory at once.
+
+	Parameters
+	----------
+	source : string/bytes/file-like/iterable
+		path to the file, its content, binary file object or iterable of bytes, e.g. a generator
+	name : string, optional
+		name of the uploaded file
+	upload_id : string, optional
+		id of the interrupted upload session to resume, a new session is started if None
+	part_size : int
+		number of bytes in one part
+	retries : int
+		number of repetitions of the failed part before the upload is interrupted
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
+
+	Returns
+	-------
+	string
+		id of the finished upload session
+
+	Raises
+	------
+	UploadInterrupted
+		if the part could not be uploaded, its upload_id allows to resume the upload
+
+	Examples
+	--------
+	uploads.upload('models/forest.pkl')
+
+	try:
+		upload_id = uploads.upload('models/forest.pkl')
+	except uploads.UploadInterrupted as e:
+		upload_id = uploads.upload('models/forest.pkl', upload_id=e.upload_id)
+	"""
+
+	if upload_id is not None and not isinstance(upload_id, str):
+		raise ValueError("upload_id must be a string")
+	if not isinstance(part_size, int) or part_size < 1:
+		raise ValueError("part_size must be a positive integer")
+	if not isinstance(retries, int) or retries < 0:
+		raise ValueError("retries must be a non negative integer")
+
+	client = get_client(client)
+
+	if name is None and isinstance(source, str):
+		name = os.path.basename(source)
+
+	if upload_id is None:
+		upload_id = start(name, client=client)
+		done = set()
+	else:
+		done = received(upload_id, client=client)
+
+	checksum = hashlib.sha256()
+	try:
+		for number, part in enumerate(parts(source, part_size)):
+			# every part is hashed, also the skipped ones, to get the checksum of the whole file
+			checksum.update(part)
+			if number not in done:
+				call_with_retries(_send_part, (upload_id, number, part, client), retries)
+
+		r = client.post('/uploads/' + upload_id + '/complete', data = {'sha256': checksum.hexdigest()})
+		r.raise_for_status()
+	except requests.RequestException as e:
+		raise UploadInterrupted(upload_id, e) from e
+
+	return upload_id
+
+def parts(source, part_size=PART_SIZE):
+	"""Split the source into parts of part_size bytes, the last one may be shorter.
+
+	Parameters
+	----------
+	source : string/bytes/file-like/iterable
+		path to the file, its content, binary file object or iterable of bytes
+
+	Returns
+	-------
+	generator
+		consecutive parts as bytes
+	"""
+
+	if isinstance(source, str):
+		with open(source, 'rb') as f:
+			yield from parts(f, part_size)
+	elif isinstance(source, (bytes, bytearray, memoryview)):
+		source = memoryview(source)
+		for start in range(0, len(source), part_size):
+			yield bytes(source[start:start + part_size])
+	elif hasattr(source, 'read'):
+		while True:
+			part = source.read(part_size)
+			if not part:
+				break
+			yield part
+	else:
+		# iterable of chunks of any size
+		buffer = bytearray()
+		for chunk in source:
+			buffer += chunk
+			while len(buffer) >= part_size:
+				yield bytes(buffer[:part_size])
+				del buffer[:part_size]
+		if buffer:
+			yield bytes(buffer)
+
+def _send_part(upload_id, number, part, client):
+	headers = {'X-Checksum-Sha256': hashlib.sha256(part).hexdigest(), 'Content-Type': 'application/octet-stream'}
+	r = client.request('PUT', '/uploads/' + upload_id + '/' + str(number), data = part, headers = headers)
+	r.raise_for_status()
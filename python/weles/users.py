@@ -3,18 +3,13 @@ The module related to users in the **weles**
 """
 
 
-import sys
-import requests
-import pickle
-import os
-import pandas as pd
-import platform
-import re
-from io import StringIO
-from datetime import datetime
 from getpass import getpass
 
-def create(mail):
+from .client import get_client
+from .instrumentation import instrumented
+
+@instrumented
+def create(mail, user_name=None, password=None, client=None):
 	"""
 	Function create_userFunction creates new user in the **weles** base.
 
@@ -22,6 +17,12 @@ def create(mail):
 	----------
 	mail : string
 		your mail
+	user_name : string, optional
+		your user name, asked for if None
+	password : string, optional
+		your password, asked for twice if None
+	client : weles.Client, optional
+		client used for the communication with the **weles**, the default one if None
 
 	Returns
 	-------
@@ -34,14 +35,18 @@ def create(mail):
 		-> user: 'example_user'
 		-> password:
 		-> password:
+
+	users.create('exaplemail@gmail.com', 'example_user', os.environ['PASSWORD'])
 	"""
 
-	user_name = input('user: ')
-	password = getpass('password: ')
-	password2 = getpass('password: ')
+	if user_name is None:
+		user_name = input('user: ')
+	if password is None:
+		password = getpass('password: ')
+		password2 = getpass('password: ')
 
-	if password != password2:
-		raise ValueError('You entered two different passwords')
+		if password != password2:
+			raise ValueError('You entered two different passwords')
 
 	if not isinstance(user_name, str):
 		raise ValueError("user_name must be a string")
@@ -50,6 +55,8 @@ def create(mail):
 	if not isinstance(mail, str):
 		raise ValueError("mail must be a string")
 
-	r = requests.post('http://192.168.137.64/users/create_user', data = {'user_name': user_name, 'password': password, 'mail': mail})
+	client = get_client(client)
+
+	r = client.post('/users/create_user', data = {'user_name': user_name, 'password': password, 'mail': mail})
 
 	return r.text